@@ -0,0 +1,94 @@
+"""
+Время расчета метрик товаров: векторизованно и циклом по товарам
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_analytics --products 10000 --points 1000 --sample 200
+
+История генерируется в памяти (точка каждые 45 минут, цена меняется
+примерно в каждой пятой точке). Векторизованный расчет выполняется для
+всех товаров фрагментами, как в load_product_metrics; цикл по товарам
+на Python измеряется на выборке sample товаров и пересчитывается на все.
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+NOW = datetime(2024, 6, 1)
+WINDOWS = (7, 30)
+
+
+def generate(first: int, products: int, points: int, rng: np.random.Generator) -> pd.DataFrame:
+    """История products товаров начиная с first по points точек"""
+    steps = rng.normal(0, 0.03, size=(products, points)) * (rng.random((products, points)) < 0.2)
+    close = np.round(100 * np.exp(np.cumsum(steps, axis=1)), 2).ravel()
+    offsets = np.tile(np.arange(points - 1, -1, -1) * 45, products)
+    return pd.DataFrame({
+        'product_id': np.repeat(np.arange(first, first + products), points),
+        'name': 'Товар',
+        'timestamp': pd.Timestamp(NOW) - pd.to_timedelta(offsets, unit='min'),
+        'low': close,
+        'high': close,
+        'close': close,
+    })
+
+
+def loop_metrics(history: pd.DataFrame) -> dict:
+    """Те же метрики циклом по товарам и точкам"""
+    result = {}
+    for product_id, rows in history.groupby('product_id', sort=False):
+        points = list(zip(rows['timestamp'], rows['close']))
+        metrics = {}
+        for days in WINDOWS:
+            start = NOW - timedelta(days=days)
+            inside = [price for timestamp, price in points if timestamp >= start]
+            before = [price for timestamp, price in points if timestamp <= start]
+            base = before[-1] if before else inside[0]
+            changes = [price / previous - 1 for previous, price in zip(inside, inside[1:])]
+            metrics[days] = (
+                min(inside), max(inside), (points[-1][1] / base - 1) * 100,
+                statistics.stdev(changes) * 100 if len(changes) > 1 else None,
+                points[-1][1] <= min(inside)
+            )
+        last_change = None
+        for (_, previous), (timestamp, price) in zip(points, points[1:]):
+            if price != previous:
+                last_change = timestamp
+        metrics['days_since_change'] = (NOW - (last_change or points[0][0])).total_seconds() / 86400
+        result[product_id] = metrics
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000, help='Товаров')
+    parser.add_argument('--points', type=int, default=1000, help='Точек истории на товар')
+    parser.add_argument('--sample', type=int, default=200, help='Товаров для расчета циклом')
+    parser.add_argument('--batch', type=int, default=1000, help='Товаров во фрагменте истории')
+    args = parser.parse_args()
+
+    from src.services.analytics import price_metrics
+
+    rng = np.random.default_rng(1)
+    vectorized = 0.0
+    for first in range(0, args.products, args.batch):
+        history = generate(first, min(args.batch, args.products - first), args.points, rng)
+        started = time.perf_counter()
+        price_metrics(history, NOW, WINDOWS)
+        vectorized += time.perf_counter() - started
+
+    sample = generate(0, args.sample, args.points, rng)
+    started = time.perf_counter()
+    loop_metrics(sample)
+    looped = (time.perf_counter() - started) * args.products / args.sample
+
+    print(f"{args.products} товаров × {args.points} точек:")
+    print(f"  векторизованно: {vectorized:.2f} с")
+    print(f"  циклом по товарам (оценка по {args.sample}): {looped:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Задержка обработчиков при одновременных пользователях: синхронный DatabaseService
+против AsyncDatabaseService
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_db_latency --users 50 --requests 20
+
+Каждый пользователь последовательно выполняет запросы обработчика списка
+товаров (get_user_products и get_product_by_url). Параллельно с ними цикл
+событий опрашивается каждые 10 мс: задержка опроса показывает, насколько
+запросы к базе блокируют остальных пользователей. Замер идет на отдельной
+временной базе SQLite, если не указан --database.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+# Интервал опроса цикла событий, секунды
+TICK = 0.01
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Значение, не превышаемое долей share замеров"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def measure(handler: Callable[[int], Awaitable[None]], users: int, requests: int) -> dict:
+    """Одновременная работа users пользователей и замер задержки цикла событий"""
+    latencies: List[float] = []
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started - TICK)
+
+    async def user(index: int):
+        for _ in range(requests):
+            started = time.perf_counter()
+            await handler(index)
+            latencies.append(time.perf_counter() - started)
+
+    monitor = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    await asyncio.gather(*(user(index) for index in range(users)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await monitor
+
+    return {
+        'elapsed': elapsed,
+        'p50': statistics.median(latencies),
+        'p95': percentile(latencies, 0.95),
+        'lag_max': max(lags, default=0.0),
+        'lag_p95': percentile(lags, 0.95) if lags else 0.0
+    }
+
+
+def seed(database_url: str, users: int, products: int):
+    """Пользователи и товары для замера"""
+    from src.models.models import init_db
+    from src.services.database import DatabaseService
+
+    init_db(database_url)
+    for index in range(users):
+        telegram_id = 1000 + index
+        if DatabaseService.get_user(telegram_id):
+            continue
+        DatabaseService.create_user(telegram_id, f"bench{index}")
+        for number in range(products):
+            DatabaseService.add_product(
+                telegram_id,
+                f"https://www.wildberries.ru/catalog/{number + 1}/detail.aspx",
+                'wildberries', f"Товар {number}", 100.0 + number, 120.0 + number
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help='Одновременных пользователей')
+    parser.add_argument('--requests', type=int, default=20, help='Запросов на пользователя')
+    parser.add_argument('--products', type=int, default=20, help='Товаров у пользователя')
+    parser.add_argument('--database', help='URL базы данных, по умолчанию временная SQLite')
+    args = parser.parse_args()
+
+    database_url = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # Модули базы данных читают DATABASE_URL при импорте
+    os.environ['DATABASE_URL'] = database_url
+
+    from src.services.async_database import AsyncDatabaseService, dispose_async_engine
+    from src.services.database import DatabaseService
+
+    seed(database_url, args.users, args.products)
+    probe_url = f"https://www.wildberries.ru/catalog/{args.products}/detail.aspx?targeting=1"
+
+    async def sync_handler(index: int):
+        # Старое поведение: синхронные запросы прямо в обработчике
+        DatabaseService.get_user_products(1000 + index)
+        DatabaseService.get_product_by_url(probe_url, 1000 + index)
+
+    async def async_handler(index: int):
+        await AsyncDatabaseService.get_user_products(1000 + index)
+        await AsyncDatabaseService.get_product_by_url(probe_url, 1000 + index)
+
+    async def run():
+        for title, handler in (('Синхронный DatabaseService', sync_handler),
+                               ('AsyncDatabaseService', async_handler)):
+            result = await measure(handler, args.users, args.requests)
+            total = args.users * args.requests
+            print(f"{title}: {total} запросов за {result['elapsed']:.2f} с, "
+                  f"задержка p50 {result['p50'] * 1000:.1f} мс, p95 {result['p95'] * 1000:.1f} мс, "
+                  f"блокировка цикла событий p95 {result['lag_p95'] * 1000:.1f} мс, "
+                  f"макс {result['lag_max'] * 1000:.1f} мс")
+        await dispose_async_engine()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
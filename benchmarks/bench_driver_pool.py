@@ -0,0 +1,89 @@
+"""
+Сравнение пропускной способности: запуск браузера на каждый URL против пула
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_driver_pool --limit 20 --pool-size 2
+
+С флагом --profiles дополнительно сравниваются полный и облегченный
+профили браузера: время и трафик на страницу.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List
+
+from src.services.driver_pool import DriverPool, ResourceStats, create_chrome_driver
+
+
+def read_links(filename: str, limit: int) -> List[str]:
+    """Чтение первых ссылок из файла"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        links = [line.strip() for line in f if line.strip()]
+    return links[:limit]
+
+
+def bench_launch_per_url(urls: List[str]) -> float:
+    """Старое поведение: новый браузер на каждую страницу"""
+    started = time.perf_counter()
+    for url in urls:
+        driver = create_chrome_driver()
+        try:
+            driver.get(url)
+        finally:
+            driver.quit()
+    return time.perf_counter() - started
+
+
+def bench_pool(urls: List[str], pool_size: int, lightweight: bool = False,
+               stats: ResourceStats = None) -> float:
+    """Браузеры из пула, страницы обрабатываются pool_size потоками"""
+    factory = partial(create_chrome_driver, lightweight=lightweight, collect_stats=stats is not None)
+    pool = DriverPool(size=pool_size, driver_factory=factory, resource_stats=stats or ResourceStats())
+
+    def load(url: str):
+        with pool.acquire() as driver:
+            driver.get(url)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            list(executor.map(load, urls))
+        return time.perf_counter() - started
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', default='links.txt', help='Файл со ссылками')
+    parser.add_argument('--limit', type=int, default=20, help='Количество страниц')
+    parser.add_argument('--pool-size', type=int, default=2, help='Размер пула браузеров')
+    parser.add_argument('--profiles', action='store_true', help='Сравнить полный и облегченный профили')
+    args = parser.parse_args()
+
+    urls = read_links(args.links, args.limit)
+    if not urls:
+        print("Нет ссылок для замера")
+        return
+
+    for title, run in (
+        ('Запуск на каждый URL', lambda: bench_launch_per_url(urls)),
+        (f'Пул из {args.pool_size} браузеров', lambda: bench_pool(urls, args.pool_size)),
+    ):
+        elapsed = run()
+        print(f"{title}: {len(urls)} страниц за {elapsed:.1f} с, "
+              f"{len(urls) / elapsed * 60:.1f} страниц/мин")
+
+    if args.profiles:
+        for title, lightweight in (('Полный профиль', False), ('Облегченный профиль', True)):
+            stats = ResourceStats()
+            elapsed = bench_pool(urls, args.pool_size, lightweight=lightweight, stats=stats)
+            snapshot = stats.snapshot()
+            print(f"{title}: {elapsed / len(urls):.2f} с/страница, "
+                  f"{snapshot['kb_per_page']} КБ/страница, "
+                  f"заблокировано запросов {sum(snapshot['blocked'].values())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Размер истории цен и скорость запросов до и после сжатия в периоды изменения
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_price_history --items 500 --polls 200 --change-rate 0.05
+
+История заполняется как раньше - запись на каждое обновление, цена меняется
+с вероятностью --change-rate. Затем история сжимается и замеры повторяются.
+Если указан --database, замер выполняется на копии существующей базы.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+
+def seed(engine, items: int, polls: int, change_rate: float):
+    """Записи истории по старой схеме: одна на каждое обновление"""
+    from src.models.models import CatalogItem, PriceHistory
+
+    started_at = datetime.utcnow() - timedelta(hours=polls)
+    with engine.begin() as conn:
+        conn.execute(insert(CatalogItem), [
+            {
+                'product_key': f"wildberries:{index}",
+                'platform': 'wildberries',
+                'sku': str(index),
+                'url': f"https://www.wildberries.ru/catalog/{index}/detail.aspx",
+                'name': f"Товар {index}",
+                'current_price': 100.0,
+                'original_price': 120.0
+            }
+            for index in range(1, items + 1)
+        ])
+        for index in range(1, items + 1):
+            price = 100.0
+            rows = []
+            for poll in range(polls):
+                if random.random() < change_rate:
+                    price = round(price * random.uniform(0.8, 1.2), 2)
+                timestamp = started_at + timedelta(hours=poll)
+                rows.append({
+                    'catalog_item_id': index, 'price': price,
+                    'timestamp': timestamp, 'last_confirmed': timestamp, 'confirmations': 1
+                })
+            conn.execute(insert(PriceHistory), rows)
+
+
+def measure(engine, items: int) -> dict:
+    """Количество записей и время выборки истории каждого товара"""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT COUNT(*) FROM price_history")).scalar()
+        started = time.perf_counter()
+        for item_id in range(1, items + 1):
+            conn.execute(
+                text("SELECT price, timestamp, last_confirmed FROM price_history "
+                     "WHERE catalog_item_id = :id ORDER BY timestamp DESC"),
+                {'id': item_id}
+            ).fetchall()
+        elapsed = time.perf_counter() - started
+    return {'rows': rows, 'query_time': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=500, help='Товаров каталога')
+    parser.add_argument('--polls', type=int, default=200, help='Обновлений цены каждого товара')
+    parser.add_argument('--change-rate', type=float, default=0.05, help='Вероятность изменения цены')
+    parser.add_argument('--database', help='Файл существующей базы SQLite для замера на копии')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    if args.database:
+        shutil.copy(args.database, path)
+    database_url = f"sqlite:///{path}"
+    # Модули базы данных читают DATABASE_URL при импорте
+    os.environ['DATABASE_URL'] = database_url
+
+    from src.models.models import init_db
+    from src.services.db_engine import get_engine
+    from src.services.price_history import compact_price_history
+
+    init_db(database_url)
+    engine = get_engine(database_url)
+    if not args.database:
+        seed(engine, args.items, args.polls, args.change_rate)
+    with engine.connect() as conn:
+        items = conn.execute(text("SELECT COUNT(*) FROM catalog_items")).scalar()
+
+    before = measure(engine, items)
+    started = time.perf_counter()
+    stats = compact_price_history(engine)
+    compaction_time = time.perf_counter() - started
+    after = measure(engine, items)
+
+    print(f"До сжатия: записей {before['rows']}, выборка истории {items} товаров "
+          f"за {before['query_time'] * 1000:.0f} мс")
+    print(f"Сжатие: удалено {stats['deleted']} записей за {compaction_time:.2f} с")
+    print(f"После сжатия: записей {after['rows']} ({after['rows'] / max(1, before['rows']):.1%}), "
+          f"выборка за {after['query_time'] * 1000:.0f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Время записи цикла обновления цен: транзакция на товар против пакетной записи
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_price_writer --items 2000 --batch-size 500
+
+Замер идет на временной базе SQLite, если не указан --database.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+def seed(database_url: str, items: int):
+    """Товары каталога для замера"""
+    from sqlalchemy import insert
+    from src.models.models import CatalogItem, init_db
+    from src.services.db_engine import get_engine
+
+    init_db(database_url)
+    with get_engine(database_url).begin() as conn:
+        conn.execute(insert(CatalogItem), [
+            {
+                'product_key': f"wildberries:{index}",
+                'platform': 'wildberries',
+                'sku': str(index),
+                'url': f"https://www.wildberries.ru/catalog/{index}/detail.aspx",
+                'name': f"Товар {index}",
+                'current_price': 100.0,
+                'original_price': 120.0
+            }
+            for index in range(1, items + 1)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000, help='Товаров в цикле обновления')
+    parser.add_argument('--batch-size', type=int, default=500, help='Размер пакета записи')
+    parser.add_argument('--database', help='URL базы данных, по умолчанию временная SQLite')
+    args = parser.parse_args()
+
+    database_url = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # Модули базы данных читают DATABASE_URL при импорте
+    os.environ['DATABASE_URL'] = database_url
+
+    from src.services.async_database import AsyncDatabaseService, dispose_async_engine
+    from src.services.database import DatabaseService
+    from src.services.price_writer import PriceUpdateWriter
+
+    seed(database_url, args.items)
+    item_ids = list(range(1, args.items + 1))
+
+    def prices():
+        return [(item_id, round(random.uniform(50, 150), 2)) for item_id in item_ids]
+
+    started = time.perf_counter()
+    for item_id, price in prices():
+        DatabaseService.update_catalog_price(item_id, price)
+    per_item = time.perf_counter() - started
+
+    async def run():
+        started = time.perf_counter()
+        for item_id, price in prices():
+            await AsyncDatabaseService.update_catalog_price(item_id, price)
+        async_per_item = time.perf_counter() - started
+
+        writer = PriceUpdateWriter(AsyncDatabaseService.update_catalog_prices, batch_size=args.batch_size)
+        started = time.perf_counter()
+        for item_id, price in prices():
+            await writer.add(item_id, price)
+        await writer.flush()
+        batched = time.perf_counter() - started
+
+        await dispose_async_engine()
+        return async_per_item, batched, writer.stats['batches']
+
+    async_per_item, batched, batches = asyncio.run(run())
+    print(f"Транзакция на товар (DatabaseService): {args.items} цен за {per_item:.2f} с")
+    print(f"Транзакция на товар (AsyncDatabaseService): {args.items} цен за {async_per_item:.2f} с")
+    print(f"Пакетная запись: {args.items} цен за {batched:.2f} с, пакетов {batches}, "
+          f"быстрее в {async_per_item / batched:.0f} раз")
+
+
+if __name__ == '__main__':
+    main()
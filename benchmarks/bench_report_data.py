@@ -0,0 +1,89 @@
+"""
+Загрузка истории цен для отчета: запрос на каждый товар и один общий запрос
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_report_data --products 2000 --runs 20
+
+У пользователя --products товаров, у каждого --runs периодов цены за
+последние дни (уровень сырых записей). Сравнивается прежний путь отчета
+(DatabaseService.get_price_series для каждого товара) и load_price_frame.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+
+def seed(engine, products: int, runs: int):
+    """Пользователь с подписками на товары каталога и периодами их цен"""
+    from src.models.models import CatalogItem, PriceHistory, Subscription, User
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'telegram_id': 1, 'username': 'bench'}])
+        conn.execute(insert(CatalogItem), [
+            {
+                'product_key': f"wildberries:{index}",
+                'platform': 'wildberries',
+                'sku': str(index),
+                'url': f"https://www.wildberries.ru/catalog/{index}/detail.aspx",
+                'name': f"Товар {index}",
+                'current_price': 100.0,
+                'original_price': 120.0
+            }
+            for index in range(1, products + 1)
+        ])
+        conn.execute(insert(Subscription), [
+            {'user_id': 1, 'catalog_item_id': index, 'url': None} for index in range(1, products + 1)
+        ])
+        conn.execute(insert(PriceHistory), [
+            {
+                'catalog_item_id': index,
+                'price': 100.0 + run,
+                'timestamp': now - timedelta(hours=2 * (runs - run)),
+                'last_confirmed': now - timedelta(hours=2 * (runs - run) - 1),
+                'confirmations': 2
+            }
+            for index in range(1, products + 1)
+            for run in range(runs)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000, help='Товаров пользователя')
+    parser.add_argument('--runs', type=int, default=20, help='Периодов цены каждого товара')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    database_url = f"sqlite:///{path}"
+    # Модули базы данных читают DATABASE_URL при импорте
+    os.environ['DATABASE_URL'] = database_url
+
+    from src.models.models import init_db
+    from src.services.database import DatabaseService, engine
+    from src.services.report_data import load_price_frame
+
+    init_db(database_url)
+    seed(engine, args.products, args.runs)
+    start = datetime.utcnow() - timedelta(days=5)
+
+    started = time.perf_counter()
+    points = 0
+    for product in DatabaseService.get_user_products(1):
+        points += len(DatabaseService.get_price_series(product['id'], start)['points'])
+    per_product = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _, frame = load_price_frame(engine, 1, start)
+    bulk = time.perf_counter() - started
+
+    print(f"Запрос на каждый товар: {points} точек за {per_product:.2f} с")
+    print(f"Один запрос: {len(frame)} точек за {bulk:.2f} с ({per_product / max(bulk, 1e-9):.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
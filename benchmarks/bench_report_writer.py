@@ -0,0 +1,77 @@
+"""
+Пиковая память при записи листа истории цен: pd.ExcelWriter и ReportWriter
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_report_writer --rows 20000 80000
+
+Для pd.ExcelWriter история строится целиком в DataFrame, ReportWriter
+получает ее фрагментами, как из курсора базы. Память измеряется
+tracemalloc, каждый замер выполняется в отдельном процессе.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 5000
+
+
+def make_chunk(offset: int, size: int) -> pd.DataFrame:
+    """Фрагмент истории цен"""
+    index = np.arange(offset, offset + size)
+    return pd.DataFrame({
+        'Товар': [f"Товар {value % 1000}" for value in index],
+        'Цена': 100 + (index % 50).astype(float),
+        'Мин': 90 + (index % 50).astype(float),
+        'Макс': 110 + (index % 50).astype(float),
+        'Средняя': 100 + (index % 50).astype(float),
+        'Дата': pd.Timestamp(datetime(2024, 1, 1)) + pd.to_timedelta(index, unit='h'),
+    })
+
+
+def chunks(rows: int):
+    for offset in range(0, rows, CHUNK_SIZE):
+        yield make_chunk(offset, min(CHUNK_SIZE, rows - offset))
+
+
+def run(mode: str, rows: int, queue):
+    from src.services.report_writer import ReportWriter
+
+    path = os.path.join(tempfile.mkdtemp(), 'report')
+    tracemalloc.start()
+    started = time.perf_counter()
+    if mode == 'pandas':
+        frame = pd.concat(chunks(rows), ignore_index=True)
+        with pd.ExcelWriter(f"{path}.xlsx", engine='openpyxl') as writer:
+            frame.to_excel(writer, sheet_name='История цен', index=False)
+    else:
+        with ReportWriter(path, mode) as writer:
+            writer.write_sheet('История цен', list(make_chunk(0, 1).columns), chunks(rows))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    queue.put((peak, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 80000], help='Строк истории')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        for mode in ('pandas', 'xlsx', 'csv'):
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run, args=(mode, rows, queue))
+            process.start()
+            peak, elapsed = queue.get()
+            process.join()
+            print(f"{rows} строк, {mode}: пик памяти {peak / 2 ** 20:.1f} МБ, {elapsed:.1f} с")
+
+
+if __name__ == '__main__':
+    main()
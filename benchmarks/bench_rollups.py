@@ -0,0 +1,84 @@
+"""
+Время выборки истории за длинный период из сырых записей и из дневных агрегатов
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_rollups --items 50 --days 30 90 365
+
+Для каждого срока истории заполняется отдельная база с записью на каждый
+час (цена меняется при каждом обновлении - худший случай для сжатия в
+периоды), затем для всех товаров выбирается история за весь срок.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+
+
+def seed(engine, items: int, days: int):
+    """Почасовая история с изменением цены на каждом обновлении"""
+    from src.services.rollups import _history
+
+    started_at = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        for item_id in range(1, items + 1):
+            rows = []
+            for hour in range(days * 24):
+                timestamp = started_at + timedelta(hours=hour)
+                rows.append({
+                    'catalog_item_id': item_id, 'price': round(random.uniform(80, 120), 2),
+                    'timestamp': timestamp, 'last_confirmed': timestamp, 'confirmations': 1
+                })
+            conn.execute(insert(_history), rows)
+
+
+def measure(engine, items: int, query: str) -> float:
+    """Время выборки истории всех товаров"""
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        for item_id in range(1, items + 1):
+            conn.execute(text(query), {'id': item_id}).fetchall()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=50, help='Товаров каталога')
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 90, 365], help='Сроки накопленной истории')
+    args = parser.parse_args()
+
+    from src.services.rollups import backfill_rollups
+
+    for days in args.days:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE price_history (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, price FLOAT, "
+                "timestamp DATETIME, last_confirmed DATETIME, confirmations INTEGER)"
+            ))
+            conn.execute(text("CREATE INDEX idx_history_item ON price_history (catalog_item_id, timestamp)"))
+            conn.execute(text(
+                "CREATE TABLE price_rollups (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, granularity VARCHAR, "
+                "bucket_start DATETIME, open FLOAT, high FLOAT, low FLOAT, close FLOAT, count INTEGER, "
+                "total FLOAT, closed_at DATETIME)"
+            ))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX idx_rollup_item_bucket ON price_rollups (catalog_item_id, granularity, bucket_start)"
+            ))
+        seed(engine, args.items, days)
+        backfill_rollups(engine)
+
+        raw = measure(engine, args.items,
+                      "SELECT price, timestamp FROM price_history WHERE catalog_item_id = :id ORDER BY timestamp")
+        daily = measure(engine, args.items,
+                        "SELECT bucket_start, open, high, low, close, count, total FROM price_rollups "
+                        "WHERE catalog_item_id = :id AND granularity = 'day' ORDER BY bucket_start")
+        print(f"{days} дн.: сырые записи {raw * 1000:.0f} мс, дневные агрегаты {daily * 1000:.0f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Одновременные чтение и запись SQLite: движок по умолчанию против настроенного
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sqlite --writers 4 --readers 8 --seconds 5
+
+Писатели добавляют записи истории цен и обновляют цену товара, читатели
+выбирают историю случайного товара - как обновление цен и обработчики бота.
+Для каждого движка выводится число операций и ошибок "database is locked".
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.services.db_engine import create_database_engine
+
+ITEMS = 500
+
+
+def prepare(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE catalog_items (id INTEGER PRIMARY KEY, current_price FLOAT, last_updated TEXT)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE price_history (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, "
+            "price FLOAT, timestamp TEXT)"
+        ))
+        conn.execute(text("CREATE INDEX idx_item_timestamp ON price_history (catalog_item_id, timestamp)"))
+        conn.execute(
+            text("INSERT INTO catalog_items (id, current_price) VALUES (:id, 100)"),
+            [{'id': index} for index in range(1, ITEMS + 1)]
+        )
+
+
+def run(engine, writers: int, readers: int, seconds: float) -> dict:
+    stats = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def count(key: str):
+        with lock:
+            stats[key] += 1
+
+    def writer():
+        while time.perf_counter() < stop_at:
+            item_id = random.randint(1, ITEMS)
+            price = random.uniform(50, 150)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("UPDATE catalog_items SET current_price = :price, last_updated = datetime('now') "
+                             "WHERE id = :id"),
+                        {'price': price, 'id': item_id}
+                    )
+                    conn.execute(
+                        text("INSERT INTO price_history (catalog_item_id, price, timestamp) "
+                             "VALUES (:id, :price, datetime('now'))"),
+                        {'price': price, 'id': item_id}
+                    )
+                count('writes')
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                count('locked')
+
+    def reader():
+        while time.perf_counter() < stop_at:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT price, timestamp FROM price_history WHERE catalog_item_id = :id "
+                             "ORDER BY timestamp DESC LIMIT 100"),
+                        {'id': random.randint(1, ITEMS)}
+                    ).fetchall()
+                count('reads')
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                count('locked')
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4, help='Потоков записи')
+    parser.add_argument('--readers', type=int, default=8, help='Потоков чтения')
+    parser.add_argument('--seconds', type=float, default=5, help='Длительность замера для каждого движка')
+    args = parser.parse_args()
+
+    pool = {'pool_size': args.writers + args.readers, 'max_overflow': 0}
+    for title, factory in (
+        ('Движок по умолчанию', lambda url: create_engine(url, **pool)),
+        ('WAL и настройки соединений', lambda url: create_database_engine(url, **pool)),
+    ):
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        engine = factory(url)
+        prepare(engine)
+        stats = run(engine, args.writers, args.readers, args.seconds)
+        engine.dispose()
+        print(f"{title}: записей {stats['writes'] / args.seconds:.0f}/с, "
+              f"чтений {stats['reads'] / args.seconds:.0f}/с, "
+              f"ошибок 'database is locked' {stats['locked']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,11 @@ from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMar
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
-from companies_data import CompanyDataParser
+from src.services.parser import ParserService
+from src.services.results_sink import to_parsed_record
+from src.services.scrape_executor import ScrapeRejected
+from src.services.report_writer import ReportWriter, frame_chunks
+from src.config.config import REPORT_QUERY_CHUNK_SIZE
 import pandas as pd
 from datetime import datetime
 import os
@@ -30,6 +34,9 @@ bot = Bot(token=BOT_TOKEN)
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
+# Парсер товаров с общим кэшем результатов
+parser_service = ParserService()
+
 # Состояния FSM
 class ProductStates(StatesGroup):
     waiting_for_link = State()
@@ -259,11 +266,11 @@ async def download_analysis(message: types.Message):
         # Добавляем дату анализа
         df['date_analyzed'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        # Сохраняем в Excel
-        filename = f'analysis_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        
+        # Сохраняем в Excel потоковой записью, строки не копятся в книге
         try:
-            df.to_excel(filename, index=True, engine='openpyxl')
+            with ReportWriter(f'analysis_{datetime.now().strftime("%Y%m%d_%H%M%S")}', 'xlsx') as writer:
+                writer.write_sheet('Sheet1', list(df.columns), frame_chunks(df, REPORT_QUERY_CHUNK_SIZE))
+            filename = writer.path
             
             # Отправляем файл
             from aiogram.types import FSInputFile
@@ -343,7 +350,6 @@ async def process_link(message: types.Message, state: FSMContext):
         )
         
         # Парсинг товара
-        parser = CompanyDataParser()
         try:
             # Определяем платформу
             platform = "Wildberries" if "wildberries" in link else "Ozon"
@@ -356,8 +362,11 @@ async def process_link(message: types.Message, state: FSMContext):
                 parse_mode="Markdown"
             )
             
-            # Парсим данные
-            data = parser.parse_wb_page(link) if 'wildberries' in link else parser.parse_ozon_page(link)
+            # Парсим данные, недавно полученный товар берется из кэша
+            product_data = await parser_service.parse_product(link)
+            if not product_data:
+                raise ValueError("Не удалось получить данные о товаре")
+            data = to_parsed_record(link, product_data)
             
             # Сохраняем данные
             current_data = read_parsed_data()
@@ -379,6 +388,12 @@ async def process_link(message: types.Message, state: FSMContext):
                 parse_mode="Markdown"
             )
             
+        except ScrapeRejected:
+            await status_message.edit_text(
+                "⏳ *Сейчас обрабатывается слишком много товаров.*\n\n"
+                "Пожалуйста, отправьте ссылку еще раз через пару минут",
+                parse_mode="Markdown"
+            )
         except Exception as e:
             logging.error(f"Ошибка при парсинге товара: {str(e)}")
             await status_message.edit_text(
@@ -400,6 +415,9 @@ async def main():
         await dp.start_polling(bot)
     except Exception as e:
         logging.error(f"Ошибка при работе бота: {str(e)}")
+    finally:
+        await parser_service.http.close()
+        parser_service.executor.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import asyncio
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
@@ -13,6 +14,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import os
+from src.services.driver_pool import DriverPool, USER_AGENTS, get_driver_pool
+from src.services.http_client import http_client
+from src.services.parser import ParserService
+from src.services.rate_limiter import rate_limiter
 
 # Настройка логирования
 logging.basicConfig(
@@ -24,17 +29,6 @@ logging.basicConfig(
     ]
 )
 
-# Список реалистичных User-Agent'ов
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3.1 Safari/605.1.15',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0'
-]
-
 # Создаем глобальный экземпляр парсера
 parser = None
 
@@ -68,6 +62,9 @@ def get_company_data(url: str) -> Dict[str, any]:
         def parse_price(price_str: str) -> float:
             if not price_str:
                 return 0
+            # Быстрый путь и браузер уже возвращают цены числами
+            if isinstance(price_str, (int, float)):
+                return float(price_str)
             # Удаляем все символы кроме цифр
             digits = ''.join(filter(str.isdigit, price_str))
             return float(digits) if digits else 0
@@ -89,78 +86,21 @@ def get_company_data(url: str) -> Dict[str, any]:
         raise
 
 class CompanyDataParser:
-    def __init__(self):
+    def __init__(self, driver_pool: Optional[DriverPool] = None, service: Optional[ParserService] = None):
         self.session = requests.Session()
-        self.driver = None
-        
-    def _init_driver(self):
-        """Инициализация драйвера Chrome"""
-        if self.driver is None:
-            try:
-                options = uc.ChromeOptions()
-                
-                # Базовые настройки
-                options.add_argument('--no-sandbox')
-                options.add_argument('--disable-dev-shm-usage')
-                options.add_argument('--disable-gpu')
-                options.add_argument('--disable-infobars')
-                options.add_argument('--disable-notifications')
-                options.add_argument('--disable-popup-blocking')
-                options.add_argument('--disable-blink-features=AutomationControlled')
-                
-                # Установка User-Agent
-                user_agent = random.choice(USER_AGENTS)
-                options.add_argument(f'user-agent={user_agent}')
-                
-                # Дополнительные настройки для обхода защиты
-                options.add_argument('--disable-blink-features')
-                options.add_argument('--disable-extensions')
-                options.add_argument('--disable-plugins-discovery')
-                options.add_argument('--disable-plugins')
-                options.add_argument('--disable-web-security')
-                options.add_argument('--ignore-certificate-errors')
-                
-                # Настройки для эмуляции реального браузера
-                options.add_argument('--window-size=1920,1080')
-                options.add_argument('--start-maximized')
-                
-                # Создание директории для профиля Chrome
-                profile_dir = os.path.join(os.getcwd(), 'chrome_profile')
-                if not os.path.exists(profile_dir):
-                    os.makedirs(profile_dir)
-                options.add_argument(f'--user-data-dir={profile_dir}')
-                
-                # Инициализация драйвера
-                self.driver = uc.Chrome(
-                    options=options,
-                    browser_executable_path='/usr/bin/chromium',  # путь к Chromium
-                    suppress_welcome=True,  # Отключение приветственного экрана
-                    use_subprocess=True  # Использование подпроцесса
-                )
-                
-                # Установка таймаутов
-                self.driver.set_page_load_timeout(30)
-                self.driver.implicitly_wait(10)
-                
-                # Установка размера окна
-                self.driver.set_window_size(1920, 1080)
-                
-            except Exception as e:
-                logging.error(f"Ошибка при инициализации драйвера: {str(e)}")
-                if self.driver:
-                    self.driver.quit()
-                self.driver = None
-                raise
-            
-    def _close_driver(self):
-        """Закрытие драйвера Chrome"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except Exception as e:
-                logging.error(f"Ошибка при закрытии драйвера: {str(e)}")
-            finally:
-                self.driver = None
+        # Браузеры берутся из общего пула и не закрываются после каждой страницы
+        self.driver_pool = driver_pool or get_driver_pool()
+        # Загрузка та же, что у бота: сначала HTTP, браузер - только если данных нет
+        self.service = service or ParserService()
+        self.service.driver_pool = self.driver_pool
+        # Свой цикл событий: HTTP-сессия переиспользуется между страницами
+        self._loop = asyncio.new_event_loop()
+
+    def close(self):
+        """Закрытие HTTP-сессии и цикла событий"""
+        if not self._loop.is_closed():
+            self._loop.run_until_complete(http_client.close())
+            self._loop.close()
 
     def _get_headers(self) -> Dict[str, str]:
         """Генерирует случайные заголовки для запроса"""
@@ -186,137 +126,61 @@ class CompanyDataParser:
         """Выполняет HTTP запрос с повторными попытками"""
         for attempt in range(max_retries):
             try:
-                # Случайная задержка перед запросом
-                time.sleep(random.uniform(3, 7))
+                # Очередь к хосту общая для всех потоков, после 429/5xx она замедляется
+                rate_limiter.acquire_sync(url)
                 response = self.session.get(url, headers=self._get_headers(), timeout=15)
+                rate_limiter.report(url, response.status_code, response.headers.get('Retry-After'))
                 response.raise_for_status()
                 return response.text
             except requests.RequestException as e:
                 logging.error(f"Ошибка при запросе {url}: {str(e)}")
-                if attempt < max_retries - 1:
-                    # Увеличенная задержка между повторными попытками
-                    time.sleep(random.uniform(5, 10))
                 continue
         return None
 
+    def _parse_page(self, url: str, platform: str, platform_name: str) -> Dict[str, str]:
+        """Загрузка товара: HTTP-запрос, браузер из пула - только если быстрый путь не дал данных"""
+        data = {
+            'url': url,
+            'platform': platform_name,
+            'product_name': '',
+            'price_with_discount': '',
+            'price_without_discount': ''
+        }
+        
+        product = self._loop.run_until_complete(self.service.fetcher.fetch(url, platform))
+        data.update({
+            'product_name': product['name'],
+            'price_with_discount': product['current_price'],
+            'price_without_discount': product['original_price']
+        })
+        logging.info(f"Название товара: {data['product_name']}")
+        logging.info(f"Цена со скидкой: {data['price_with_discount']}")
+        logging.info(f"Цена без скидки: {data['price_without_discount']}")
+        logging.info(f"Данные получены через {product['tier']}")
+        
+        return data
+
     def parse_ozon_page(self, url: str) -> Dict[str, str]:
         """Парсинг страницы товара на Ozon"""
         try:
-            self._init_driver()
-            self.driver.get(url)
-            time.sleep(random.uniform(2, 3))  # Увеличиваем начальную задержку
-            
-            data = {
-                'url': url,
-                'platform': 'Ozon',
-                'product_name': '',
-                'price_with_discount': '',
-                'price_without_discount': ''
-            }
-            
-            try:
-                # Ожидание и извлечение названия товара
-                try:
-                    name_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[1]/div[1]/div[2]/div/div/div/div[1]/h1'))
-                    )
-                    if name_elem:
-                        data['product_name'] = name_elem.text.strip()
-                        logging.info(f"Название товара: {data['product_name']}")
-                except Exception as e:
-                    logging.error(f"Не удалось получить название товара: {str(e)}")
-                
-                # Ожидание и извлечение цены со скидкой
-                try:
-                    price_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[2]/div/div/div[1]/div[2]/div/div[1]/div/div/div[1]/div[1]/button/span/div/div[1]/div/div/span'))
-                    )
-                    if price_discount_elem:
-                        data['price_with_discount'] = price_discount_elem.text.strip()
-                        logging.info(f"Цена со скидкой: {data['price_with_discount']}")
-                except Exception as e:
-                    logging.debug(f"Не удалось получить цену со скидкой: {str(e)}")
-                
-                # Ожидание и извлечение цены без скидки
-                try:
-                    price_no_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[2]/div/div/div[1]/div[2]/div/div[1]/div/div/div[1]/div[2]/div/div[1]/span'))
-                    )
-                    if price_no_discount_elem:
-                        data['price_without_discount'] = price_no_discount_elem.text.strip()
-                        logging.info(f"Цена без скидки: {data['price_without_discount']}")
-                except Exception as e:
-                    logging.debug(f"Не удалось получить цену без скидки: {str(e)}")
-                
-            except Exception as e:
-                logging.error(f"Ошибка при извлечении данных товара: {str(e)}")
-            
-            return data
+            return self._parse_page(url, 'ozon', 'Ozon')
         except Exception as e:
             logging.error(f"Ошибка при парсинге страницы Ozon: {str(e)}")
             raise
-        finally:
-            self._close_driver()
 
     def parse_wb_page(self, url: str) -> Dict[str, str]:
         """Парсинг страницы товара на Wildberries"""
         try:
-            self._init_driver()
-            self.driver.get(url)
-            time.sleep(random.uniform(2, 3))  # Увеличиваем начальную задержку
-            
-            data = {
+            return self._parse_page(url, 'wildberries', 'Wildberries')
+        except Exception as e:
+            logging.error(f"Ошибка при парсинге страницы Wildberries {url}: {str(e)}")
+            return {
                 'url': url,
                 'platform': 'Wildberries',
                 'product_name': '',
                 'price_with_discount': '',
                 'price_without_discount': ''
             }
-            
-            try:
-                # Ожидание и извлечение названия товара
-                try:
-                    name_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, 'product-page__header'))
-                    )
-                    if name_elem:
-                        data['product_name'] = name_elem.text.strip()
-                        logging.info(f"Название товара: {data['product_name']}")
-                except Exception as e:
-                    logging.error(f"Не удалось получить название товара: {str(e)}")
-                
-                # Ожидание и извлечение цены со скидкой
-                try:
-                    price_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/main/div[2]/div[2]/div[3]/div/div[3]/div[13]/div/div[1]/div[1]/div/div/div/p/span/span'))
-                    )
-                    if price_discount_elem:
-                        data['price_with_discount'] = price_discount_elem.text.strip()
-                        logging.info(f"Цена со скидкой: {data['price_with_discount']}")
-                except Exception as e:
-                    logging.debug(f"Не удалось получить цену со скидкой: {str(e)}")
-                
-                # Ожидание и извлечение цены без скидки
-                try:
-                    price_no_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/main/div[2]/div[2]/div[3]/div/div[3]/div[13]/div/div[1]/div[1]/div/div/div/p/span/ins'))
-                    )
-                    if price_no_discount_elem:
-                        data['price_without_discount'] = price_no_discount_elem.text.strip()
-                        logging.info(f"Цена без скидки: {data['price_without_discount']}")
-                except Exception as e:
-                    logging.debug(f"Не удалось получить цену без скидки: {str(e)}")
-                
-            except Exception as e:
-                logging.error(f"Ошибка при извлечении данных товара: {str(e)}")
-            
-            return data
-            
-        except Exception as e:
-            logging.error(f"Ошибка при парсинге страницы Wildberries {url}: {str(e)}")
-            return data
-        finally:
-            self._close_driver()
 
     def process_excel_data(self, excel_path: str) -> pd.DataFrame:
         """Обрабатывает данные из Excel файла"""
@@ -341,25 +205,20 @@ class CompanyDataParser:
                         company_data[f'Ozon_Товар_{i}'] = name
                     del ozon_data['product_names']  # Удаляем список из данных
                 company_data.update({f'Ozon_{k}': v for k, v in ozon_data.items()})
-                # Увеличенная задержка между запросами
-                time.sleep(random.uniform(8, 15))
             
             # Парсинг Wildberries
             if pd.notna(row['Ссылка.1']):
                 wb_data = self.parse_wb_page(row['Ссылка.1'])
                 company_data.update({f'WB_{k}': v for k, v in wb_data.items()})
-                time.sleep(random.uniform(5, 10))
             
             results.append(company_data)
             logging.info(f"Обработана компания: {company_data['Юр. лицо']}")
-            
-            # Дополнительная задержка между компаниями
-            time.sleep(random.uniform(10, 20))
         
         return pd.DataFrame(results)
 
 def main():
     """Основная функция для запуска парсера"""
+    parser = None
     try:
         # Создаем парсер
         parser = CompanyDataParser()
@@ -396,8 +255,9 @@ def main():
         logging.error(f"Ошибка при выполнении программы: {str(e)}")
         raise
     finally:
-        if parser:
-            parser._close_driver()
+        if parser is not None:
+            parser.close()
+        get_driver_pool().close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
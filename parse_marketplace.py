@@ -1,8 +1,22 @@
+import argparse
+import asyncio
 import logging
-import time
-from companies_data import CompanyDataParser
-from typing import List, Dict
-import json
+from functools import partial
+from datetime import timedelta
+from typing import List, Dict, Optional
+from src.config.config import (
+    BATCH_CONCURRENCY,
+    BATCH_PLATFORM_CONCURRENCY,
+    DRIVER_POOL_SIZE,
+    RESULTS_JSONL_PATH,
+    RESULTS_FRESH_HOURS
+)
+from src.services.batch_runner import BatchRunner
+from src.services.driver_pool import get_driver_pool
+from src.services.parser import ParserService
+from src.services.scrape_executor import ScrapeExecutor
+from src.services.results_sink import JsonlResultsSink, to_parsed_record
+from src.utils.urls import unique_links
 
 # Настройка логирования
 logging.basicConfig(
@@ -18,56 +32,100 @@ def read_links_from_file(filename: str) -> List[str]:
     """Чтение ссылок из файла"""
     try:
         with open(filename, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
+            # Одинаковые товары с разными параметрами отслеживания обрабатываются один раз
+            return unique_links(line.strip() for line in f if line.strip())
     except Exception as e:
         logging.error(f"Ошибка при чтении файла {filename}: {str(e)}")
         return []
 
-def main():
-    # Инициализация парсера
-    parser = CompanyDataParser()
+async def parse_links(links: List[str], sink: JsonlResultsSink, concurrency: int,
+                      platform_limits: Dict[str, int], max_age: Optional[float] = None) -> int:
+    """
+    Параллельный парсинг ссылок с записью каждого результата в журнал
     
-    # Чтение ссылок из файла
-    links = read_links_from_file('links.txt')
-    if not links:
-        logging.error("Не удалось прочитать ссылки из файла")
-        return
+    Args:
+        max_age (Optional[float]): Максимальный возраст результата из кэша парсинга в секундах
     
-    # Словарь для хранения результатов
-    results = {}
+    Returns:
+        int: Количество успешно обработанных ссылок
+    """
+    def save_result(url: str, data: Optional[Dict], error: Optional[str]):
+        sink.write(url, to_parsed_record(url, data) if data else None, error)
     
-    # Обработка каждой ссылки
-    for url in links:
+    # Браузерные загрузки блокирующие, поэтому выполняются в пуле размером с пул браузеров.
+    # Одновременно в работе не больше concurrency ссылок, так что очередь не переполняется
+    executor = ScrapeExecutor(workers=DRIVER_POOL_SIZE, queue_size=concurrency)
+    try:
+        parser = ParserService(executor=executor)
+        runner = BatchRunner(
+            # Устаревшие результаты из кэша в пакетный запуск не попадают
+            partial(parser.parse_product, max_age=max_age, allow_stale=False),
+            concurrency=concurrency,
+            platform_limits=platform_limits,
+            on_result=save_result
+        )
         try:
-            logging.info(f"Обработка ссылки: {url}")
+            results = await runner.run(links)
+        finally:
+            await parser.http.close()
+        logging.info(f"Статистика загрузок: {parser.fetch_stats.summary()}")
+        logging.info(f"Повторных загрузок одного товара не понадобилось: {parser.flight.saved}")
+    finally:
+        executor.shutdown(wait=True)
+    
+    return len(results)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Парсинг товаров по ссылкам из файла")
+    arg_parser.add_argument('--links', default='links.txt', help="Файл со ссылками")
+    arg_parser.add_argument('--output', default='parsed_data.json', help="Файл с результатами")
+    arg_parser.add_argument('--journal', default=RESULTS_JSONL_PATH, help="Журнал результатов в формате JSONL")
+    arg_parser.add_argument('--fresh-hours', type=float, default=RESULTS_FRESH_HOURS,
+                            help="Не перепарсивать ссылки с успешным результатом моложе N часов")
+    arg_parser.add_argument('--restart', action='store_true',
+                            help="Игнорировать журнал и обработать все ссылки заново")
+    arg_parser.add_argument('--compact-only', action='store_true',
+                            help="Только собрать parsed_data.json из журнала")
+    arg_parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                            help="Максимум одновременных загрузок")
+    arg_parser.add_argument('--ozon-concurrency', type=int, default=BATCH_PLATFORM_CONCURRENCY['ozon'],
+                            help="Максимум одновременных загрузок с Ozon")
+    arg_parser.add_argument('--wb-concurrency', type=int, default=BATCH_PLATFORM_CONCURRENCY['wildberries'],
+                            help="Максимум одновременных загрузок с Wildberries")
+    args = arg_parser.parse_args()
+    
+    sink = JsonlResultsSink(args.journal)
+    
+    if not args.compact_only:
+        # Чтение ссылок из файла
+        links = read_links_from_file(args.links)
+        if not links:
+            logging.error("Не удалось прочитать ссылки из файла")
+            return
         
-            # Определяем маркетплейс по URL
-            if 'ozon.ru' in url:
-                data = parser.parse_ozon_page(url)
-            elif 'wildberries.ru' in url:
-                data = parser.parse_wb_page(url)
-        else:
-                logging.warning(f"Неизвестный маркетплейс для URL: {url}")
-                continue
-            
-            if data:
-                results[url] = data
-                logging.info(f"Успешно получены данные для {url}")
-        else:
-                logging.warning(f"Не удалось получить данные для {url}")
+        # Продолжение прерванного запуска: пропускаем свежие успешные результаты
+        if not args.restart:
+            pending = sink.pending(links, timedelta(hours=args.fresh_hours))
+            logging.info(f"К обработке {len(pending)} из {len(links)} ссылок, остальные уже есть в журнале")
+            links = pending
         
-            # Пауза между запросами
-            time.sleep(5)
-            
-        except Exception as e:
-            logging.error(f"Ошибка при обработке {url}: {str(e)}")
-            continue
+        platform_limits = {
+            'ozon': args.ozon_concurrency,
+            'wildberries': args.wb_concurrency
+        }
+        
+        try:
+            with sink:
+                asyncio.run(parse_links(links, sink, args.concurrency, platform_limits,
+                                        max_age=0 if args.restart else None))
+        finally:
+            # Браузеры больше не нужны
+            get_driver_pool().close()
     
-    # Сохранение результатов в JSON
+    # Сборка parsed_data.json из журнала
     try:
-        with open('parsed_data.json', 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=4)
-        logging.info("Результаты сохранены в parsed_data.json")
+        count = sink.compact(args.output)
+        logging.info(f"Результаты сохранены в {args.output}, товаров: {count}")
     except Exception as e:
         logging.error(f"Ошибка при сохранении результатов: {str(e)}")
 
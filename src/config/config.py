@@ -11,12 +11,77 @@ if not BOT_TOKEN:
 
 # Настройки базы данных
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///products.db')
+# Пул соединений асинхронного движка базы данных
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))  # постоянных соединений
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))  # временных соединений сверх пула
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))  # секунды ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # секунды жизни соединения
+# Настройки SQLite: журнал WAL, кэш страниц, отображение в память и ожидание блокировки
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '65536'))  # КиБ на соединение
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # байты
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '10000'))  # миллисекунды
+SQLITE_MAINTENANCE_INTERVAL = int(os.getenv('SQLITE_MAINTENANCE_INTERVAL', '21600'))  # секунды между ANALYZE и очисткой
+SQLITE_VACUUM_PAGES = int(os.getenv('SQLITE_VACUUM_PAGES', '2000'))  # страниц за одну инкрементальную очистку
 
 # Настройки парсинга
 PARSING_TIMEOUT = int(os.getenv('PARSING_TIMEOUT', '30'))  # секунды
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
 RETRY_DELAY = int(os.getenv('RETRY_DELAY', '5'))  # секунды
 
+# Настройки пула браузеров
+DRIVER_POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '2'))
+DRIVER_MAX_PAGES = int(os.getenv('DRIVER_MAX_PAGES', '50'))  # перезапуск браузера после N страниц
+DRIVER_MAX_RSS_MB = int(os.getenv('DRIVER_MAX_RSS_MB', '1500'))  # перезапуск при превышении памяти
+CHROME_BINARY_PATH = os.getenv('CHROME_BINARY_PATH', '/usr/bin/chromium')
+# Облегченный профиль: без картинок, стилей, шрифтов, медиа и счетчиков аналитики
+DRIVER_LIGHTWEIGHT = os.getenv('DRIVER_LIGHTWEIGHT', 'true').lower() == 'true'
+# Каталог временных профилей браузеров, по умолчанию tmpfs
+DRIVER_PROFILE_ROOT = os.getenv('DRIVER_PROFILE_ROOT', '/dev/shm' if os.path.isdir('/dev/shm') else '')
+
+# Пул браузерных загрузок: воркеры, очередь ожидания и срок выполнения задачи
+SCRAPE_WORKERS = int(os.getenv('SCRAPE_WORKERS', str(DRIVER_POOL_SIZE)))
+SCRAPE_QUEUE_SIZE = int(os.getenv('SCRAPE_QUEUE_SIZE', '20'))  # задач сверх числа воркеров
+SCRAPE_DEADLINE = int(os.getenv('SCRAPE_DEADLINE', '90'))  # секунды с момента постановки в очередь
+
+# Таймаут быстрой загрузки без браузера
+HTTP_FETCH_TIMEOUT = int(os.getenv('HTTP_FETCH_TIMEOUT', '10'))  # секунды
+
+# Общий HTTP-клиент: пул keep-alive соединений и кэш DNS
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))  # соединений всего
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '10'))  # соединений на хост
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))  # секунды
+HTTP_KEEPALIVE_TIMEOUT = int(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))  # секунды
+
+# Ограничение частоты запросов по хостам: (запросов в секунду, запас на всплеск)
+RATE_LIMIT_DEFAULT = (float(os.getenv('RATE_LIMIT_RPS', '1')), int(os.getenv('RATE_LIMIT_BURST', '3')))
+RATE_LIMIT_HOSTS = {
+    'ozon.ru': (float(os.getenv('RATE_LIMIT_OZON_RPS', '0.5')), int(os.getenv('RATE_LIMIT_OZON_BURST', '2'))),
+    'wildberries.ru': (float(os.getenv('RATE_LIMIT_WB_RPS', '1')), int(os.getenv('RATE_LIMIT_WB_BURST', '3'))),
+    'wb.ru': (float(os.getenv('RATE_LIMIT_WB_API_RPS', '5')), int(os.getenv('RATE_LIMIT_WB_API_BURST', '10'))),
+    'yandex.ru': (float(os.getenv('RATE_LIMIT_MARKET_RPS', '0.5')), int(os.getenv('RATE_LIMIT_MARKET_BURST', '2')))
+}
+
+# Настройки пакетного парсинга ссылок
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))  # одновременных загрузок всего
+BATCH_PLATFORM_CONCURRENCY = {
+    'ozon': int(os.getenv('BATCH_OZON_CONCURRENCY', '2')),
+    'wildberries': int(os.getenv('BATCH_WB_CONCURRENCY', '6'))
+}
+BATCH_PROGRESS_INTERVAL = int(os.getenv('BATCH_PROGRESS_INTERVAL', '10'))  # секунды
+RESULTS_JSONL_PATH = os.getenv('RESULTS_JSONL_PATH', 'parsed_data.jsonl')  # журнал результатов
+RESULTS_FSYNC_EVERY = int(os.getenv('RESULTS_FSYNC_EVERY', '20'))  # записей между сбросами на диск
+RESULTS_FRESH_HOURS = int(os.getenv('RESULTS_FRESH_HOURS', '24'))  # результат не перепарсивается
+
+# Кэш результатов парсинга: память (LRU) + SQLite
+SCRAPE_CACHE_PATH = os.getenv('SCRAPE_CACHE_PATH', 'scrape_cache.db')
+SCRAPE_CACHE_MEMORY_SIZE = int(os.getenv('SCRAPE_CACHE_MEMORY_SIZE', '1000'))  # записей в памяти
+SCRAPE_CACHE_TTL = {  # секунды, в течение которых результат считается свежим
+    'ozon': int(os.getenv('SCRAPE_CACHE_TTL_OZON', '1800')),
+    'wildberries': int(os.getenv('SCRAPE_CACHE_TTL_WB', '1800')),
+    'market': int(os.getenv('SCRAPE_CACHE_TTL_MARKET', '3600'))
+}
+SCRAPE_CACHE_STALE_TTL = int(os.getenv('SCRAPE_CACHE_STALE_TTL', '21600'))  # сколько еще отдавать устаревший результат
+
 # Настройки логирования
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -29,6 +94,18 @@ def validate_config():
     if not DATABASE_URL:
         raise ValueError("Не указан URL базы данных (DATABASE_URL)")
     
+    if HISTORY_RAW_RANGE_DAYS > PRICE_HISTORY_RETENTION_DAYS:
+        raise ValueError("HISTORY_RAW_RANGE_DAYS не может превышать PRICE_HISTORY_RETENTION_DAYS")
+    
+    if HISTORY_HOURLY_RANGE_DAYS > ROLLUP_HOURLY_RETENTION_DAYS:
+        raise ValueError("HISTORY_HOURLY_RANGE_DAYS не может превышать ROLLUP_HOURLY_RETENTION_DAYS")
+    
+    if REPORT_FORMAT not in ('xlsx', 'csv', 'parquet'):
+        raise ValueError("REPORT_FORMAT должен быть xlsx, csv или parquet")
+    
+    if REPORT_WORKERS < 1:
+        raise ValueError("Количество процессов генерации отчетов должно быть положительным числом")
+    
     if PARSING_TIMEOUT < 1:
         raise ValueError("Таймаут парсинга должен быть положительным числом")
     
@@ -38,6 +115,12 @@ def validate_config():
     if RETRY_DELAY < 1:
         raise ValueError("Задержка между попытками должна быть положительным числом")
     
+    if DRIVER_POOL_SIZE < 1:
+        raise ValueError("Размер пула браузеров должен быть положительным числом")
+    
+    if SCRAPE_WORKERS < 1:
+        raise ValueError("Количество воркеров парсинга должно быть положительным числом")
+    
     return True
 
 # Настройки Redis
@@ -45,6 +128,44 @@ REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
 # Настройки обновления цен
 PRICE_UPDATE_INTERVAL = int(os.getenv('PRICE_UPDATE_INTERVAL', '3600'))  # 1 час
+REFRESH_MIN_INTERVAL = int(os.getenv('REFRESH_MIN_INTERVAL', '900'))  # самые изменчивые товары, секунды
+REFRESH_MAX_INTERVAL = int(os.getenv('REFRESH_MAX_INTERVAL', '86400'))  # самые стабильные товары, секунды
+REFRESH_BUDGET_PER_HOUR = int(os.getenv('REFRESH_BUDGET_PER_HOUR', '600'))  # загрузок в час на все товары
+REFRESH_WORKERS = int(os.getenv('REFRESH_WORKERS', '4'))  # одновременных обновлений
+REFRESH_JITTER = float(os.getenv('REFRESH_JITTER', '0.1'))  # случайный разброс интервала, доля
+REFRESH_SYNC_INTERVAL = int(os.getenv('REFRESH_SYNC_INTERVAL', '300'))  # перечитывание списка товаров, секунды
+# Пакетная запись цен: размер пакета и максимальная задержка записи
+PRICE_WRITE_BATCH_SIZE = int(os.getenv('PRICE_WRITE_BATCH_SIZE', '500'))
+PRICE_WRITE_FLUSH_INTERVAL = float(os.getenv('PRICE_WRITE_FLUSH_INTERVAL', '5'))  # секунды
+# Буфер цен при недоступной базе: не больше PRICE_WRITE_MAX_PENDING цен (самые старые
+# отбрасываются), повторная запись через растущую паузу до PRICE_WRITE_RETRY_MAX секунд
+PRICE_WRITE_MAX_PENDING = int(os.getenv('PRICE_WRITE_MAX_PENDING', '50000'))
+PRICE_WRITE_RETRY_MAX = float(os.getenv('PRICE_WRITE_RETRY_MAX', '60'))  # секунды
+
+# Хранение истории цен: сырые записи и почасовые агрегаты старше срока удаляются,
+# дневные агрегаты хранятся всегда
+PRICE_HISTORY_RETENTION_DAYS = int(os.getenv('PRICE_HISTORY_RETENTION_DAYS', '180'))
+PRICE_HISTORY_ARCHIVE = os.getenv('PRICE_HISTORY_ARCHIVE', 'true').lower() == 'true'  # переносить в архив, а не удалять
+ROLLUP_HOURLY_RETENTION_DAYS = int(os.getenv('ROLLUP_HOURLY_RETENTION_DAYS', '90'))
+RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', '86400'))  # секунды между очистками
+# Выбор уровня истории по длине периода: до N дней - сырые записи, до M дней - почасовые агрегаты
+HISTORY_RAW_RANGE_DAYS = int(os.getenv('HISTORY_RAW_RANGE_DAYS', '7'))
+HISTORY_HOURLY_RANGE_DAYS = int(os.getenv('HISTORY_HOURLY_RANGE_DAYS', '60'))
+# Отчеты: строк на одну порцию потокового чтения истории цен
+REPORT_QUERY_CHUNK_SIZE = int(os.getenv('REPORT_QUERY_CHUNK_SIZE', '5000'))
+# Формат отчетов: xlsx, csv или parquet (архив с файлом на каждый лист, для parquet нужен pyarrow)
+REPORT_FORMAT = os.getenv('REPORT_FORMAT', 'xlsx').lower()
+# Фоновая генерация отчетов в отдельных процессах
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+REPORT_QUEUE_SIZE = int(os.getenv('REPORT_QUEUE_SIZE', '10'))  # отчетов сверх числа воркеров
+REPORT_PROGRESS_INTERVAL = float(os.getenv('REPORT_PROGRESS_INTERVAL', '3'))  # секунды между обновлениями статуса
+# Кэш готовых отчетов: папка, размер файлов на диске и срок хранения
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', 'reports')
+REPORT_CACHE_MAX_MB = int(os.getenv('REPORT_CACHE_MAX_MB', '200'))
+REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', '86400'))  # секунды
+# Аналитика цен: окна метрик в днях и число товаров в ответе команды /analytics
+ANALYTICS_WINDOWS = tuple(int(days) for days in os.getenv('ANALYTICS_WINDOWS', '7,30').split(','))
+ANALYTICS_TOP_PRODUCTS = int(os.getenv('ANALYTICS_TOP_PRODUCTS', '10'))
 
 # Настройки уведомлений
 NOTIFICATION_THRESHOLD = float(os.getenv('NOTIFICATION_THRESHOLD', '0.1'))  # 10% изменения цены
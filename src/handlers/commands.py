@@ -1,4 +1,5 @@
 import os
+import asyncio
 import csv
 import tempfile
 import logging
@@ -8,12 +9,18 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, FSInputFile
-from src.services.database import DatabaseService
+from src.services.async_database import AsyncDatabaseService
 from src.services.parser import ParserService
+from src.services.scrape_executor import ScrapeRejected
 from src.keyboards.keyboards import get_main_keyboard, get_product_keyboard, get_platform_keyboard, get_confirm_keyboard
 from src.utils.user import ensure_user_exists
 from src.utils.validators import validate_url
-from src.services.analysis import AnalysisService
+from src.utils.urls import unique_links
+from src.services.report_jobs import ReportJob, ReportRejected, get_report_jobs
+from src.services.report_cache import CachedReport, get_report_cache, report_cache_key
+from src.config.config import DATABASE_URL, REPORT_FORMAT
+from src.services.analytics import format_metrics_message, load_product_metrics
+from src.services.db_engine import get_engine
 from src.services.bulk_importer import BulkImporterService
 
 logger = logging.getLogger(__name__)
@@ -42,15 +49,15 @@ async def cmd_start(message: Message):
     """Обработчик команды /start"""
     try:
         # Получаем или создаем пользователя
-        user = DatabaseService.get_user(message.from_user.id)
+        user = await AsyncDatabaseService.get_user(message.from_user.id)
         if not user:
-            user = DatabaseService.create_user(
+            user = await AsyncDatabaseService.create_user(
                 telegram_id=message.from_user.id,
                 username=message.from_user.username
             )
             logger.info(f"Создан новый пользователь: {message.from_user.id}")
         else:
-            DatabaseService.update_user_activity(message.from_user.id)
+            await AsyncDatabaseService.update_user_activity(message.from_user.id)
             logger.info(f"Обновлена активность пользователя: {message.from_user.id}")
         
         await message.answer(
@@ -75,7 +82,8 @@ async def cmd_help(message: Message):
         "/help - Показать это сообщение\n"
         "/add - Добавить новый товар для отслеживания\n"
         "/list - Показать список отслеживаемых товаров\n"
-        "/delete - Удалить товар из отслеживания\n\n"
+        "/delete - Удалить товар из отслеживания\n"
+        "/analytics - Аналитика цен ваших товаров\n\n"
         "Чтобы добавить товар для отслеживания:\n"
         "1. Нажмите кнопку 'Добавить товар' или отправьте команду /add\n"
         "2. Выберите платформу\n"
@@ -143,8 +151,20 @@ async def process_url(message: Message, state: FSMContext):
             await state.clear()
             return
         
+        # Ссылки с разными параметрами отслеживания ведут на один товар
+        if await AsyncDatabaseService.get_product_by_url(url, message.from_user.id):
+            await message.answer("ℹ️ Этот товар уже отслеживается.")
+            await state.clear()
+            return
+        
         try:
             product_data = await parser_service.get_product_data(url, platform)
+        except ScrapeRejected:
+            await message.answer(
+                "⏳ Сейчас обрабатывается слишком много товаров. "
+                "Пожалуйста, отправьте ссылку еще раз через пару минут."
+            )
+            return
         except Exception as e:
             logger.error(f"Ошибка при парсинге товара: {str(e)}")
             await message.answer(
@@ -191,7 +211,7 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
             
             try:
                 # Добавляем товар в базу данных
-                product = DatabaseService.add_product(
+                product = await AsyncDatabaseService.add_product(
                     telegram_id=callback.from_user.id,
                     url=data['url'],
                     platform=data['platform'],
@@ -235,7 +255,7 @@ async def cmd_list(message: Message):
     """Обработчик команды /list и кнопки списка товаров"""
     try:
         # Получаем список товаров пользователя
-        products = DatabaseService.get_user_products(message.from_user.id)
+        products = await AsyncDatabaseService.get_user_products(message.from_user.id)
         
         if not products:
             await message.answer(
@@ -262,13 +282,37 @@ async def cmd_list(message: Message):
             "Пожалуйста, попробуйте позже."
         )
 
+@router.message(Command("analytics"))
+async def cmd_analytics(message: Message):
+    """Обработчик команды /analytics"""
+    try:
+        # Метрики считаются вне цикла событий
+        metrics = await asyncio.to_thread(
+            load_product_metrics, get_engine(DATABASE_URL), message.from_user.id
+        )
+        
+        if metrics.empty:
+            await message.answer(
+                "📝 У вас пока нет отслеживаемых товаров.\n"
+                "Используйте команду /add чтобы добавить товар."
+            )
+            return
+        
+        await message.answer(format_metrics_message(metrics))
+    except Exception as e:
+        logger.error(f"Ошибка при расчете аналитики: {str(e)}")
+        await message.answer(
+            "😔 Произошла ошибка при расчете аналитики. "
+            "Пожалуйста, попробуйте позже."
+        )
+
 @router.message(Command("delete"))
 @router.message(F.text == "❌ Удалить товар")
 async def cmd_delete(message: Message):
     """Обработчик команды /delete и кнопки удаления товара"""
     try:
         # Получаем список товаров пользователя
-        products = DatabaseService.get_user_products(message.from_user.id)
+        products = await AsyncDatabaseService.get_user_products(message.from_user.id)
         
         if not products:
             await message.answer(
@@ -297,7 +341,7 @@ async def show_products(message: Message):
     """Обработчик кнопки 'Мои товары'"""
     try:
         # Получаем товары пользователя
-        products = DatabaseService.get_user_products(message.from_user.id)
+        products = await AsyncDatabaseService.get_user_products(message.from_user.id)
         
         if not products:
             await message.answer(
@@ -327,12 +371,35 @@ async def show_products(message: Message):
             "Пожалуйста, попробуйте позже."
         )
 
+# Подпись к файлу анализа
+REPORT_CAPTION = (
+    "📊 Ваш анализ данных готов!\n\n"
+    "В файле вы найдете:\n"
+    "• Список всех ваших товаров\n"
+    "• Статистику по ценам и скидкам\n"
+    "• Историю изменения цен"
+)
+
+async def send_report(message: Message, report: CachedReport):
+    """Отправка отчета из кэша: по file_id без загрузки, иначе файлом"""
+    if report.file_id:
+        try:
+            await message.answer_document(document=report.file_id, caption=REPORT_CAPTION)
+            return
+        except Exception as e:
+            if not report.has_file:
+                raise
+            logger.warning(f"Не удалось отправить отчет по file_id, загружаем файл: {str(e)}")
+    
+    sent = await message.answer_document(document=FSInputFile(report.path), caption=REPORT_CAPTION)
+    get_report_cache().set_file_id(report.key, sent.document.file_id)
+
 @router.message(F.text == "📥 Скачать анализ")
 async def download_analysis(message: Message):
     """Обработчик кнопки 'Скачать анализ'"""
     try:
         # Проверяем наличие товаров
-        products = DatabaseService.get_user_products(message.from_user.id)
+        products = await AsyncDatabaseService.get_user_products(message.from_user.id)
         if not products:
             await message.answer(
                 "📝 У вас пока нет отслеживаемых товаров.\n"
@@ -340,30 +407,46 @@ async def download_analysis(message: Message):
             )
             return
 
-        # Отправляем сообщение о начале генерации
-        status_message = await message.answer(
-            "🔄 Генерирую анализ данных...\n"
-            "Это может занять некоторое время."
-        )
-        
-        # Генерируем анализ
-        filepath = AnalysisService.generate_analysis(message.from_user.id)
-        
-        # Отправляем файл
-        await message.answer_document(
-            document=FSInputFile(filepath),
-            caption="📊 Ваш анализ данных готов!\n\n"
-                   "В файле вы найдете:\n"
-                   "• Список всех ваших товаров\n"
-                   "• Статистику по ценам и скидкам\n"
-                   "• Историю изменения цен"
-        )
+        # Данные не менялись с прошлого отчета - отправляем готовый
+        key = report_cache_key(message.from_user.id, None, REPORT_FORMAT)
+        version = await AsyncDatabaseService.get_report_version(message.from_user.id)
+        cached = get_report_cache().get(key, version)
+        if cached:
+            await send_report(message, cached)
+            return
+
+        # Отчет готовится в отдельном процессе, обработчик сразу освобождается
+        status_message = await message.answer("🕒 Анализ данных поставлен в очередь...")
         
-        # Удаляем сообщение о статусе
-        await status_message.delete()
+        async def report_status(job: ReportJob):
+            """Прогресс в сообщении о статусе и отправка готового файла"""
+            if job.status == ReportJob.QUEUED:
+                return
+            if job.status == ReportJob.RUNNING:
+                text = "🔄 Генерирую анализ данных...\n"
+                if job.sheet:
+                    text += f"Лист «{job.sheet}»: записано строк {job.rows}"
+                else:
+                    text += "Это может занять некоторое время."
+                await status_message.edit_text(text)
+                return
+            if job.status == ReportJob.FAILED:
+                await status_message.edit_text(
+                    "❌ Произошла ошибка при генерации анализа.\n"
+                    "Пожалуйста, попробуйте позже."
+                )
+                return
+            
+            # Файл остается в кэше до изменения данных пользователя
+            await send_report(message, get_report_cache().put(key, version, job.path))
+            
+            # Удаляем сообщение о статусе
+            await status_message.delete()
         
-        # Удаляем файл после отправки
-        os.remove(filepath)
+        try:
+            await get_report_jobs().submit(message.from_user.id, report_status, report_format=REPORT_FORMAT)
+        except ReportRejected as e:
+            await status_message.edit_text(f"⏳ {str(e)}")
         
     except Exception as e:
         logger.error(f"Ошибка при генерации анализа: {str(e)}")
@@ -382,7 +465,7 @@ async def update_prices(message: Message):
             return
 
         # Получаем все товары пользователя
-        products = DatabaseService.get_user_products(message.from_user.id)
+        products = await AsyncDatabaseService.get_user_products(message.from_user.id)
         if not products:
             await message.answer("У вас пока нет отслеживаемых товаров.")
             return
@@ -394,13 +477,13 @@ async def update_prices(message: Message):
         for i, product in enumerate(products, 1):
             try:
                 # Парсим данные
-                product_data = await parser_service.parse_product(product['url'])
+                product_data = await parser_service.parse_product(product['url'], allow_stale=False)
                 if not product_data:
                     await message.answer(f"Не удалось получить данные для товара: {product['name']}")
                     continue
 
                 # Обновляем цену
-                DatabaseService.update_product_price(product['id'], product_data['current_price'])
+                await AsyncDatabaseService.update_product_price(product['id'], product_data['current_price'])
 
                 # Обновляем статус
                 await status_message.edit_text(
@@ -438,7 +521,7 @@ async def parse_links_from_file(message: Message):
 
         # Читаем ссылки из файла
         with open('links.txt', 'r', encoding='utf-8') as file:
-            links = [line.strip() for line in file if line.strip()]
+            links = unique_links(line.strip() for line in file if line.strip())
 
         if not links:
             await message.answer("Файл links.txt пуст. Добавьте ссылки для парсинга.")
@@ -450,6 +533,10 @@ async def parse_links_from_file(message: Message):
         # Парсим каждую ссылку
         for i, link in enumerate(links, 1):
             try:
+                # Товар уже отслеживается пользователем, повторно не парсим
+                if await AsyncDatabaseService.get_product_by_url(link, message.from_user.id):
+                    continue
+                
                 # Парсим данные
                 product_data = await parser_service.parse_product(link)
                 if not product_data:
@@ -457,7 +544,7 @@ async def parse_links_from_file(message: Message):
                     continue
 
                 # Сохраняем товар
-                DatabaseService.add_product(
+                await AsyncDatabaseService.add_product(
                     telegram_id=message.from_user.id,
                     url=link,
                     platform=product_data['platform'],
@@ -9,6 +9,13 @@ from src.config.config import BOT_TOKEN, DATABASE_URL
 from src.handlers import commands
 from src.models.models import init_db
 from src.services.parser import ParserService
+from src.services.async_database import dispose_async_engine
+from src.services.db_engine import get_engine, run_sqlite_maintenance
+from src.services.rollups import run_history_maintenance
+from src.services.http_client import http_client
+from src.services.scrape_executor import get_scrape_executor
+from src.services.report_jobs import get_report_jobs
+from src.services.report_cache import get_report_cache
 
 # Настройка логирования
 logging.basicConfig(
@@ -29,10 +36,22 @@ dp.include_router(commands.router)
 
 async def main():
     """Основная функция запуска бота"""
+    background = []
     try:
         # Инициализация базы данных
         Session = init_db(DATABASE_URL)
         
+        # Периодический ANALYZE и очистка SQLite в фоне
+        background.append(asyncio.create_task(run_sqlite_maintenance(get_engine(DATABASE_URL))))
+        # Сжатие истории в периоды и удаление записей старше срока хранения
+        background.append(asyncio.create_task(run_history_maintenance(get_engine(DATABASE_URL))))
+        
+        # Удаление устаревших отчетов, оставшихся с прошлого запуска
+        get_report_cache().prune()
+        
+        # Общий HTTP-клиент парсеров
+        await http_client.start()
+        
         # Инициализация парсера
         parser = ParserService()
         
@@ -43,6 +62,12 @@ async def main():
         logger.error(f"Ошибка при запуске бота: {str(e)}")
         raise
     finally:
+        for task in background:
+            task.cancel()
+        await http_client.close()
+        get_scrape_executor().shutdown()
+        get_report_jobs().shutdown()
+        await dispose_async_engine()
         logger.info("Бот остановлен")
 
 def signal_handler(sig, frame):
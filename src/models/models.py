@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, create_engine, Index, text, func
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, text, func
+from sqlalchemy.orm import declarative_base, relationship, synonym
 from datetime import datetime
-from src.config.config import DATABASE_URL
+from src.config.config import DATABASE_URL, NOTIFICATION_THRESHOLD
+from src.services.db_engine import enable_incremental_vacuum, get_engine
+from src.services.rollups import backfill_rollups
+from src.utils.urls import canonicalize, product_key
 import logging
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -21,70 +24,306 @@ class User(Base):
     last_active = Column(DateTime, default=func.now())
     is_active = Column(Boolean, default=True)
     
-    products = relationship("Product", back_populates="user")
+    subscriptions = relationship("Subscription", back_populates="user")
 
     def __repr__(self):
         return f"<User(telegram_id={self.telegram_id}, username={self.username})>"
 
-class Product(Base):
-    __tablename__ = 'products'
+class CatalogItem(Base):
+    """Товар в общем каталоге, один на ключ (площадка, артикул)"""
+    __tablename__ = 'catalog_items'
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    url = Column(String)
+    # Стабильный ключ товара 'площадка:артикул', см. src.utils.urls.product_key
+    product_key = Column(String, nullable=False)
     platform = Column(String)
+    sku = Column(String)
+    url = Column(String)
     name = Column(String)
     current_price = Column(Float)
     discount = Column(Float, nullable=True)
     original_price = Column(Float, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_updated = Column(DateTime, default=datetime.utcnow)
+    
+    subscriptions = relationship("Subscription", back_populates="catalog_item")
+    price_history = relationship("PriceHistory", back_populates="catalog_item")
+
+    __table_args__ = (
+        Index('idx_catalog_product_key', 'product_key', unique=True),
+        Index('idx_catalog_platform_sku', 'platform', 'sku'),
+    )
+
+    def __repr__(self):
+        return f"<CatalogItem(name={self.name}, product_key={self.product_key}, current_price={self.current_price})>"
+
+class Subscription(Base):
+    """Отслеживание товара каталога пользователем"""
+    __tablename__ = 'subscriptions'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    catalog_item_id = Column(Integer, ForeignKey('catalog_items.id'), nullable=False)
+    # Ссылка в том виде, в котором ее прислал пользователь
+    url = Column(String)
+    # Уведомлять при изменении цены на эту долю
+    notify_threshold = Column(Float, default=NOTIFICATION_THRESHOLD)
+    # Уведомлять, когда цена опустится до этого значения
+    target_price = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     
-    user = relationship("User", back_populates="products")
-    price_history = relationship("PriceHistory", back_populates="product")
+    user = relationship("User", back_populates="subscriptions")
+    catalog_item = relationship("CatalogItem", back_populates="subscriptions")
 
     __table_args__ = (
-        Index('idx_user_platform', 'user_id', 'platform'),
-        Index('idx_url', 'url'),
+        Index('idx_subscription_user_item', 'user_id', 'catalog_item_id', unique=True),
+        Index('idx_subscription_item', 'catalog_item_id'),
     )
 
     def __repr__(self):
-        return f"<Product(name={self.name}, platform={self.platform}, current_price={self.current_price})>"
+        return f"<Subscription(user_id={self.user_id}, catalog_item_id={self.catalog_item_id})>"
 
 class PriceHistory(Base):
+    """Период с одной ценой: запись добавляется только при изменении цены"""
     __tablename__ = 'price_history'
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey('products.id'))
+    catalog_item_id = Column(Integer, ForeignKey('catalog_items.id'))
     price = Column(Float)
+    # Когда цена появилась
     timestamp = Column(DateTime, default=func.now())
+    # Когда цена была получена в последний раз
+    last_confirmed = Column(DateTime, default=func.now())
+    # Сколько раз цена была получена за период
+    confirmations = Column(Integer, default=1)
+    first_seen = synonym('timestamp')
+    
+    catalog_item = relationship("CatalogItem", back_populates="price_history")
+
+    __table_args__ = (
+        Index('idx_item_timestamp', 'catalog_item_id', 'timestamp'),
+    )
+
+    def __repr__(self):
+        return f"<PriceHistory(catalog_item_id={self.catalog_item_id}, price={self.price}, timestamp={self.timestamp})>"
+
+class PriceHistoryArchive(Base):
+    """Записи истории цен старше срока хранения"""
+    __tablename__ = 'price_history_archive'
     
-    product = relationship("Product", back_populates="price_history")
+    id = Column(Integer, primary_key=True)
+    catalog_item_id = Column(Integer, index=True)
+    price = Column(Float)
+    timestamp = Column(DateTime)
+    last_confirmed = Column(DateTime)
+    confirmations = Column(Integer)
+
+class PriceRollup(Base):
+    """Агрегат цен товара за час или день: OHLC, минимум, максимум и среднее"""
+    __tablename__ = 'price_rollups'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    catalog_item_id = Column(Integer, ForeignKey('catalog_items.id'), nullable=False)
+    # 'hour' или 'day'
+    granularity = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    # Число наблюдений и их сумма для среднего
+    count = Column(Integer, default=0)
+    total = Column(Float, default=0)
+    # Время последнего наблюдения, по нему определяется цена закрытия
+    closed_at = Column(DateTime)
 
     __table_args__ = (
-        Index('idx_product_timestamp', 'product_id', 'timestamp'),
+        Index('idx_rollup_item_bucket', 'catalog_item_id', 'granularity', 'bucket_start', unique=True),
     )
 
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else None
+
     def __repr__(self):
-        return f"<PriceHistory(product_id={self.product_id}, price={self.price}, timestamp={self.timestamp})>"
+        return f"<PriceRollup(catalog_item_id={self.catalog_item_id}, granularity={self.granularity}, bucket_start={self.bucket_start})>"
+
+def migrate_to_catalog(engine) -> None:
+    """
+    Перенос данных из таблицы products в каталог и подписки
+    
+    Строки products с одинаковым ключом товара объединяются в одну запись
+    каталога (данные берутся у самой свежей строки), для каждой строки
+    создается подписка пользователя. История цен переносится на запись
+    каталога, совпадающие записи разных пользователей схлопываются. После
+    переноса таблица переименовывается в products_legacy.
+    """
+    inspector = inspect(engine)
+    if 'products' not in inspector.get_table_names():
+        return
+    history_columns = [column['name'] for column in inspector.get_columns('price_history')]
+    
+    with engine.begin() as conn:
+        if 'catalog_item_id' not in history_columns:
+            conn.execute(text("ALTER TABLE price_history ADD COLUMN catalog_item_id INTEGER"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_item_timestamp ON price_history (catalog_item_id, timestamp)"
+        ))
+        
+        rows = conn.execute(text(
+            "SELECT id, user_id, url, platform, name, current_price, original_price, discount, "
+            "created_at, last_updated FROM products ORDER BY id"
+        )).fetchall()
+        
+        groups = {}
+        for row in rows:
+            groups.setdefault(product_key(row.url or ''), []).append(row)
+        
+        item_ids = {}
+        subscriptions = 0
+        for key, group in groups.items():
+            latest = max(group, key=lambda row: str(row.last_updated or ''))
+            item_id = conn.execute(
+                text("SELECT id FROM catalog_items WHERE product_key = :key"), {'key': key}
+            ).scalar()
+            if item_id is None:
+                platform_sku = canonicalize(latest.url or '')
+                conn.execute(
+                    text(
+                        "INSERT INTO catalog_items (product_key, platform, sku, url, name, current_price, "
+                        "original_price, discount, created_at, last_updated) VALUES (:key, :platform, :sku, "
+                        ":url, :name, :current_price, :original_price, :discount, :created_at, :last_updated)"
+                    ),
+                    {
+                        'key': key,
+                        'platform': platform_sku[0] if platform_sku else latest.platform,
+                        'sku': platform_sku[1] if platform_sku else None,
+                        'url': latest.url,
+                        'name': latest.name,
+                        'current_price': latest.current_price,
+                        'original_price': latest.original_price or latest.current_price or 0,
+                        'discount': latest.discount,
+                        'created_at': min((row.created_at for row in group if row.created_at), default=None),
+                        'last_updated': latest.last_updated
+                    }
+                )
+                item_id = conn.execute(
+                    text("SELECT id FROM catalog_items WHERE product_key = :key"), {'key': key}
+                ).scalar()
+            
+            subscribed = set()
+            for row in group:
+                item_ids[row.id] = item_id
+                if row.user_id in subscribed:
+                    continue
+                subscribed.add(row.user_id)
+                exists = conn.execute(
+                    text("SELECT 1 FROM subscriptions WHERE user_id = :user_id AND catalog_item_id = :item_id"),
+                    {'user_id': row.user_id, 'item_id': item_id}
+                ).scalar()
+                if not exists:
+                    conn.execute(
+                        text(
+                            "INSERT INTO subscriptions (user_id, catalog_item_id, url, notify_threshold, "
+                            "created_at, is_active) VALUES (:user_id, :item_id, :url, :threshold, :created_at, :active)"
+                        ),
+                        {
+                            'user_id': row.user_id,
+                            'item_id': item_id,
+                            'url': row.url,
+                            'threshold': NOTIFICATION_THRESHOLD,
+                            'created_at': row.created_at,
+                            'active': True
+                        }
+                    )
+                    subscriptions += 1
+        
+        if item_ids:
+            conn.execute(
+                text("UPDATE price_history SET catalog_item_id = :item_id WHERE product_id = :product_id"),
+                [{'item_id': item_id, 'product_id': product_id} for product_id, item_id in item_ids.items()]
+            )
+            # Одна и та же цена, записанная для каждого пользователя, хранится один раз
+            conn.execute(text(
+                "DELETE FROM price_history WHERE catalog_item_id IS NOT NULL AND id NOT IN ("
+                "SELECT MIN(id) FROM price_history WHERE catalog_item_id IS NOT NULL "
+                "GROUP BY catalog_item_id, price, timestamp)"
+            ))
+        
+        conn.execute(text("ALTER TABLE products RENAME TO products_legacy"))
+        logger.info(
+            f"Товары перенесены в каталог: {len(rows)} строк -> {len(groups)} товаров, "
+            f"{subscriptions} подписок"
+        )
+
+def migrate_history_runs(engine) -> None:
+    """Добавление в историю цен полей периода: последнее подтверждение и число подтверждений"""
+    columns = [column['name'] for column in inspect(engine).get_columns('price_history')]
+    with engine.begin() as conn:
+        if 'last_confirmed' not in columns:
+            conn.execute(text("ALTER TABLE price_history ADD COLUMN last_confirmed TIMESTAMP"))
+            conn.execute(text("UPDATE price_history SET last_confirmed = timestamp"))
+        if 'confirmations' not in columns:
+            conn.execute(text("ALTER TABLE price_history ADD COLUMN confirmations INTEGER"))
+            conn.execute(text("UPDATE price_history SET confirmations = 1"))
+
+def migrate_product_keys(engine) -> None:
+    """
+    Перевод записей каталога без артикула на ключ площадка:артикул
+    
+    Записи, для ссылок которых артикул раньше не распознавался (например,
+    /context/detail/id/ у Ozon), получают ключ по артикулу. Если запись
+    с таким ключом уже есть, запись остается со старым ключом.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, url FROM catalog_items WHERE sku IS NULL")).fetchall()
+        updated = 0
+        for row in rows:
+            platform_sku = canonicalize(row.url or '')
+            if not platform_sku:
+                continue
+            key = f"{platform_sku[0]}:{platform_sku[1]}"
+            exists = conn.execute(
+                text("SELECT 1 FROM catalog_items WHERE product_key = :key"), {'key': key}
+            ).scalar()
+            if exists:
+                continue
+            conn.execute(
+                text("UPDATE catalog_items SET product_key = :key, platform = :platform, sku = :sku WHERE id = :id"),
+                {'key': key, 'platform': platform_sku[0], 'sku': platform_sku[1], 'id': row.id}
+            )
+            updated += 1
+        if updated:
+            logger.info(f"Записи каталога переведены на ключ по артикулу: {updated}")
 
 def init_db(database_url: str) -> None:
     """Инициализация базы данных"""
     try:
-        # Создаем движок базы данных
-        engine = create_engine(database_url)
+        # Общий для процесса движок, для SQLite - с WAL и настройками соединений
+        engine = get_engine(database_url)
+        enable_incremental_vacuum(engine)
         
         # Проверяем существование таблиц
         inspector = inspect(engine)
         existing_tables = inspector.get_table_names()
-        required_tables = ['users', 'products', 'price_history']
+        required_tables = ['users', 'catalog_items', 'subscriptions', 'price_history', 'price_history_archive', 'price_rollups']
         
         # Если какие-то таблицы отсутствуют, создаем их
         if not all(table in existing_tables for table in required_tables):
             Base.metadata.create_all(engine)
             logger.info("Созданы отсутствующие таблицы")
         
+        # Перенос данных из старой схемы с товаром на каждого пользователя
+        migrate_to_catalog(engine)
+        migrate_history_runs(engine)
+        migrate_product_keys(engine)
+        
+        # Агрегаты по истории, накопленной до их появления
+        if 'price_rollups' not in existing_tables:
+            created = backfill_rollups(engine)
+            logger.info(f"Созданы агрегаты истории цен: {created}")
+        
         # Создаем фабрику сессий
         Session = sessionmaker(bind=engine)
         
@@ -95,4 +334,4 @@ def init_db(database_url: str) -> None:
         raise
 
 # Создаем движок
-engine = create_engine(DATABASE_URL) 
\ No newline at end of file
+engine = get_engine(DATABASE_URL) 
\ No newline at end of file
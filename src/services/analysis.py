@@ -1,21 +1,48 @@
 import pandas as pd
-from datetime import datetime
-import os
-from src.services.database import DatabaseService
+from datetime import datetime, timedelta
+from typing import Callable
+from src.config.config import ANALYTICS_WINDOWS, REPORT_FORMAT, REPORT_QUERY_CHUNK_SIZE
+from src.services.database import DatabaseService, engine
+from src.services.report_data import iter_price_frames, iter_products_frames
+from src.services.report_writer import ReportWriter, frame_chunks, report_path
+from src.services.analytics import load_product_metrics, metric_columns, metric_labels
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Колонки листа с товарами
+PRODUCT_COLUMNS = [
+    'id', 'catalog_item_id', 'name', 'current_price', 'original_price',
+    'platform', 'url', 'notify_threshold', 'target_price'
+]
+
+# Колонки истории цен -> колонки листа с историей
+HISTORY_COLUMNS = {
+    'name': 'Товар',
+    'close': 'Цена',
+    'low': 'Мин',
+    'high': 'Макс',
+    'avg': 'Средняя',
+    'timestamp': 'Дата'
+}
+
 class AnalysisService:
     """Сервис для генерации анализа данных"""
     
     @staticmethod
-    def generate_analysis(telegram_id: int) -> str:
+    def generate_analysis(telegram_id: int, days: int = None, report_format: str = REPORT_FORMAT,
+                          progress: Callable[[str, int], None] = None) -> str:
         """
         Генерация анализа данных пользователя
         
+        Строки читаются из базы порциями и сразу пишутся в файл, поэтому
+        память не зависит от объема истории цен.
+        
         Args:
             telegram_id (int): ID пользователя в Telegram
+            days (int): Период истории цен в днях, по умолчанию вся история
+            report_format (str): Формат отчета: xlsx, csv или parquet
+            progress (Callable[[str, int], None]): Прогресс записи: текущий лист и число записанных строк
             
         Returns:
             str: Путь к сгенерированному файлу
@@ -26,28 +53,29 @@ class AnalysisService:
             if not user:
                 raise ValueError(f"Пользователь с telegram_id {telegram_id} не найден")
             
-            # Получаем товары пользователя
-            products = DatabaseService.get_user_products(telegram_id)
-            
-            # Создаем DataFrame с товарами
-            products_df = pd.DataFrame(products)
+            # Статистика считается по мере записи листа с товарами
+            stats = {'count': 0, 'sum': 0.0, 'max': None, 'min': None}
             
-            # Создаем директорию для отчетов, если её нет
-            reports_dir = os.path.join(os.getcwd(), 'reports')
-            os.makedirs(reports_dir, exist_ok=True)
+            def products():
+                for chunk in iter_products_frames(engine, telegram_id):
+                    prices = chunk['current_price'].dropna()
+                    stats['count'] += len(chunk)
+                    stats['sum'] += prices.sum()
+                    if not prices.empty:
+                        high, low = prices.max(), prices.min()
+                        stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+                        stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+                    yield chunk
             
-            # Генерируем имя файла
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'analysis_{telegram_id}_{timestamp}.xlsx'
-            filepath = os.path.join(reports_dir, filename)
-            
-            # Создаем Excel writer
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+            with ReportWriter(report_path(f'analysis_{telegram_id}'), report_format, progress=progress) as writer:
                 # Лист с товарами
-                products_df.to_excel(writer, sheet_name='Товары', index=False)
+                writer.write_sheet('Товары', PRODUCT_COLUMNS, products())
+                
+                # Метрики каждого товара за окна ANALYTICS_WINDOWS одним проходом по истории
+                metrics = load_product_metrics(engine, telegram_id)
                 
                 # Лист со статистикой
-                stats_data = {
+                stats_df = pd.DataFrame({
                     'Метрика': [
                         'Всего товаров',
                         'Средняя цена',
@@ -55,42 +83,48 @@ class AnalysisService:
                         'Минимальная цена'
                     ],
                     'Значение': [
-                        len(products),
-                        products_df['current_price'].mean() if not products_df.empty else 0,
-                        products_df['current_price'].max() if not products_df.empty else 0,
-                        products_df['current_price'].min() if not products_df.empty else 0
+                        stats['count'],
+                        stats['sum'] / stats['count'] if stats['count'] else 0,
+                        stats['max'] if stats['max'] is not None else 0,
+                        stats['min'] if stats['min'] is not None else 0
                     ]
-                }
-                
-                # Добавляем статистику по скидкам, если есть поле discount
-                if 'discount' in products_df.columns:
-                    stats_data['Метрика'].extend(['Средняя скидка', 'Максимальная скидка'])
-                    stats_data['Значение'].extend([
-                        products_df['discount'].mean() if not products_df.empty else 0,
-                        products_df['discount'].max() if not products_df.empty else 0
-                    ])
+                })
+                if not metrics.empty:
+                    longest = max(ANALYTICS_WINDOWS)
+                    stats_df = pd.concat([stats_df, pd.DataFrame({
+                        'Метрика': [
+                            'Средняя скидка, %',
+                            'Максимальная скидка, %',
+                            f'Товаров на минимуме цены за {longest} дн.'
+                        ],
+                        'Значение': [
+                            metrics['discount_pct'].mean(),
+                            metrics['discount_pct'].max(),
+                            int(metrics[f'lowest_{longest}d'].sum())
+                        ]
+                    })], ignore_index=True)
+                writer.write_sheet('Статистика', list(stats_df.columns), [stats_df])
                 
-                pd.DataFrame(stats_data).to_excel(writer, sheet_name='Статистика', index=False)
+                # Лист с метриками товаров
+                labels = metric_labels()
+                writer.write_sheet(
+                    'Аналитика',
+                    [labels[column] for column in metric_columns() if column != 'product_id'],
+                    frame_chunks(metrics.rename(columns=labels), REPORT_QUERY_CHUNK_SIZE)
+                )
                 
-                # Лист с историей цен
-                if not products_df.empty:
-                    history_data = []
-                    for product in products:
-                        history = DatabaseService.get_product_price_history(product['id'])
-                        for record in history:
-                            history_data.append({
-                                'Товар': product['name'],
-                                'Цена': record['price'],
-                                'Дата': record['timestamp'] or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            })
-                    if history_data:
-                        history_df = pd.DataFrame(history_data)
-                        history_df['Дата'] = pd.to_datetime(history_df['Дата'])
-                        history_df = history_df.sort_values('Дата', ascending=False)
-                        history_df.to_excel(writer, sheet_name='История цен', index=False)
+                # Лист с историей цен: по товарам и времени, длинные периоды - из почасовых или дневных агрегатов
+                if stats['count']:
+                    start = datetime.utcnow() - timedelta(days=days) if days else None
+                    _, chunks = iter_price_frames(engine, telegram_id, start)
+                    writer.write_sheet(
+                        'История цен',
+                        list(HISTORY_COLUMNS.values()),
+                        (chunk.rename(columns=HISTORY_COLUMNS) for chunk in chunks)
+                    )
             
-            logger.info(f"Сгенерирован анализ для пользователя {telegram_id}")
-            return filepath
+            logger.info(f"Сгенерирован анализ для пользователя {telegram_id}: строк {writer.rows}")
+            return writer.path
             
         except Exception as e:
             logger.error(f"Ошибка при генерации анализа: {str(e)}")
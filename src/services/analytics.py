@@ -0,0 +1,280 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from src.config.config import ANALYTICS_WINDOWS, ANALYTICS_TOP_PRODUCTS
+from src.services.results_sink import format_price
+from src.services.report_data import (
+    _subscriptions,
+    _user_items,
+    iter_price_frames,
+    load_products_frame,
+    read_frame,
+)
+from src.services.rollups import _history
+
+logger = logging.getLogger(__name__)
+
+
+def metric_columns(windows: Sequence[int] = ANALYTICS_WINDOWS) -> list:
+    """Колонки метрик товара в порядке отчета"""
+    columns = ['product_id', 'name', 'current_price', 'original_price', 'discount_pct']
+    for days in windows:
+        columns += [f'min_{days}d', f'max_{days}d', f'change_{days}d_pct', f'volatility_{days}d_pct',
+                    f'lowest_{days}d']
+    return columns + ['last_change', 'days_since_change']
+
+
+def metric_labels(windows: Sequence[int] = ANALYTICS_WINDOWS) -> dict:
+    """Названия колонок метрик для отчета"""
+    labels = {
+        'name': 'Товар',
+        'current_price': 'Цена',
+        'original_price': 'Цена без скидки',
+        'discount_pct': 'Скидка, %',
+        'last_change': 'Последнее изменение',
+        'days_since_change': 'Дней без изменений'
+    }
+    for days in windows:
+        labels.update({
+            f'min_{days}d': f'Мин {days} дн.',
+            f'max_{days}d': f'Макс {days} дн.',
+            f'change_{days}d_pct': f'Изменение {days} дн., %',
+            f'volatility_{days}d_pct': f'Волатильность {days} дн., %',
+            f'lowest_{days}d': f'Минимум за {days} дн.'
+        })
+    return labels
+
+
+def price_metrics(history: pd.DataFrame, now: Optional[datetime] = None,
+                  windows: Sequence[int] = ANALYTICS_WINDOWS) -> pd.DataFrame:
+    """
+    Метрики цен всех товаров за один проход по истории
+
+    Окна заканчиваются в now, поэтому вместо скользящих окон по каждой
+    точке значения вне окна маскируются, и все метрики считаются одной
+    агрегацией groupby:
+
+    - min/max за N дней - по low/high точек окна;
+    - изменение за N дней, % - от последней цены до начала окна (или
+      первой цены окна, если история короче) до текущей;
+    - волатильность за N дней, % - стандартное отклонение изменений цены
+      между соседними точками окна;
+    - минимум за N дней - текущая цена не выше минимума окна;
+    - последнее изменение - время первой точки с новой ценой.
+
+    Args:
+        history (pd.DataFrame): Точки с колонками product_id, name, timestamp, low, high, close
+        now (Optional[datetime]): Конец окон (UTC), по умолчанию - текущее время
+        windows (Sequence[int]): Длины окон в днях
+
+    Returns:
+        pd.DataFrame: Метрики по product_id
+    """
+    now = now or datetime.utcnow()
+    history = history.dropna(subset=['close']).sort_values(['product_id', 'timestamp'], kind='stable')
+    products = history['product_id']
+    timestamps = pd.to_datetime(history['timestamp'])
+    close = history['close']
+
+    previous = close.groupby(products, sort=False).shift()
+    changes = close / previous - 1
+    frame = pd.DataFrame({
+        'product_id': products,
+        'name': history['name'],
+        'last_price': close,
+        'first_seen': timestamps,
+        'last_change': timestamps.where(previous.notna() & (close != previous)),
+    })
+    aggregations = {
+        'name': 'last',
+        'last_price': 'last',
+        'first_seen': 'first',
+        'last_change': 'max',
+    }
+    for days in windows:
+        start = now - timedelta(days=days)
+        inside = timestamps >= start
+        frame[f'min_{days}d'] = history['low'].where(inside)
+        frame[f'max_{days}d'] = history['high'].where(inside)
+        # Цена на начало окна: последняя точка до него, иначе первая точка окна
+        frame[f'before_{days}d'] = close.where(timestamps <= start)
+        frame[f'first_{days}d'] = close.where(inside)
+        frame[f'volatility_{days}d_pct'] = changes.where(inside & (timestamps.shift() >= start)) * 100
+        aggregations.update({
+            f'min_{days}d': 'min',
+            f'max_{days}d': 'max',
+            f'before_{days}d': 'last',
+            f'first_{days}d': 'first',
+            f'volatility_{days}d_pct': 'std',
+        })
+
+    metrics = frame.groupby('product_id', sort=False).agg(aggregations)
+    for days in windows:
+        base = metrics.pop(f'before_{days}d').fillna(metrics.pop(f'first_{days}d'))
+        metrics[f'change_{days}d_pct'] = (metrics['last_price'] / base - 1) * 100
+        metrics[f'lowest_{days}d'] = metrics['last_price'] <= metrics[f'min_{days}d']
+
+    since = metrics['last_change'].fillna(metrics.pop('first_seen'))
+    metrics['days_since_change'] = (pd.Timestamp(now) - since).dt.total_seconds() / 86400
+    return metrics
+
+
+def price_runs_query(telegram_id: int):
+    """
+    Начало текущей цены товаров пользователя по всей истории
+
+    История хранит только изменения цены, поэтому последняя запись товара
+    начинается с последнего изменения: (product_id, run_started, runs).
+    """
+    joined, condition = _user_items(telegram_id)
+    return (
+        select(
+            _subscriptions.c.id.label('product_id'),
+            func.max(_history.c.timestamp).label('run_started'),
+            func.count(_history.c.id).label('runs'),
+        )
+        .select_from(joined.join(_history, _history.c.catalog_item_id == _subscriptions.c.catalog_item_id))
+        .where(condition)
+        .group_by(_subscriptions.c.id)
+    )
+
+
+def apply_price_runs(metrics: pd.DataFrame, runs: pd.DataFrame, now: datetime) -> pd.DataFrame:
+    """
+    Время без изменений цены по всей истории вместо окна метрик
+
+    price_metrics видит только историю за самое длинное окно, и цена,
+    которая держится дольше, выглядела бы неизменной с начала окна.
+    Товары без записей в истории (например, перенесенных в архив)
+    сохраняют значения из окна.
+
+    Args:
+        metrics (pd.DataFrame): Метрики по product_id (product_metrics)
+        runs (pd.DataFrame): Результат price_runs_query
+        now (datetime): Момент расчета (UTC)
+    """
+    if runs.empty:
+        return metrics
+    runs = runs.set_index('product_id').reindex(metrics['product_id']).set_axis(metrics.index)
+    started = pd.to_datetime(runs['run_started'])
+    known = started.notna()
+    metrics = metrics.copy()
+    # Единственная запись - цена не менялась с начала отслеживания
+    metrics['last_change'] = pd.to_datetime(metrics['last_change']).where(~known, started.where(runs['runs'] > 1))
+    metrics['days_since_change'] = metrics['days_since_change'].where(
+        ~known, (pd.Timestamp(now) - started).dt.total_seconds() / 86400
+    )
+    return metrics
+
+
+def product_metrics(products: pd.DataFrame, metrics: pd.DataFrame,
+                    windows: Sequence[int] = ANALYTICS_WINDOWS) -> pd.DataFrame:
+    """
+    Метрики всех товаров пользователя, включая товары без истории
+
+    Args:
+        products (pd.DataFrame): Товары (load_products_frame)
+        metrics (pd.DataFrame): Метрики цен по product_id (price_metrics)
+
+    Returns:
+        pd.DataFrame: Колонки metric_columns(windows) в порядке товаров
+    """
+    frame = products.rename(columns={'id': 'product_id'}).set_index('product_id')
+    frame = frame.join(metrics.drop(columns=['name', 'last_price'], errors='ignore'), how='left')
+    original = frame['original_price'].where(frame['original_price'] > 0)
+    frame['discount_pct'] = ((original - frame['current_price']) / original * 100).clip(lower=0)
+    for days in windows:
+        frame[f'lowest_{days}d'] = frame[f'lowest_{days}d'].fillna(False).astype(bool)
+    return frame.reset_index().reindex(columns=metric_columns(windows))
+
+
+def whole_products(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Фрагменты истории, в которых каждый товар целиком
+
+    Фрагменты упорядочены по товарам, поэтому точки последнего товара
+    фрагмента переносятся в следующий, и память ограничена размером
+    фрагмента и историей одного товара.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        tail = chunk['product_id'] == chunk['product_id'].iloc[-1]
+        carry = chunk[tail]
+        if not tail.all():
+            yield chunk[~tail]
+    if carry is not None and not carry.empty:
+        yield carry
+
+
+def load_product_metrics(engine: Engine, telegram_id: int, now: Optional[datetime] = None,
+                         windows: Sequence[int] = ANALYTICS_WINDOWS) -> pd.DataFrame:
+    """
+    Метрики товаров пользователя по истории за самое длинное окно
+
+    История читается потоково, метрики считаются по фрагментам с целыми
+    товарами. Время без изменений цены берется по всей истории.
+
+    Returns:
+        pd.DataFrame: Колонки metric_columns(windows) в порядке товаров
+    """
+    now = now or datetime.utcnow()
+    products = load_products_frame(engine, telegram_id)
+    _, chunks = iter_price_frames(engine, telegram_id, now - timedelta(days=max(windows)), now)
+    parts = [price_metrics(batch, now, windows) for batch in whole_products(chunks)]
+    metrics = pd.concat(parts) if parts else price_metrics(
+        pd.DataFrame(columns=['product_id', 'name', 'timestamp', 'low', 'high', 'close']), now, windows
+    )
+    with engine.connect() as conn:
+        runs = read_frame(conn, price_runs_query(telegram_id))
+    return apply_price_runs(product_metrics(products, metrics, windows), runs, now)
+
+
+def format_metrics_message(metrics: pd.DataFrame, limit: int = ANALYTICS_TOP_PRODUCTS,
+                           windows: Sequence[int] = ANALYTICS_WINDOWS) -> str:
+    """
+    Текст ответа команды /analytics
+
+    Первыми идут товары на минимуме цены за самое длинное окно, затем
+    с наибольшим снижением цены за самое короткое.
+    """
+    shortest, longest = min(windows), max(windows)
+    lowest = metrics[f'lowest_{longest}d']
+    ordered = metrics.assign(_lowest=lowest).sort_values(
+        ['_lowest', f'change_{shortest}d_pct'], ascending=[False, True], na_position='last', kind='stable'
+    )
+
+    text = (
+        f"📈 Аналитика цен: товаров {len(metrics)}\n"
+        f"🔥 На минимуме за {longest} дн.: {int(lowest.sum())}\n"
+    )
+    for row in ordered.head(limit).to_dict('records'):
+        text += f"\n{'🔥' if row['_lowest'] else '📦'} {row['name']}\n💰 {format_price(row['current_price'])}"
+        change = row[f'change_{shortest}d_pct']
+        if pd.notna(change):
+            text += f" · {shortest} дн.: {change:+.1f}%"
+        if pd.notna(row['discount_pct']) and row['discount_pct'] > 0:
+            text += f" · скидка {row['discount_pct']:.0f}%"
+        if pd.notna(row[f'min_{longest}d']):
+            text += (
+                f"\n📊 {longest} дн.: {format_price(row[f'min_{longest}d'])} – "
+                f"{format_price(row[f'max_{longest}d'])}"
+            )
+            volatility = row[f'volatility_{longest}d_pct']
+            if pd.notna(volatility):
+                text += f", волатильность {volatility:.1f}%"
+        if pd.notna(row['days_since_change']):
+            text += f"\n⏱ Без изменений {row['days_since_change']:.0f} дн."
+        text += "\n"
+
+    if len(metrics) > limit:
+        text += f"\n…и еще {len(metrics) - limit}. Полная таблица - в «📥 Скачать анализ»"
+    return text
@@ -0,0 +1,382 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from src.config.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+)
+from src.models.models import User, CatalogItem, Subscription, PriceHistory
+from src.services.db_engine import configure_sqlite
+from src.services.db_queries import (
+    added_product_dict,
+    catalog_item_by_url_query,
+    catalog_item_dict,
+    catalog_item_query,
+    new_catalog_item,
+    price_history_dicts,
+    price_history_query,
+    price_write_queries,
+    price_write_statements,
+    refresh_catalog_item,
+    subscription_dict,
+    subscription_exists_query,
+    subscription_item_query,
+    user_product_by_url_query,
+    user_products_query,
+    user_query,
+    user_subscription_query,
+)
+from src.services.price_writer import PriceUpdate
+
+logger = logging.getLogger(__name__)
+
+# Асинхронные драйверы для синхронных URL базы данных
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg'
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    URL базы данных с асинхронным драйвером
+
+    sqlite:///products.db -> sqlite+aiosqlite:///products.db,
+    postgresql://... -> postgresql+asyncpg://... Явно указанный драйвер
+    сохраняется, если он асинхронный.
+
+    Args:
+        url (str): URL из DATABASE_URL
+
+    Returns:
+        str: URL для create_async_engine
+    """
+    scheme, sep, rest = url.partition('://')
+    backend = scheme.split('+', 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Неподдерживаемая база данных: {backend}")
+    if '+' in scheme and scheme in ASYNC_DRIVERS.values():
+        return url
+    return f"{ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+
+def create_database_engine(url: str = DATABASE_URL, pool_size: int = DB_POOL_SIZE,
+                           max_overflow: int = DB_MAX_OVERFLOW, pool_timeout: int = DB_POOL_TIMEOUT,
+                           pool_recycle: int = DB_POOL_RECYCLE) -> AsyncEngine:
+    """
+    Асинхронный движок с явно настроенным пулом соединений
+
+    Для SQLite в памяти пул не настраивается: все сессии должны видеть
+    одну и ту же базу, SQLAlchemy использует для нее одно соединение.
+    Файловая SQLite получает те же настройки соединений, что и синхронный движок.
+    """
+    async_url = make_url(async_database_url(url))
+    if async_url.get_backend_name() == 'sqlite' and async_url.database in (None, '', ':memory:'):
+        return create_async_engine(async_url)
+    engine = create_async_engine(
+        async_url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        # Соединение проверяется при выдаче из пула, обрывы после простоя не доходят до обработчиков
+        pool_pre_ping=True
+    )
+    configure_sqlite(engine.sync_engine)
+    return engine
+
+
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    """Общий для процесса асинхронный движок базы данных"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_database_engine()
+            _session_factory = async_sessionmaker(_engine, expire_on_commit=False)
+        return _engine
+
+
+async def dispose_async_engine():
+    """Закрытие соединений пула при остановке бота"""
+    global _engine, _session_factory
+    with _engine_lock:
+        engine, _engine, _session_factory = _engine, None, None
+    if engine is not None:
+        await engine.dispose()
+        logger.info("Соединения с базой данных закрыты")
+
+
+@asynccontextmanager
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Асинхронный контекстный менеджер для работы с базой данных"""
+    get_async_engine()
+    async with _session_factory() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при работе с базой данных: {str(e)}")
+            await db.rollback()
+            raise
+
+
+async def _write_price_updates(db: AsyncSession, updates: List[PriceUpdate]):
+    """Запись цен в историю и агрегаты в текущей транзакции"""
+    latest_query, rollups_query = price_write_queries(updates)
+    latest_rows = (await db.execute(latest_query)).all()
+    rollup_rows = (await db.execute(rollups_query)).all()
+    for statement, params in price_write_statements(latest_rows, rollup_rows, updates):
+        await db.execute(statement, params)
+
+
+class AsyncDatabaseService:
+    """
+    Операции DatabaseService в виде корутин
+
+    Используется в обработчиках бота и обновлении цен: запросы не блокируют
+    цикл событий, соединения берутся из пула асинхронного движка.
+    """
+
+    @staticmethod
+    async def get_user(telegram_id: int):
+        """Получение пользователя по telegram_id"""
+        async with get_async_db() as db:
+            return (await db.execute(user_query(telegram_id))).scalar_one_or_none()
+
+    @staticmethod
+    async def create_user(telegram_id: int, username: str = None):
+        """Создание нового пользователя"""
+        async with get_async_db() as db:
+            user = User(telegram_id=telegram_id, username=username)
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+            return user
+
+    @staticmethod
+    async def update_user_activity(telegram_id: int):
+        """Обновление времени последней активности пользователя"""
+        async with get_async_db() as db:
+            user = (await db.execute(user_query(telegram_id))).scalar_one_or_none()
+
+            if user:
+                user.last_active = datetime.utcnow()
+                await db.commit()
+                await db.refresh(user)
+            return user
+
+    @staticmethod
+    async def get_user_products(telegram_id: int) -> List[Dict]:
+        """Получение списка товаров пользователя"""
+        async with get_async_db() as db:
+            rows = (await db.execute(user_products_query(telegram_id))).all()
+            return [subscription_dict(subscription, item) for subscription, item in rows]
+
+    @staticmethod
+    async def get_report_version(telegram_id: int) -> str:
+        """
+        Версия данных отчета пользователя
+        
+        Меняется при добавлении и удалении товаров, изменении их настроек,
+        каждой записи цены и изменении названия или старой цены товара
+        (все они обновляют last_updated товара каталога).
+        """
+        async with get_async_db() as db:
+            row = (await db.execute(
+                select(
+                    func.count(Subscription.id),
+                    func.max(Subscription.id),
+                    func.max(CatalogItem.last_updated),
+                    func.sum(func.coalesce(Subscription.target_price, 0)),
+                    func.sum(func.coalesce(Subscription.notify_threshold, 0))
+                )
+                .join(CatalogItem, Subscription.catalog_item_id == CatalogItem.id)
+                .join(User, Subscription.user_id == User.id)
+                .where(User.telegram_id == telegram_id)
+            )).one()
+            count, last_id, last_updated, targets, thresholds = row
+            updated = last_updated.isoformat() if last_updated else None
+            return f"{count}:{last_id}:{updated}:{targets}:{thresholds}"
+
+    @staticmethod
+    async def get_product_price_history(product_id: int) -> List[Dict]:
+        """Получение истории цен товара по id подписки"""
+        async with get_async_db() as db:
+            history = (await db.execute(price_history_query(product_id))).scalars().all()
+            return price_history_dicts(history, product_id)
+
+    @staticmethod
+    async def add_product(telegram_id: int, url: str, platform: str, name: str,
+                          current_price: float, original_price: float) -> Dict:
+        """Добавление товара: запись каталога создается один раз, пользователю - подписка"""
+        async with get_async_db() as db:
+            user = (await db.execute(user_query(telegram_id))).scalar_one_or_none()
+
+            if not user:
+                raise ValueError(f"Пользователь с telegram_id {telegram_id} не найден")
+
+            item = (await db.execute(catalog_item_by_url_query(url))).scalar_one_or_none()
+
+            if item is None:
+                item = new_catalog_item(url, platform, name, current_price, original_price)
+                db.add(item)
+                await db.flush()
+                await _write_price_updates(db, [PriceUpdate(item.id, current_price, datetime.utcnow())])
+            else:
+                subscribed = (await db.execute(subscription_exists_query(user.id, item.id))).scalar_one_or_none()
+
+                if subscribed:
+                    raise ValueError(f"Товар с URL {url} уже существует")
+
+                # Только что загруженная цена новее сохраненной в каталоге
+                price_update = refresh_catalog_item(item, name, current_price, original_price)
+                if price_update:
+                    await _write_price_updates(db, [price_update])
+
+            subscription = Subscription(
+                user_id=user.id,
+                catalog_item_id=item.id,
+                url=url
+            )
+            db.add(subscription)
+            await db.flush()
+            await db.commit()
+
+            return added_product_dict(subscription, item)
+
+    @staticmethod
+    async def get_product_by_url(url: str, telegram_id: Optional[int] = None) -> Optional[Dict]:
+        """Поиск товара по ссылке с учетом канонического ключа, при telegram_id - среди товаров пользователя"""
+        async with get_async_db() as db:
+            if telegram_id is None:
+                item = (await db.execute(catalog_item_by_url_query(url))).scalar_one_or_none()
+                return catalog_item_dict(item) if item else None
+
+            row = (await db.execute(user_product_by_url_query(url, telegram_id))).first()
+            return subscription_dict(*row) if row else None
+
+    @staticmethod
+    async def update_product_price(product_id: int, new_price: float):
+        """Обновление цены товара по id подписки"""
+        async with get_async_db() as db:
+            item_id = (await db.execute(subscription_item_query(product_id))).scalar_one_or_none()
+
+            if not item_id:
+                raise ValueError(f"Товар с ID {product_id} не найден")
+
+        await AsyncDatabaseService.update_catalog_price(item_id, new_price)
+
+    @staticmethod
+    async def update_catalog_price(catalog_item_id: int, new_price: float):
+        """Обновление цены товара каталога, история пишется один раз для всех подписчиков"""
+        async with get_async_db() as db:
+            item = (await db.execute(catalog_item_query(catalog_item_id))).scalar_one_or_none()
+
+            if not item:
+                raise ValueError(f"Товар каталога с ID {catalog_item_id} не найден")
+
+            now = datetime.utcnow()
+            item.current_price = new_price
+            item.last_updated = now
+
+            # Новая запись истории только при изменении цены, иначе продлевается последняя
+            await _write_price_updates(db, [PriceUpdate(catalog_item_id, new_price, now)])
+            await db.commit()
+
+    @staticmethod
+    async def update_catalog_prices(updates: List[PriceUpdate]):
+        """
+        Пакетное обновление цен одной транзакцией
+
+        Цены товаров обновляются одним массовым UPDATE (для товара берется
+        последняя цена в пакете). В истории неизменившиеся цены продлевают
+        последнюю запись товара одним массовым UPDATE, изменения добавляются
+        одной массовой вставкой. Почасовые и дневные агрегаты обновляются
+        в той же транзакции.
+
+        Args:
+            updates (List[PriceUpdate]): Новые цены товаров каталога
+        """
+        if not updates:
+            return
+
+        latest = {}
+        for price_update in sorted(updates, key=lambda price_update: price_update.timestamp):
+            latest[price_update.catalog_item_id] = price_update
+
+        async with get_async_db() as db:
+            await db.execute(
+                update(CatalogItem),
+                [
+                    {
+                        'id': price_update.catalog_item_id,
+                        'current_price': price_update.price,
+                        'last_updated': price_update.timestamp
+                    }
+                    for price_update in latest.values()
+                ]
+            )
+            await _write_price_updates(db, updates)
+            await db.commit()
+
+    @staticmethod
+    async def delete_product(product_id: int, telegram_id: int):
+        """Удаление товара из списка пользователя"""
+        async with get_async_db() as db:
+            user = (await db.execute(user_query(telegram_id))).scalar_one_or_none()
+
+            if not user:
+                raise ValueError(f"Пользователь с telegram_id {telegram_id} не найден")
+
+            subscription = (await db.execute(user_subscription_query(product_id, user.id))).scalar_one_or_none()
+
+            if not subscription:
+                raise ValueError(f"Товар с ID {product_id} не найден или не принадлежит пользователю")
+
+            await db.delete(subscription)
+            await db.commit()
+
+    @staticmethod
+    async def get_refresh_rows(since: datetime):
+        """
+        Подписки и история цен для расписания обновления
+
+        Args:
+            since (datetime): Начало периода истории цен
+
+        Returns:
+            Tuple[list, list]: Строки подписок с товарами каталога и записи истории цен
+        """
+        async with get_async_db() as db:
+            subscriptions = (await db.execute(
+                select(CatalogItem.id, CatalogItem.product_key, CatalogItem.url, CatalogItem.name,
+                       CatalogItem.current_price, Subscription.id.label('subscription_id'),
+                       Subscription.notify_threshold, Subscription.target_price, User.telegram_id)
+                .join(Subscription, Subscription.catalog_item_id == CatalogItem.id)
+                .join(User, Subscription.user_id == User.id)
+                .where(Subscription.is_active.is_(True))
+                .order_by(CatalogItem.id)
+            )).all()
+            history = (await db.execute(
+                select(PriceHistory.catalog_item_id, PriceHistory.price, PriceHistory.timestamp,
+                       PriceHistory.confirmations)
+                .where(PriceHistory.last_confirmed >= since)
+                .order_by(PriceHistory.catalog_item_id, PriceHistory.timestamp)
+            )).all()
+            return subscriptions, history
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from src.config.config import (
+    BATCH_CONCURRENCY,
+    BATCH_PLATFORM_CONCURRENCY,
+    BATCH_PROGRESS_INTERVAL,
+)
+from src.utils.urls import detect_platform
+
+logger = logging.getLogger(__name__)
+
+
+class BatchProgress:
+    """Прогресс пакетной обработки: скорость и оставшееся время"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed
+
+    def rate_per_minute(self) -> float:
+        """Количество обработанных ссылок в минуту"""
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed * 60 if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """Оценка оставшегося времени в секундах"""
+        rate = self.rate_per_minute()
+        if not rate:
+            return None
+        return (self.total - self.done) / rate * 60
+
+    def line(self) -> str:
+        """Строка прогресса для логов"""
+        eta = self.eta_seconds()
+        eta_text = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else '--:--:--'
+        return (
+            f"Обработано {self.done} из {self.total} "
+            f"(успешно {self.succeeded}, ошибок {self.failed}), "
+            f"{self.rate_per_minute():.1f} ссылок/мин, осталось ~{eta_text}"
+        )
+
+
+class BatchRunner:
+    """
+    Параллельная обработка списка ссылок
+
+    Общее число одновременных загрузок ограничено concurrency, для каждой
+    площадки действует свой лимит. Очередь ссылок ограничена, поэтому в
+    работе никогда не находится больше задач, чем могут обработать воркеры.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Optional[dict]]],
+                 concurrency: int = BATCH_CONCURRENCY,
+                 platform_limits: Optional[Dict[str, int]] = None,
+                 progress_interval: float = BATCH_PROGRESS_INTERVAL,
+                 on_result: Optional[Callable[[str, Optional[dict], Optional[str]], None]] = None):
+        self.fetch = fetch
+        # Вызывается после каждой ссылки: (url, данные или None, текст ошибки или None)
+        self.on_result = on_result
+        self.concurrency = max(1, concurrency)
+        limits = BATCH_PLATFORM_CONCURRENCY if platform_limits is None else platform_limits
+        self.platform_limits = {platform: max(1, limit) for platform, limit in limits.items()}
+        self.progress_interval = progress_interval
+        self.progress: Optional[BatchProgress] = None
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            logger.info(self.progress.line())
+
+    async def _worker(self, queue: asyncio.Queue, semaphores: Dict[str, asyncio.Semaphore],
+                      results: Dict[str, dict]):
+        while True:
+            url = await queue.get()
+            try:
+                if url is None:
+                    return
+
+                semaphore = semaphores.get(detect_platform(url))
+                error = None
+                try:
+                    if semaphore is not None:
+                        async with semaphore:
+                            data = await self.fetch(url)
+                    else:
+                        data = await self.fetch(url)
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке {url}: {str(e)}")
+                    data = None
+                    error = str(e)
+
+                if data:
+                    results[url] = data
+                    self.progress.succeeded += 1
+                else:
+                    logger.warning(f"Не удалось получить данные для {url}")
+                    self.progress.failed += 1
+                    error = error or "Не удалось получить данные"
+
+                if self.on_result is not None:
+                    self.on_result(url, data, error)
+            finally:
+                queue.task_done()
+
+    async def run(self, urls: Iterable[str]) -> Dict[str, dict]:
+        """
+        Обработка всех ссылок
+
+        Args:
+            urls (Iterable[str]): Ссылки на товары
+
+        Returns:
+            Dict[str, dict]: Результаты по успешно обработанным ссылкам
+        """
+        urls: List[str] = list(urls)
+        self.progress = BatchProgress(len(urls))
+        results: Dict[str, dict] = {}
+
+        semaphores = {
+            platform: asyncio.Semaphore(limit)
+            for platform, limit in self.platform_limits.items()
+        }
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [
+            asyncio.create_task(self._worker(queue, semaphores, results))
+            for _ in range(self.concurrency)
+        ]
+        reporter = asyncio.create_task(self._report_progress())
+
+        try:
+            for url in urls:
+                await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+
+        logger.info(self.progress.line())
+        return results
@@ -1,7 +1,8 @@
 import logging
 from typing import List, Dict
-from src.services.database import DatabaseService
+from src.services.async_database import AsyncDatabaseService
 from src.services.parser import ParserService
+from src.utils.urls import unique_links
 import asyncio
 import re
 
@@ -43,7 +44,7 @@ class BulkImporterService:
         try:
             # Читаем файл
             with open(file_path, 'r') as file:
-                links = [line.strip() for line in file if line.strip()]
+                links = unique_links(line.strip() for line in file if line.strip())
             
             # Обрабатываем каждую ссылку
             for link in links:
@@ -51,6 +52,11 @@ class BulkImporterService:
                     # Определяем платформу
                     platform = self._get_platform_from_url(link)
                     
+                    # Товар уже отслеживается пользователем, повторно не парсим
+                    if await AsyncDatabaseService.get_product_by_url(link, telegram_id):
+                        results['errors'].append(f"Товар уже добавлен: {link}")
+                        continue
+                    
                     # Получаем данные о товаре
                     product_data = await self.parser.get_product_data(link, platform)
                     
@@ -59,7 +65,7 @@ class BulkImporterService:
                         continue
                     
                     # Добавляем товар в базу
-                    DatabaseService.add_product(
+                    await AsyncDatabaseService.add_product(
                         telegram_id=telegram_id,
                         url=link,
                         platform=platform,
@@ -73,9 +79,6 @@ class BulkImporterService:
                 except Exception as e:
                     logger.error(f"Ошибка при обработке ссылки {link}: {str(e)}")
                     results['errors'].append(f"Ошибка при обработке {link}: {str(e)}")
-                
-                # Небольшая задержка между запросами
-                await asyncio.sleep(1)
             
             return results
             
@@ -1,16 +1,38 @@
-from sqlalchemy import create_engine, select
+from sqlalchemy import func, select
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 from src.config.config import DATABASE_URL
-from src.models.models import Base, User, Product, PriceHistory
+from src.services.db_engine import get_engine
+from src.models.models import Base, User, Subscription, PriceHistory, PriceRollup
+from src.services.db_queries import (
+    added_product_dict,
+    catalog_item_by_url_query,
+    catalog_item_dict,
+    catalog_item_query,
+    new_catalog_item,
+    price_history_dicts,
+    price_history_query,
+    price_write_queries,
+    price_write_statements,
+    refresh_catalog_item,
+    subscription_dict,
+    subscription_exists_query,
+    subscription_item_query,
+    user_product_by_url_query,
+    user_products_query,
+    user_query,
+    user_subscription_query,
+)
+from src.services.price_writer import PriceUpdate
+from src.services.rollups import bucket_start, choose_tier
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Создаем движок
-engine = create_engine(DATABASE_URL)
+# Общий для процесса движок
+engine = get_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
 @contextmanager
@@ -27,15 +49,20 @@ def get_db():
     finally:
         db.close()
 
+def write_price_updates(db, updates: List[PriceUpdate]):
+    """Запись цен в историю и агрегаты в текущей транзакции"""
+    latest_query, rollups_query = price_write_queries(updates)
+    latest_rows = db.execute(latest_query).all()
+    rollup_rows = db.execute(rollups_query).all()
+    for statement, params in price_write_statements(latest_rows, rollup_rows, updates):
+        db.execute(statement, params)
+
 class DatabaseService:
     @staticmethod
     def get_user(telegram_id: int):
         """Получение пользователя по telegram_id"""
         with get_db() as db:
-            result = db.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            return result.scalar_one_or_none()
+            return db.execute(user_query(telegram_id)).scalar_one_or_none()
 
     @staticmethod
     def create_user(telegram_id: int, username: str = None):
@@ -51,9 +78,7 @@ class DatabaseService:
     def update_user_activity(telegram_id: int):
         """Обновление времени последней активности пользователя"""
         with get_db() as db:
-            user = db.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            ).scalar_one_or_none()
+            user = db.execute(user_query(telegram_id)).scalar_one_or_none()
             
             if user:
                 user.last_active = datetime.utcnow()
@@ -65,145 +90,199 @@ class DatabaseService:
     def get_user_products(telegram_id: int):
         """Получение списка товаров пользователя"""
         with get_db() as db:
-            # Получаем пользователя по telegram_id
-            user = db.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            ).scalar_one_or_none()
-            
-            if not user:
-                return []
-            
-            # Получаем товары пользователя
-            products = db.execute(
-                select(Product)
-                .where(Product.user_id == user.id)
-            ).scalars().all()
-            
-            # Преобразуем объекты в словари
-            return [{
-                'id': p.id,
-                'name': p.name,
-                'current_price': p.current_price,
-                'original_price': p.original_price,
-                'platform': p.platform,
-                'url': p.url
-            } for p in products]
+            # Подписки пользователя вместе с товарами каталога одним запросом
+            rows = db.execute(user_products_query(telegram_id)).all()
+            return [subscription_dict(subscription, item) for subscription, item in rows]
 
     @staticmethod
     def get_product_price_history(product_id: int) -> List[Dict]:
-        """Получение истории цен товара"""
+        """Получение истории цен товара по id подписки"""
         with get_db() as db:
-            history = db.execute(
-                select(PriceHistory)
-                .where(PriceHistory.product_id == product_id)
-                .order_by(PriceHistory.timestamp.desc())  # Сортировка по убыванию даты
-            ).scalars().all()
-            
-            return [
-                {
-                    'id': record.id,
-                    'product_id': record.product_id,
-                    'price': record.price,
-                    'timestamp': record.timestamp.strftime('%Y-%m-%d %H:%M:%S') if record.timestamp else None
-                }
-                for record in history
-            ]
+            history = db.execute(price_history_query(product_id)).scalars().all()
+            return price_history_dicts(history, product_id)
+
+    @staticmethod
+    def get_price_series(product_id: int, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> Dict:
+        """
+        Цены товара за период из подходящего уровня истории
+        
+        Короткий период читается из сырых записей, средний - из почасовых
+        агрегатов, длинный - из дневных.
+        
+        Args:
+            product_id (int): ID подписки
+            start (Optional[datetime]): Начало периода (UTC), по умолчанию - начало истории
+            end (Optional[datetime]): Конец периода (UTC), по умолчанию - текущее время
+            
+        Returns:
+            Dict: Уровень ('raw', 'hour', 'day') и точки по возрастанию времени:
+                timestamp, open, high, low, close, avg, count
+        """
+        end = end or datetime.utcnow()
+        with get_db() as db:
+            item_id = db.execute(subscription_item_query(product_id)).scalar_one_or_none()
+            if not item_id:
+                return {'tier': 'raw', 'points': []}
+            
+            if start is None:
+                # Дневные агрегаты покрывают всю историю, включая удаленные сырые записи
+                start = db.execute(
+                    select(func.min(PriceRollup.bucket_start))
+                    .where(PriceRollup.catalog_item_id == item_id, PriceRollup.granularity == 'day')
+                ).scalar() or db.execute(
+                    select(func.min(PriceHistory.timestamp)).where(PriceHistory.catalog_item_id == item_id)
+                ).scalar() or end
+            tier = choose_tier(start, end)
+            
+            if tier == 'raw':
+                runs = db.execute(
+                    select(PriceHistory)
+                    .where(PriceHistory.catalog_item_id == item_id)
+                    .where(PriceHistory.last_confirmed >= start, PriceHistory.timestamp <= end)
+                    .order_by(PriceHistory.timestamp)
+                ).scalars().all()
+                # Период с одной ценой дает точки появления цены и ее последнего подтверждения
+                points = []
+                for run in runs:
+                    confirmations = run.confirmations or 1
+                    ends = [(run.timestamp, 1)]
+                    if run.last_confirmed and run.last_confirmed != run.timestamp and confirmations > 1:
+                        ends.append((run.last_confirmed, confirmations - 1))
+                    points.extend(
+                        {
+                            'timestamp': timestamp,
+                            'open': run.price,
+                            'high': run.price,
+                            'low': run.price,
+                            'close': run.price,
+                            'avg': run.price,
+                            'count': count
+                        }
+                        for timestamp, count in ends
+                        if start <= timestamp <= end
+                    )
+                points.sort(key=lambda point: point['timestamp'])
+            else:
+                rollups = db.execute(
+                    select(PriceRollup)
+                    .where(PriceRollup.catalog_item_id == item_id, PriceRollup.granularity == tier)
+                    .where(PriceRollup.bucket_start >= bucket_start(start, tier), PriceRollup.bucket_start <= end)
+                    .order_by(PriceRollup.bucket_start)
+                ).scalars().all()
+                points = [
+                    {
+                        'timestamp': rollup.bucket_start,
+                        'open': rollup.open,
+                        'high': rollup.high,
+                        'low': rollup.low,
+                        'close': rollup.close,
+                        'avg': rollup.avg,
+                        'count': rollup.count
+                    }
+                    for rollup in rollups
+                ]
+            return {'tier': tier, 'points': points}
 
     @staticmethod
     def add_product(telegram_id: int, url: str, platform: str, name: str, 
                    current_price: float, original_price: float) -> Dict:
-        """Добавление нового товара"""
+        """Добавление товара: запись каталога создается один раз, пользователю - подписка"""
         with get_db() as db:
             # Получаем пользователя по telegram_id
-            user = db.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            ).scalar_one_or_none()
+            user = db.execute(user_query(telegram_id)).scalar_one_or_none()
             
             if not user:
                 raise ValueError(f"Пользователь с telegram_id {telegram_id} не найден")
             
-            # Проверяем, не существует ли уже такой товар
-            existing_product = db.execute(
-                select(Product).where(Product.url == url)
-            ).scalar_one_or_none()
+            # Ссылки с разными параметрами отслеживания ведут на один товар каталога
+            item = db.execute(catalog_item_by_url_query(url)).scalar_one_or_none()
             
-            if existing_product:
-                raise ValueError(f"Товар с URL {url} уже существует")
+            if item is None:
+                item = new_catalog_item(url, platform, name, current_price, original_price)
+                db.add(item)
+                db.flush()  # Получаем ID товара без коммита
+                write_price_updates(db, [PriceUpdate(item.id, current_price, datetime.utcnow())])
+            else:
+                subscribed = db.execute(subscription_exists_query(user.id, item.id)).scalar_one_or_none()
+                
+                if subscribed:
+                    raise ValueError(f"Товар с URL {url} уже существует")
+                
+                # Только что загруженная цена новее сохраненной в каталоге
+                price_update = refresh_catalog_item(item, name, current_price, original_price)
+                if price_update:
+                    write_price_updates(db, [price_update])
             
-            # Создаем товар
-            product = Product(
+            subscription = Subscription(
                 user_id=user.id,
-                url=url,
-                platform=platform,
-                name=name,
-                current_price=current_price,
-                original_price=original_price
+                catalog_item_id=item.id,
+                url=url
             )
-            db.add(product)
-            db.flush()  # Получаем ID товара без коммита
-            
-            # Добавляем запись в историю цен
-            price_history = PriceHistory(
-                product_id=product.id,
-                price=current_price
-            )
-            db.add(price_history)
+            db.add(subscription)
+            db.flush()
             
             # Коммитим все изменения
             db.commit()
             
             # Возвращаем копию объекта с нужными данными
-            return {
-                'id': product.id,
-                'name': product.name,
-                'current_price': product.current_price,
-                'original_price': product.original_price
-            }
+            return added_product_dict(subscription, item)
+
+    @staticmethod
+    def get_product_by_url(url: str, telegram_id: Optional[int] = None) -> Optional[Dict]:
+        """Поиск товара по ссылке с учетом канонического ключа, при telegram_id - среди товаров пользователя"""
+        with get_db() as db:
+            if telegram_id is None:
+                item = db.execute(catalog_item_by_url_query(url)).scalar_one_or_none()
+                return catalog_item_dict(item) if item else None
+            
+            row = db.execute(user_product_by_url_query(url, telegram_id)).first()
+            return subscription_dict(*row) if row else None
 
     @staticmethod
     def update_product_price(product_id: int, new_price: float):
-        """Обновление цены товара"""
+        """Обновление цены товара по id подписки"""
         with get_db() as db:
-            product = db.execute(
-                select(Product).where(Product.id == product_id)
-            ).scalar_one_or_none()
+            item_id = db.execute(subscription_item_query(product_id)).scalar_one_or_none()
             
-            if not product:
+            if not item_id:
                 raise ValueError(f"Товар с ID {product_id} не найден")
+        
+        DatabaseService.update_catalog_price(item_id, new_price)
+
+    @staticmethod
+    def update_catalog_price(catalog_item_id: int, new_price: float):
+        """Обновление цены товара каталога, история пишется один раз для всех подписчиков"""
+        with get_db() as db:
+            item = db.execute(catalog_item_query(catalog_item_id)).scalar_one_or_none()
             
-            product.current_price = new_price
-            product.last_updated = datetime.utcnow()
+            if not item:
+                raise ValueError(f"Товар каталога с ID {catalog_item_id} не найден")
             
-            # Добавляем запись в историю цен
-            price_history = PriceHistory(
-                product_id=product_id,
-                price=new_price
-            )
-            db.add(price_history)
+            now = datetime.utcnow()
+            item.current_price = new_price
+            item.last_updated = now
+            
+            # Новая запись истории только при изменении цены, иначе продлевается последняя
+            write_price_updates(db, [PriceUpdate(catalog_item_id, new_price, now)])
             db.commit()
 
     @staticmethod
     def delete_product(product_id: int, telegram_id: int):
-        """Удаление товара"""
+        """Удаление товара из списка пользователя"""
         with get_db() as db:
             # Получаем пользователя
-            user = db.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            ).scalar_one_or_none()
+            user = db.execute(user_query(telegram_id)).scalar_one_or_none()
             
             if not user:
                 raise ValueError(f"Пользователь с telegram_id {telegram_id} не найден")
             
-            # Получаем товар
-            product = db.execute(
-                select(Product)
-                .where(Product.id == product_id)
-                .where(Product.user_id == user.id)
-            ).scalar_one_or_none()
+            # Получаем подписку
+            subscription = db.execute(user_subscription_query(product_id, user.id)).scalar_one_or_none()
             
-            if not product:
+            if not subscription:
                 raise ValueError(f"Товар с ID {product_id} не найден или не принадлежит пользователю")
             
-            # Удаляем товар (каскадное удаление через relationship)
-            db.delete(product)
+            # Удаляется только подписка, товар и история цен остаются в каталоге
+            db.delete(subscription)
             db.commit() 
\ No newline at end of file
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import threading
+from typing import Dict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+
+from src.config.config import (
+    DATABASE_URL,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_MAINTENANCE_INTERVAL,
+    SQLITE_VACUUM_PAGES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Режим auto_vacuum, при котором свободные страницы освобождаются по PRAGMA incremental_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def is_sqlite(url: str) -> bool:
+    """Используется ли SQLite"""
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(url: str) -> bool:
+    """База SQLite в памяти: у нее нет файла и журнала WAL"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == 'sqlite' and parsed.database in (None, '', ':memory:')
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    Настройка нового соединения SQLite
+
+    WAL позволяет читать во время записи, synchronous=NORMAL в режиме WAL
+    не теряет целостность и не ждет fsync на каждую транзакцию,
+    busy_timeout ждет освобождения блокировки вместо ошибки
+    "database is locked". Подходит и для sqlite3, и для aiosqlite.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # Отрицательное значение - размер кэша в КиБ, а не в страницах
+        cursor.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(engine: Engine) -> Engine:
+    """Применение настроек SQLite к каждому соединению движка (синхронного или sync_engine асинхронного)"""
+    if is_sqlite(str(engine.url)) and not is_memory_sqlite(str(engine.url)):
+        event.listen(engine, 'connect', apply_sqlite_pragmas)
+    return engine
+
+
+def enable_incremental_vacuum(engine: Engine):
+    """
+    Включение auto_vacuum=INCREMENTAL
+
+    Для существующей базы режим вступает в силу только после полного VACUUM,
+    поэтому он выполняется один раз при первом запуске с этой настройкой.
+    """
+    if not is_sqlite(str(engine.url)) or is_memory_sqlite(str(engine.url)):
+        return
+    # VACUUM нельзя выполнять внутри транзакции
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+            logger.info("Для базы SQLite включена инкрементальная очистка")
+
+
+def maintain_sqlite(engine: Engine, vacuum_pages: int = SQLITE_VACUUM_PAGES):
+    """
+    Обслуживание базы SQLite: статистика планировщика запросов,
+    возврат свободных страниц и усечение журнала WAL
+    """
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text("ANALYZE"))
+        conn.execute(text(f"PRAGMA incremental_vacuum({int(vacuum_pages)})"))
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+
+async def run_sqlite_maintenance(engine: Engine, interval: float = SQLITE_MAINTENANCE_INTERVAL):
+    """Периодическое обслуживание базы до отмены задачи, выполняется вне цикла событий"""
+    if not is_sqlite(str(engine.url)) or is_memory_sqlite(str(engine.url)):
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(maintain_sqlite, engine)
+            logger.info("Выполнено обслуживание базы SQLite")
+        except Exception as e:
+            logger.error(f"Ошибка при обслуживании базы SQLite: {str(e)}")
+
+
+def create_database_engine(url: str = DATABASE_URL, **kwargs) -> Engine:
+    """Синхронный движок базы данных, для SQLite - с настройками производительности"""
+    return configure_sqlite(create_engine(url, **kwargs))
+
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(url: str = DATABASE_URL) -> Engine:
+    """
+    Общий для процесса синхронный движок
+
+    Модели, DatabaseService и отчеты используют один пул соединений,
+    а не создают каждый свой.
+    """
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = create_database_engine(url)
+            _engines[url] = engine
+        return engine
@@ -0,0 +1,230 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from src.models.models import User, CatalogItem, Subscription, PriceHistory
+from src.services.price_history import format_timestamp, plan_history_writes
+from src.services.price_writer import PriceUpdate
+from src.services.rollups import existing_rollups_query, observations_from_updates, rollup_statements
+from src.utils.urls import canonicalize, product_key
+
+
+def user_query(telegram_id: int):
+    """Пользователь по telegram_id"""
+    return select(User).where(User.telegram_id == telegram_id)
+
+
+def user_products_query(telegram_id: int):
+    """Подписки пользователя вместе с товарами каталога"""
+    return (
+        select(Subscription, CatalogItem)
+        .join(CatalogItem, Subscription.catalog_item_id == CatalogItem.id)
+        .join(User, Subscription.user_id == User.id)
+        .where(User.telegram_id == telegram_id)
+        .order_by(Subscription.id)
+    )
+
+
+def user_product_by_url_query(url: str, telegram_id: int):
+    """Подписка пользователя на товар по ссылке с учетом канонического ключа"""
+    return (
+        select(Subscription, CatalogItem)
+        .join(CatalogItem, Subscription.catalog_item_id == CatalogItem.id)
+        .join(User, Subscription.user_id == User.id)
+        .where(CatalogItem.product_key == product_key(url))
+        .where(User.telegram_id == telegram_id)
+    )
+
+
+def catalog_item_by_url_query(url: str):
+    """Товар каталога по ссылке с учетом канонического ключа"""
+    return select(CatalogItem).where(CatalogItem.product_key == product_key(url))
+
+
+def catalog_item_query(catalog_item_id: int):
+    """Товар каталога по id"""
+    return select(CatalogItem).where(CatalogItem.id == catalog_item_id)
+
+
+def subscription_item_query(product_id: int):
+    """id товара каталога по id подписки"""
+    return select(Subscription.catalog_item_id).where(Subscription.id == product_id)
+
+
+def subscription_exists_query(user_id: int, catalog_item_id: int):
+    """Подписка пользователя на товар каталога"""
+    return (
+        select(Subscription.id)
+        .where(Subscription.user_id == user_id)
+        .where(Subscription.catalog_item_id == catalog_item_id)
+    )
+
+
+def user_subscription_query(product_id: int, user_id: int):
+    """Подписка по id, если она принадлежит пользователю"""
+    return (
+        select(Subscription)
+        .where(Subscription.id == product_id)
+        .where(Subscription.user_id == user_id)
+    )
+
+
+def price_history_query(product_id: int):
+    """История цен товара по id подписки, по убыванию даты"""
+    return (
+        select(PriceHistory)
+        .join(Subscription, Subscription.catalog_item_id == PriceHistory.catalog_item_id)
+        .where(Subscription.id == product_id)
+        .order_by(PriceHistory.timestamp.desc())
+    )
+
+
+def new_catalog_item(url: str, platform: str, name: str, current_price: float,
+                     original_price: float) -> CatalogItem:
+    """Запись каталога для товара, которого еще нет"""
+    platform_sku = canonicalize(url)
+    return CatalogItem(
+        product_key=product_key(url),
+        platform=platform,
+        sku=platform_sku[1] if platform_sku else None,
+        url=url,
+        name=name,
+        current_price=current_price,
+        original_price=original_price
+    )
+
+
+def refresh_catalog_item(item: CatalogItem, name: str, current_price: float,
+                         original_price: float) -> Optional[PriceUpdate]:
+    """
+    Данные только что загруженного товара в существующей записи каталога
+
+    last_updated меняется при изменении любого поля товара, а не только
+    цены: по нему определяется версия отчетов подписчиков.
+
+    Returns:
+        Optional[PriceUpdate]: Цена для записи в историю, если она изменилась
+    """
+    name = name or item.name
+    original_price = original_price or item.original_price
+    if (current_price, original_price, name) == (item.current_price, item.original_price, item.name):
+        return None
+
+    price_changed = current_price != item.current_price
+    item.current_price = current_price
+    item.original_price = original_price
+    item.name = name
+    item.last_updated = datetime.utcnow()
+    return PriceUpdate(item.id, current_price, item.last_updated) if price_changed else None
+
+
+def subscription_dict(subscription: Subscription, item: CatalogItem) -> Dict:
+    """Товар пользователя: id подписки и данные товара из каталога"""
+    return {
+        'id': subscription.id,
+        'catalog_item_id': item.id,
+        'name': item.name,
+        'current_price': item.current_price,
+        'original_price': item.original_price,
+        'platform': item.platform,
+        'url': subscription.url or item.url,
+        'notify_threshold': subscription.notify_threshold,
+        'target_price': subscription.target_price
+    }
+
+
+def added_product_dict(subscription: Subscription, item: CatalogItem) -> Dict:
+    """Результат добавления товара"""
+    return {
+        'id': subscription.id,
+        'catalog_item_id': item.id,
+        'name': item.name,
+        'current_price': item.current_price,
+        'original_price': item.original_price
+    }
+
+
+def catalog_item_dict(item: CatalogItem) -> Dict:
+    """Товар каталога без подписки пользователя"""
+    return {
+        'id': None,
+        'catalog_item_id': item.id,
+        'name': item.name,
+        'current_price': item.current_price,
+        'original_price': item.original_price,
+        'platform': item.platform,
+        'url': item.url
+    }
+
+
+def price_history_dicts(history: List[PriceHistory], product_id: int) -> List[Dict]:
+    """Записи истории цен для обработчиков и отчетов"""
+    return [
+        {
+            'id': record.id,
+            'product_id': product_id,
+            'catalog_item_id': record.catalog_item_id,
+            'price': record.price,
+            # Запись - период с одной ценой: от появления до последнего подтверждения
+            'timestamp': format_timestamp(record.timestamp),
+            'last_confirmed': format_timestamp(record.last_confirmed),
+            'confirmations': record.confirmations
+        }
+        for record in history
+    ]
+
+
+def latest_history_query(catalog_item_ids: List[int]):
+    """Последние по времени записи истории цен товаров каталога: (id записи, id товара, цена)"""
+    ranked = (
+        select(
+            PriceHistory.id,
+            PriceHistory.catalog_item_id,
+            PriceHistory.price,
+            func.row_number().over(
+                partition_by=PriceHistory.catalog_item_id,
+                order_by=(PriceHistory.timestamp.desc(), PriceHistory.id.desc())
+            ).label('position')
+        )
+        .where(PriceHistory.catalog_item_id.in_(catalog_item_ids))
+        .subquery()
+    )
+    return select(ranked.c.id, ranked.c.catalog_item_id, ranked.c.price).where(ranked.c.position == 1)
+
+
+def history_statements(latest_rows, updates) -> list:
+    """
+    Запросы записи истории только изменений цен
+
+    Returns:
+        list: Пары (запрос, параметры executemany), пустые пропускаются
+    """
+    latest = {row.catalog_item_id: (row.id, row.price) for row in latest_rows}
+    confirms, inserts = plan_history_writes(latest, updates)
+    table = PriceHistory.__table__
+    statements = []
+    if confirms:
+        statements.append((
+            update(table)
+            .where(table.c.id == bindparam('row_id'))
+            .values(last_confirmed=bindparam('confirmed'),
+                    confirmations=table.c.confirmations + bindparam('added')),
+            confirms
+        ))
+    if inserts:
+        statements.append((insert(PriceHistory), inserts))
+    return statements
+
+
+def price_write_queries(updates: List[PriceUpdate]) -> tuple:
+    """Запросы текущего состояния, нужного для записи цен: последние записи истории и агрегаты"""
+    observations = observations_from_updates(updates)
+    item_ids = sorted({update.catalog_item_id for update in updates})
+    return latest_history_query(item_ids), existing_rollups_query(observations)
+
+
+def price_write_statements(latest_rows, rollup_rows, updates: List[PriceUpdate]) -> list:
+    """Запросы записи истории только изменений и почасовых и дневных агрегатов"""
+    return (history_statements(latest_rows, updates)
+            + rollup_statements(rollup_rows, observations_from_updates(updates)))
@@ -0,0 +1,154 @@
+import logging
+from typing import Dict, List, Tuple
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+# Поля страницы товара для каждой площадки. Для поля перечисляются
+# альтернативные селекторы, используется первый найденный элемент.
+PAGE_FIELDS = {
+    'ozon': {
+        'product_name': {
+            'required': True,
+            'selectors': [
+                ('xpath', '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[1]/div[1]/div[2]/div/div/div/div[1]/h1'),
+                ('css', '[data-widget="webProductHeading"] h1'),
+            ]
+        },
+        'price_with_discount': {
+            'required': True,
+            'selectors': [
+                ('xpath', '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[2]/div/div/div[1]/div[2]/div/div[1]/div/div/div[1]/div[1]/button/span/div/div[1]/div/div/span'),
+            ]
+        },
+        'price_without_discount': {
+            'required': False,
+            'selectors': [
+                ('xpath', '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[2]/div/div/div[1]/div[2]/div/div[1]/div/div/div[1]/div[2]/div/div[1]/span'),
+            ]
+        }
+    },
+    'wildberries': {
+        'product_name': {
+            'required': True,
+            'selectors': [
+                ('css', '.product-page__header'),
+            ]
+        },
+        'price_with_discount': {
+            'required': True,
+            'selectors': [
+                ('xpath', '/html/body/div[1]/main/div[2]/div[2]/div[3]/div/div[3]/div[13]/div/div[1]/div[1]/div/div/div/p/span/span'),
+                ('css', '.price-block__final-price'),
+            ]
+        },
+        'price_without_discount': {
+            'required': False,
+            'selectors': [
+                ('xpath', '/html/body/div[1]/main/div[2]/div[2]/div[3]/div/div[3]/div[13]/div/div[1]/div[1]/div/div/div/p/span/ins'),
+                ('css', '.price-block__old-price'),
+            ]
+        }
+    },
+    'market': {
+        'product_name': {
+            'required': True,
+            'selectors': [
+                ('css', '[data-auto="productCardTitle"]'),
+                ('css', 'h1'),
+                ('css', '.cia-cs'),
+            ]
+        },
+        'price_with_discount': {
+            'required': True,
+            'selectors': [
+                ('css', '[data-auto="snippet-price-current"]'),
+                ('css', '[data-auto="price"]'),
+                ('css', '.cia-cs'),
+            ]
+        },
+        'price_without_discount': {
+            'required': False,
+            'selectors': [
+                ('css', '[data-auto="snippet-price-old"]'),
+                ('css', '[data-auto="oldPrice"]'),
+            ]
+        }
+    }
+}
+
+# Все поля извлекаются одним вызовом execute_script
+_EXTRACT_SCRIPT = """
+const fields = arguments[0];
+const result = {};
+for (const [key, spec] of Object.entries(fields)) {
+    let text = null;
+    for (const [by, selector] of spec.selectors) {
+        let element = null;
+        if (by === 'xpath') {
+            element = document.evaluate(
+                selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+            ).singleNodeValue;
+        } else {
+            element = document.querySelector(selector);
+        }
+        if (element) {
+            text = (element.innerText || element.textContent || '').trim();
+            if (text) {
+                break;
+            }
+        }
+    }
+    result[key] = text;
+}
+return result;
+"""
+
+
+def _extract_once(driver, fields: Dict[str, dict]) -> Dict[str, str]:
+    return driver.execute_script(_EXTRACT_SCRIPT, fields) or {}
+
+
+def _missing(values: Dict[str, str], fields: Dict[str, dict], required_only: bool) -> List[str]:
+    return [
+        key for key, spec in fields.items()
+        if not values.get(key) and (spec['required'] or not required_only)
+    ]
+
+
+def extract_page(driver, platform: str, timeout: float = 10,
+                 poll_frequency: float = 0.25) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Извлечение полей страницы товара за одно ожидание
+
+    Скрипт извлечения опрашивается, пока не появятся все обязательные поля
+    или не истечет timeout. Отсутствие необязательных полей (например,
+    старой цены) не приводит к ожиданию.
+
+    Args:
+        driver: Драйвер с загруженной страницей товара
+        platform (str): Ключ площадки (ozon, wildberries, market)
+        timeout (float): Максимальное время ожидания обязательных полей
+        poll_frequency (float): Интервал опроса страницы
+
+    Returns:
+        Tuple[Dict[str, str], List[str]]: Значения полей и список ненайденных полей
+    """
+    fields = PAGE_FIELDS[platform]
+    snapshot: Dict[str, str] = {}
+
+    def ready(d):
+        snapshot.clear()
+        snapshot.update(_extract_once(d, fields))
+        return not _missing(snapshot, fields, required_only=True)
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(ready)
+    except TimeoutException:
+        logger.warning(f"Не дождались обязательных полей страницы {platform}: "
+                       f"{', '.join(_missing(snapshot, fields, required_only=True))}")
+
+    values = {key: snapshot.get(key) or '' for key in fields}
+    return values, _missing(snapshot, fields, required_only=False)
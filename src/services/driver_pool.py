@@ -0,0 +1,492 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import undetected_chromedriver as uc
+from selenium.common.exceptions import WebDriverException
+
+from src.config.config import (
+    DRIVER_POOL_SIZE,
+    DRIVER_MAX_PAGES,
+    DRIVER_MAX_RSS_MB,
+    DRIVER_LIGHTWEIGHT,
+    DRIVER_PROFILE_ROOT,
+    CHROME_BINARY_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# Список реалистичных User-Agent'ов
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3.1 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0'
+]
+
+# Запросы, которые не нужны для извлечения названия и цены
+BLOCKED_URL_PATTERNS = [
+    # Картинки
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*',
+    # Стили и шрифты
+    '*.css*', '*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*',
+    # Медиа
+    '*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*',
+    # Аналитика и счетчики
+    '*mc.yandex.ru/*', '*google-analytics.com/*', '*googletagmanager.com/*',
+    '*doubleclick.net/*', '*top-fwz1.mail.ru/*', '*vk.com/rtrg*', '*sentry.io/*'
+]
+
+# Средний размер заблокированного ресурса по типу, байт. Заблокированный
+# запрос не загружается, поэтому экономия оценивается по этим значениям.
+AVERAGE_RESOURCE_BYTES = {
+    'Image': 40 * 1024,
+    'Stylesheet': 60 * 1024,
+    'Font': 50 * 1024,
+    'Media': 500 * 1024,
+    'Script': 30 * 1024
+}
+DEFAULT_RESOURCE_BYTES = 5 * 1024
+
+# Размер окна браузера. Облегченному профилю хватает небольшого окна: меньше
+# площадь отрисовки и память процесса, а разметка остается десктопной, поэтому
+# селекторы страниц товара не меняются.
+FULL_WINDOW_SIZE = (1920, 1080)
+LIGHTWEIGHT_WINDOW_SIZE = (1280, 800)
+
+
+class ResourceStats:
+    """Счетчики сетевого трафика браузеров по журналу производительности Chrome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.requests = 0
+        self.bytes_loaded = 0
+        self.blocked: Counter = Counter()
+
+    def record_page(self, entries: List[dict]):
+        """
+        Учет событий сети одной страницы
+
+        Args:
+            entries (List[dict]): Записи driver.get_log('performance')
+        """
+        types: Dict[str, str] = {}
+        requests = 0
+        loaded = 0
+        blocked: Counter = Counter()
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                requests += 1
+                types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFinished':
+                loaded += int(params.get('encodedDataLength', 0))
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                resource_type = params.get('type') or types.get(params.get('requestId'), 'Other')
+                blocked[resource_type] += 1
+
+        with self._lock:
+            self.pages += 1
+            self.requests += requests
+            self.bytes_loaded += loaded
+            self.blocked.update(blocked)
+
+    @property
+    def bytes_saved(self) -> int:
+        """Оценка сэкономленного трафика"""
+        with self._lock:
+            return sum(
+                count * AVERAGE_RESOURCE_BYTES.get(resource_type, DEFAULT_RESOURCE_BYTES)
+                for resource_type, count in self.blocked.items()
+            )
+
+    def snapshot(self) -> Dict[str, object]:
+        """Копия текущих счетчиков"""
+        saved = self.bytes_saved
+        with self._lock:
+            pages = self.pages or 1
+            return {
+                'pages': self.pages,
+                'requests': self.requests,
+                'blocked': dict(self.blocked),
+                'bytes_loaded': self.bytes_loaded,
+                'bytes_saved': saved,
+                'kb_per_page': round(self.bytes_loaded / pages / 1024, 1)
+            }
+
+
+# Общие счетчики процесса
+resource_stats = ResourceStats()
+
+
+def _collect_resource_stats(driver, stats: ResourceStats):
+    """Чтение журнала производительности после загрузки страницы"""
+    if not getattr(driver, 'collect_stats', False):
+        return
+    try:
+        stats.record_page(driver.get_log('performance'))
+    except Exception as e:
+        logger.debug(f"Не удалось прочитать журнал производительности: {str(e)}")
+
+
+def _enable_resource_blocking(driver):
+    """Блокировка ненужных запросов через DevTools"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+
+
+def create_chrome_driver(slot: int = 0, lightweight: bool = DRIVER_LIGHTWEIGHT,
+                         collect_stats: Optional[bool] = None) -> uc.Chrome:
+    """
+    Запуск нового экземпляра Chrome
+
+    Args:
+        slot (int): Номер слота в пуле, определяет директорию профиля
+        lightweight (bool): Облегченный профиль с блокировкой ресурсов
+            во временной директории
+        collect_stats (Optional[bool]): Собирать статистику трафика,
+            по умолчанию включено вместе с lightweight
+
+    Returns:
+        uc.Chrome: Готовый к работе драйвер
+    """
+    if collect_stats is None:
+        collect_stats = lightweight
+
+    options = uc.ChromeOptions()
+
+    # Базовые настройки
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--disable-infobars')
+    options.add_argument('--disable-notifications')
+    options.add_argument('--disable-popup-blocking')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+
+    # Установка User-Agent
+    user_agent = random.choice(USER_AGENTS)
+    options.add_argument(f'user-agent={user_agent}')
+
+    # Дополнительные настройки для обхода защиты
+    options.add_argument('--disable-blink-features')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--disable-plugins-discovery')
+    options.add_argument('--disable-plugins')
+    options.add_argument('--disable-web-security')
+    options.add_argument('--ignore-certificate-errors')
+
+    # Настройки для эмуляции реального браузера
+    window_size = LIGHTWEIGHT_WINDOW_SIZE if lightweight else FULL_WINDOW_SIZE
+    options.add_argument(f'--window-size={window_size[0]},{window_size[1]}')
+    if not lightweight:
+        options.add_argument('--start-maximized')
+
+    if lightweight:
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--mute-audio')
+        options.add_argument('--autoplay-policy=user-gesture-required')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2
+        })
+        # Временный профиль на tmpfs: без блокировок между воркерами и без записи на диск
+        profile_dir = tempfile.mkdtemp(prefix=f'chrome_worker_{slot}_', dir=DRIVER_PROFILE_ROOT or None)
+    else:
+        # У каждого слота свой профиль, иначе браузеры блокируют друг друга
+        profile_dir = os.path.join(os.getcwd(), 'chrome_profile', f'worker_{slot}')
+        os.makedirs(profile_dir, exist_ok=True)
+    options.add_argument(f'--user-data-dir={profile_dir}')
+
+    if collect_stats:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    try:
+        driver = uc.Chrome(
+            options=options,
+            browser_executable_path=CHROME_BINARY_PATH,
+            suppress_welcome=True,
+            use_subprocess=True
+        )
+    except Exception:
+        if lightweight:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+
+    # Временный профиль удаляется пулом после закрытия браузера
+    driver.ephemeral_profile_dir = profile_dir if lightweight else None
+    driver.collect_stats = collect_stats
+
+    try:
+        # Установка таймаутов
+        driver.set_page_load_timeout(30)
+        driver.implicitly_wait(10)
+
+        # Установка размера окна
+        driver.set_window_size(*window_size)
+
+        if lightweight:
+            _enable_resource_blocking(driver)
+    except Exception:
+        _quit_driver(driver)
+        raise
+
+    return driver
+
+
+def _quit_driver(driver):
+    """Закрытие браузера и удаление временного профиля"""
+    try:
+        driver.quit()
+    finally:
+        profile_dir = getattr(driver, 'ephemeral_profile_dir', None)
+        if profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def _process_tree_rss_mb(pid: int) -> Optional[float]:
+    """Суммарный RSS процесса и всех его потомков в мегабайтах (только Linux)"""
+    if not pid or not os.path.isdir('/proc'):
+        return None
+
+    children: Dict[int, list] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+            # Имя процесса в скобках может содержать пробелы
+            fields = stat[stat.rindex(')') + 2:].split()
+            ppid = int(fields[1])
+            rss_pages[int(entry)] = int(fields[21])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    if pid not in rss_pages:
+        return None
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, []))
+
+    return total * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class PooledDriver:
+    """Драйвер, выданный пулом, со счетчиком обработанных страниц"""
+
+    def __init__(self, driver: uc.Chrome, slot: int):
+        self.driver = driver
+        self.slot = slot
+        self.pages = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """
+    Пул долгоживущих браузеров
+
+    Драйверы создаются лениво, выдаются через acquire() и возвращаются
+    обратно после использования. Перед выдачей драйвер проверяется на
+    работоспособность, а после DRIVER_MAX_PAGES страниц или превышения
+    DRIVER_MAX_RSS_MB перезапускается.
+    """
+
+    def __init__(self, size: int = DRIVER_POOL_SIZE,
+                 max_pages: int = DRIVER_MAX_PAGES,
+                 max_rss_mb: int = DRIVER_MAX_RSS_MB,
+                 driver_factory: Callable[[int], uc.Chrome] = create_chrome_driver,
+                 resource_stats: ResourceStats = resource_stats):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.driver_factory = driver_factory
+        self.resource_stats = resource_stats
+
+        self._idle: "queue.LifoQueue[PooledDriver]" = queue.LifoQueue()
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(size):
+            self._free_slots.put(slot)
+        self._checkout_limit = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.stats = {
+            'created': 0,
+            'recycled': 0,
+            'checkouts': 0,
+            'health_failures': 0
+        }
+
+    def _inc(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _create(self) -> PooledDriver:
+        """Запуск нового браузера в свободном слоте"""
+        slot = self._free_slots.get_nowait()
+        try:
+            driver = self.driver_factory(slot)
+        except Exception as e:
+            self._free_slots.put(slot)
+            logger.error(f"Ошибка при инициализации драйвера: {str(e)}")
+            raise
+        self._inc('created')
+        logger.info(f"Запущен браузер в слоте {slot}")
+        return PooledDriver(driver, slot)
+
+    def _destroy(self, pooled: PooledDriver):
+        """Закрытие браузера и освобождение слота"""
+        try:
+            _quit_driver(pooled.driver)
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии драйвера: {str(e)}")
+        finally:
+            self._free_slots.put(pooled.slot)
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        """Проверка, что браузер отвечает на команды"""
+        try:
+            pooled.driver.execute_script('return 1')
+            return bool(pooled.driver.window_handles)
+        except Exception:
+            return False
+
+    def _needs_recycle(self, pooled: PooledDriver) -> bool:
+        """Проверка лимитов по числу страниц и потреблению памяти"""
+        if self.max_pages and pooled.pages >= self.max_pages:
+            logger.info(f"Браузер в слоте {pooled.slot} обработал {pooled.pages} страниц, перезапуск")
+            return True
+
+        if self.max_rss_mb:
+            rss = _process_tree_rss_mb(getattr(pooled.driver, 'browser_pid', None))
+            if rss is not None and rss > self.max_rss_mb:
+                logger.info(f"Браузер в слоте {pooled.slot} занимает {rss:.0f} МБ, перезапуск")
+                return True
+
+        return False
+
+    def _checkout(self, timeout: Optional[float]) -> PooledDriver:
+        if not self._checkout_limit.acquire(timeout=timeout):
+            raise TimeoutError("Нет свободных браузеров в пуле")
+
+        try:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул браузеров закрыт")
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    pooled = self._create()
+                    break
+
+                if self._is_healthy(pooled):
+                    break
+
+                logger.warning(f"Браузер в слоте {pooled.slot} не отвечает, перезапуск")
+                self._inc('health_failures')
+                self._destroy(pooled)
+        except Exception:
+            self._checkout_limit.release()
+            raise
+
+        self._inc('checkouts')
+        return pooled
+
+    def _checkin(self, pooled: PooledDriver, broken: bool):
+        try:
+            if self._closed or broken:
+                self._destroy(pooled)
+            elif self._needs_recycle(pooled):
+                self._inc('recycled')
+                self._destroy(pooled)
+            else:
+                self._idle.put(pooled)
+        finally:
+            self._checkout_limit.release()
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Получение браузера из пула
+
+        Args:
+            timeout (Optional[float]): Максимальное время ожидания свободного браузера
+
+        Yields:
+            uc.Chrome: Драйвер, который возвращается в пул при выходе из блока
+        """
+        pooled = self._checkout(timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            # После ошибки драйвера состояние браузера неизвестно
+            broken = not self._is_healthy(pooled)
+            raise
+        finally:
+            pooled.pages += 1
+            if not broken:
+                _collect_resource_stats(pooled.driver, self.resource_stats)
+            self._checkin(pooled, broken)
+
+    def warm(self, count: Optional[int] = None):
+        """Предварительный запуск браузеров, чтобы первые запросы не ждали старта"""
+        count = min(count or self.size, self.size)
+        started = []
+        try:
+            for _ in range(count):
+                started.append(self._checkout(timeout=None))
+        finally:
+            for pooled in started:
+                self._checkin(pooled, broken=False)
+
+    def close(self):
+        """Закрытие всех браузеров пула"""
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._destroy(pooled)
+        logger.info(f"Пул браузеров закрыт, статистика: {self.stats}, трафик: {self.resource_stats.snapshot()}")
+
+
+_pool: Optional[DriverPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """Общий для процесса пул браузеров"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
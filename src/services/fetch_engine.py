@@ -0,0 +1,144 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional
+
+from src.utils.urls import detect_platform
+
+logger = logging.getLogger(__name__)
+
+# Уровни загрузки в порядке возрастания стоимости
+TIER_HTTP = 'http'
+TIER_BROWSER = 'browser'
+TIERS = (TIER_HTTP, TIER_BROWSER)
+
+
+class FetchStats:
+    """Счетчики успешных и неудачных загрузок по площадкам и уровням"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(
+            lambda: {tier: {'ok': 0, 'failed': 0} for tier in TIERS}
+        )
+
+    def record(self, platform: str, tier: str, ok: bool):
+        """Учет результата загрузки"""
+        with self._lock:
+            self._counters[platform][tier]['ok' if ok else 'failed'] += 1
+
+    def hit_rates(self) -> Dict[str, Dict[str, float]]:
+        """
+        Доля успешных загрузок для каждого уровня
+
+        Returns:
+            Dict[str, Dict[str, float]]: {площадка: {уровень: доля успешных}}
+        """
+        with self._lock:
+            rates = {}
+            for platform, tiers in self._counters.items():
+                rates[platform] = {}
+                for tier, counter in tiers.items():
+                    total = counter['ok'] + counter['failed']
+                    rates[platform][tier] = counter['ok'] / total if total else 0.0
+            return rates
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Копия текущих счетчиков"""
+        with self._lock:
+            return {
+                platform: {tier: dict(counter) for tier, counter in tiers.items()}
+                for platform, tiers in self._counters.items()
+            }
+
+    def summary(self) -> str:
+        """Краткая сводка для логов"""
+        parts = []
+        for platform, tiers in sorted(self.snapshot().items()):
+            http = tiers[TIER_HTTP]
+            browser = tiers[TIER_BROWSER]
+            parts.append(
+                f"{platform}: http {http['ok']}/{http['ok'] + http['failed']}, "
+                f"браузер {browser['ok']}/{browser['ok'] + browser['failed']}"
+            )
+        return '; '.join(parts) or 'нет данных'
+
+
+# Общие счетчики процесса
+fetch_stats = FetchStats()
+
+
+def is_valid_product(data: Optional[dict]) -> bool:
+    """Проверка, что загрузка вернула пригодные данные"""
+    if not data:
+        return False
+    name = data.get('name')
+    price = data.get('current_price')
+    return bool(name and str(name).strip()) and isinstance(price, (int, float)) and price > 0
+
+
+class TieredFetcher:
+    """
+    Многоуровневая загрузка данных о товаре
+
+    Сначала выполняется обычный HTTP-запрос и разбор серверной разметки
+    или встроенного JSON. Браузер используется, только если быстрый путь
+    не дал корректных данных.
+
+    Общего таймаута на быстрый путь нет: парсер сначала ждет разрешения
+    ограничителя частоты, а время самого запроса ограничивает таймаут
+    HTTP-сессии (HTTP_FETCH_TIMEOUT). Иначе ожидание токена под нагрузкой
+    обрывалось бы таймаутом, и зарезервированный токен пропадал бы вместе
+    с переходом к браузеру, который резервирует еще один.
+    """
+
+    def __init__(self, http_parsers: Dict[str, object],
+                 browser_fetch: Callable[[str, str], Awaitable[Optional[dict]]],
+                 stats: FetchStats = fetch_stats):
+        self.http_parsers = http_parsers
+        self.browser_fetch = browser_fetch
+        self.stats = stats
+
+    async def _fetch_http(self, url: str, platform: str) -> Optional[dict]:
+        parser = self.http_parsers.get(platform)
+        if parser is None:
+            return None
+        try:
+            return await parser.parse_product(url)
+        except Exception as e:
+            logger.info(f"Быстрая загрузка {url} не удалась, переходим к браузеру: {str(e)}")
+            return None
+
+    async def fetch(self, url: str, platform: Optional[str] = None) -> dict:
+        """
+        Получение данных о товаре
+
+        Args:
+            url (str): URL товара
+            platform (Optional[str]): Площадка, если уже известна
+
+        Returns:
+            dict: Данные о товаре с полями platform и tier
+        """
+        platform = platform or detect_platform(url)
+        if not platform:
+            raise ValueError(f"Неподдерживаемая платформа: {url}")
+
+        data = await self._fetch_http(url, platform)
+        ok = is_valid_product(data)
+        self.stats.record(platform, TIER_HTTP, ok)
+        if ok:
+            return dict(data, platform=platform, tier=TIER_HTTP)
+
+        try:
+            data = await self.browser_fetch(url, platform)
+        except Exception as e:
+            self.stats.record(platform, TIER_BROWSER, False)
+            logger.error(f"Ошибка при загрузке {url} через браузер: {str(e)}")
+            raise
+
+        ok = is_valid_product(data)
+        self.stats.record(platform, TIER_BROWSER, ok)
+        if not ok:
+            raise ValueError(f"Не удалось получить данные о товаре: {url}")
+        return dict(data, platform=platform, tier=TIER_BROWSER)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+from src.config.config import (
+    HTTP_FETCH_TIMEOUT,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """
+    Общий для процесса HTTP-клиент
+
+    Одна ClientSession на цикл событий: соединения переиспользуются между
+    запросами (keep-alive), число соединений ограничено общим лимитом и
+    лимитом на хост, результаты DNS кэшируются. Ответы gzip/deflate
+    распаковываются aiohttp, brotli - если установлен пакет Brotli.
+    """
+
+    def __init__(self, limit: int = HTTP_POOL_LIMIT,
+                 limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+                 dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+                 keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 timeout: float = HTTP_FETCH_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Accept-Language': 'ru-RU,ru;q=0.9'}
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Сессия текущего цикла событий, создается при первом обращении"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Сессия привязана к циклу событий, в котором создана
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    async def start(self):
+        """Создание сессии при запуске приложения"""
+        session = self.session
+        logger.info(
+            f"HTTP-клиент запущен: до {self.limit} соединений, "
+            f"до {self.limit_per_host} на хост"
+        )
+        return session
+
+    async def close(self):
+        """Закрытие сессии и всех соединений при остановке приложения"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def get(self, url: str, **kwargs):
+        """
+        GET-запрос через общую сессию
+
+        Использование: async with http_client.get(url) as response: ...
+        """
+        return self.session.get(url, **kwargs)
+
+
+# Общий HTTP-клиент процесса
+http_client = HttpClient()
@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 from bs4 import BeautifulSoup
 from typing import Dict, Optional
@@ -17,105 +16,62 @@ from urllib.parse import urlparse
 from src.services.parsers.ozon import OzonParser
 from src.services.parsers.wildberries import WildberriesParser
 from src.services.parsers.yandex_market import YandexMarketParser
-from companies_data import get_company_data
+from src.services.parsers.base import build_product
+from src.services.dom_extract import extract_page
+from src.services.driver_pool import USER_AGENTS, get_driver_pool
+from src.services.fetch_engine import TieredFetcher, fetch_stats
+from src.services.http_client import HttpClient, http_client
+from src.services.rate_limiter import rate_limiter
+from src.services.scrape_cache import ScrapeCache, get_scrape_cache
+from src.services.scrape_executor import ScrapeExecutor, ScrapeRejected, get_scrape_executor
+from src.services.single_flight import SingleFlight, single_flight
+from src.utils.urls import PLATFORM_NAMES, detect_platform, product_key
 
 logger = logging.getLogger(__name__)
 
-# Список реалистичных User-Agent'ов
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3.1 Safari/605.1.15',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0'
-]
-
 class ParserService:
     """Сервис для парсинга товаров"""
     
-    def __init__(self):
-        """Инициализация парсера"""
+    def __init__(self, executor: Optional[ScrapeExecutor] = None, http: Optional[HttpClient] = None,
+                 cache: Optional[ScrapeCache] = None, flight: Optional[SingleFlight] = None):
+        """
+        Инициализация парсера
+        
+        Args:
+            executor (Optional[ScrapeExecutor]): Пул браузерных загрузок, по умолчанию общий для процесса
+            http (Optional[HttpClient]): HTTP-клиент, по умолчанию общий для процесса
+            cache (Optional[ScrapeCache]): Кэш результатов, по умолчанию общий для процесса
+            flight (Optional[SingleFlight]): Объединение одновременных загрузок одного товара
+        """
+        self.http = http or http_client
         self.parsers = {
-            'ozon': OzonParser(),
-            'wildberries': WildberriesParser(),
-            'yandex_market': YandexMarketParser()
+            'ozon': OzonParser(self.http),
+            'wildberries': WildberriesParser(self.http),
+            'market': YandexMarketParser(self.http)
         }
-        self.session = None
-        self.driver = None
+        # Сначала быстрый HTTP-запрос, браузер только при неудаче
+        self.fetcher = TieredFetcher(self.parsers, self._browser_fetch)
+        self.fetch_stats = fetch_stats
+        # Браузерные загрузки блокирующие и выполняются вне цикла событий
+        self.executor = executor or get_scrape_executor()
+        # Результаты парсинга общие для всех сервисов процесса
+        self.cache = cache or get_scrape_cache()
+        self._revalidating = set()
+        # Одновременные запросы одного товара объединяются в одну загрузку
+        self.flight = flight or single_flight
+        self._background = set()
+        # Браузеры берутся из общего пула, запуск на каждый товар не нужен
+        self.driver_pool = get_driver_pool()
         self.headers = {
             'User-Agent': random.choice(USER_AGENTS)
         }
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=self.headers)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-        if self.driver:
-            self.driver.quit()
-
-    def _init_driver(self):
-        """Инициализация драйвера Chrome"""
-        if self.driver is None:
-            try:
-                options = uc.ChromeOptions()
-                
-                # Базовые настройки
-                options.add_argument('--no-sandbox')
-                options.add_argument('--disable-dev-shm-usage')
-                options.add_argument('--disable-gpu')
-                options.add_argument('--disable-infobars')
-                options.add_argument('--disable-notifications')
-                options.add_argument('--disable-popup-blocking')
-                options.add_argument('--disable-blink-features=AutomationControlled')
-                
-                # Установка User-Agent
-                user_agent = random.choice(USER_AGENTS)
-                options.add_argument(f'user-agent={user_agent}')
-                
-                # Дополнительные настройки для обхода защиты
-                options.add_argument('--disable-blink-features')
-                options.add_argument('--disable-extensions')
-                options.add_argument('--disable-plugins-discovery')
-                options.add_argument('--disable-plugins')
-                options.add_argument('--disable-web-security')
-                options.add_argument('--ignore-certificate-errors')
-                
-                # Настройки для эмуляции реального браузера
-                options.add_argument('--window-size=1920,1080')
-                options.add_argument('--start-maximized')
-                
-                # Создание директории для профиля Chrome
-                profile_dir = os.path.join(os.getcwd(), 'chrome_profile')
-                if not os.path.exists(profile_dir):
-                    os.makedirs(profile_dir)
-                options.add_argument(f'--user-data-dir={profile_dir}')
-                
-                # Инициализация драйвера
-                self.driver = uc.Chrome(
-                    options=options,
-                    browser_executable_path='/usr/bin/chromium',
-                    suppress_welcome=True,
-                    use_subprocess=True
-                )
-                
-                # Установка таймаутов
-                self.driver.set_page_load_timeout(30)
-                self.driver.implicitly_wait(10)
-                
-                # Установка размера окна
-                self.driver.set_window_size(1920, 1080)
-                
-            except Exception as e:
-                logger.error(f"Ошибка при инициализации драйвера: {str(e)}")
-                if self.driver:
-                    self.driver.quit()
-                self.driver = None
-                raise
+        # HTTP-клиент общий для процесса и закрывается при остановке приложения
+        pass
 
     def _clean_price(self, price_str: str) -> float:
         """Очистка строки цены от неразрывных пробелов и других символов"""
@@ -143,34 +99,106 @@ class ParserService:
         else:
             raise ValueError(f"Неподдерживаемая платформа: {domain}")
 
-    async def get_product_data(self, url: str, platform: str) -> dict:
+    async def _browser_fetch(self, url: str, platform: str) -> Optional[dict]:
+        """Загрузка данных о товаре через браузер из пула"""
+        return await self._render(url, platform, PLATFORM_NAMES[platform])
+
+    async def _fetch_and_store(self, url: str, key: str) -> dict:
+        data = await self.fetcher.fetch(url)
+        self.cache.set(key, data['platform'], data)
+        return data
+
+    async def _load(self, url: str, key: str) -> dict:
+        """Загрузка товара, одновременные запросы одного товара выполняются один раз"""
+        return await self.flight.run(key, lambda: self._fetch_and_store(url, key))
+
+    async def _revalidate(self, url: str, key: str):
+        """Фоновое обновление устаревшей записи кэша"""
+        try:
+            await self._load(url, key)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить данные товара {url} в фоне: {str(e)}")
+        finally:
+            self._revalidating.discard(key)
+
+    async def fetch_product(self, url: str, max_age: Optional[float] = None,
+                            allow_stale: bool = True) -> dict:
+        """
+        Получение данных о товаре через кэш
+        
+        Args:
+            url (str): URL товара
+            max_age (Optional[float]): Максимальный возраст результата из кэша в секундах,
+                по умолчанию TTL площадки
+            allow_stale (bool): Отдавать устаревший результат, обновляя его в фоне
+            
+        Returns:
+            dict: Данные о товаре, в поле cache_age - возраст результата в секундах
+        """
+        key = product_key(url)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry.age <= (entry.ttl if max_age is None else max_age):
+                return dict(entry.data, cache_age=entry.age)
+            if allow_stale and max_age is None:
+                if key not in self._revalidating:
+                    self._revalidating.add(key)
+                    task = asyncio.create_task(self._revalidate(url, key))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return dict(entry.data, cache_age=entry.age)
+        
+        data = await self._load(url, key)
+        return dict(data, cache_age=0.0)
+
+    async def get_product_data(self, url: str, platform: str, max_age: Optional[float] = None,
+                               allow_stale: bool = True) -> dict:
         """
         Получение данных о товаре
         
         Args:
             url (str): URL товара
-            platform (str): Платформа (ozon, wildberries, yandex_market)
+            platform (str): Платформа (ozon, wildberries, market)
+            max_age (Optional[float]): Максимальный возраст результата из кэша в секундах
+            allow_stale (bool): Отдавать устаревший результат, обновляя его в фоне
             
         Returns:
             dict: Данные о товаре
         """
         try:
-            # Получаем данные о товаре используя существующий парсер
-            product_data = get_company_data(url)
-            
-            if not product_data:
-                raise ValueError("Не удалось получить данные о товаре")
-            
-            return {
-                'name': product_data['name'],
-                'current_price': product_data['price'],
-                'original_price': product_data.get('original_price', product_data['price']),
-                'discount': product_data.get('discount', 0)
-            }
+            # Платформа определяется по URL, выбранная пользователем может не совпадать
+            return await self.fetch_product(url, max_age=max_age, allow_stale=allow_stale)
         except Exception as e:
             logger.error(f"Ошибка при парсинге товара: {str(e)}")
             raise
 
+    async def parse_product(self, url: str, max_age: Optional[float] = None,
+                            allow_stale: bool = True) -> Optional[dict]:
+        """
+        Получение данных о товаре по URL с автоопределением платформы
+        
+        Args:
+            url (str): URL товара
+            max_age (Optional[float]): Максимальный возраст результата из кэша в секундах
+            allow_stale (bool): Отдавать устаревший результат, обновляя его в фоне
+            
+        Returns:
+            Optional[dict]: Данные о товаре или None в случае ошибки
+        """
+        try:
+            return await self.fetch_product(url, max_age=max_age, allow_stale=allow_stale)
+        except ScrapeRejected:
+            # Перегрузку вызывающий код показывает пользователю отдельно
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге товара {url}: {str(e)}")
+            return None
+
+    async def get_price(self, url: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Получение текущей цены товара, устаревший результат из кэша не используется"""
+        product_data = await self.parse_product(url, max_age=max_age, allow_stale=False)
+        return product_data['current_price'] if product_data else None
+
     async def update_prices(self) -> None:
         """Обновление цен всех товаров"""
         try:
@@ -180,179 +208,73 @@ class ParserService:
             logger.error(f"Ошибка при обновлении цен: {str(e)}")
             raise
 
-    async def parse_ozon(self, url: str) -> Optional[Dict]:
-        """Парсинг товара с Ozon"""
-        try:
-            self._init_driver()
-            self.driver.get(url)
-            await asyncio.sleep(random.uniform(2, 3))
-            
-            data = {
-                'platform': 'Ozon',
-                'name': '',
-                'current_price': 0,
-                'original_price': 0
-            }
-            
-            try:
-                # Ожидание и извлечение названия товара
-                name_elem = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[1]/div[1]/div[2]/div/div/div/div[1]/h1'))
-                )
-                if name_elem:
-                    data['name'] = name_elem.text.strip()
-                    logger.info(f"Название товара: {data['name']}")
-                
-                # Ожидание и извлечение цены со скидкой
-                price_discount_elem = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[2]/div/div/div[1]/div[2]/div/div[1]/div/div/div[1]/div[1]/button/span/div/div[1]/div/div/span'))
-                )
-                if price_discount_elem:
-                    price_text = price_discount_elem.text.strip()
-                    data['current_price'] = self._clean_price(price_text)
-                    logger.info(f"Цена со скидкой: {data['current_price']}")
-                
-                # Ожидание и извлечение цены без скидки
-                try:
-                    price_no_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div/div[1]/div[3]/div[3]/div[2]/div/div/div[1]/div[2]/div/div[1]/div/div/div[1]/div[2]/div/div[1]/span'))
-                    )
-                    if price_no_discount_elem:
-                        price_text = price_no_discount_elem.text.strip()
-                        data['original_price'] = self._clean_price(price_text)
-                        logger.info(f"Цена без скидки: {data['original_price']}")
-                except TimeoutException:
-                    data['original_price'] = data['current_price']
-                    logger.info("Цена без скидки не найдена, используем текущую цену")
-                
-            except Exception as e:
-                logger.error(f"Ошибка при извлечении данных товара: {str(e)}")
-                return None
-            
-            return data
+    def _render_product(self, url: str, platform: str) -> Optional[Dict]:
+        """
+        Загрузка страницы в браузере и извлечение данных за одно ожидание
+        
+        Вызов блокирующий, выполняется в пуле потоков.
+        
+        Args:
+            url (str): URL товара
+            platform (str): Ключ площадки (ozon, wildberries, market)
             
-        except Exception as e:
-            logger.error(f"Ошибка при парсинге Ozon {url}: {str(e)}")
+        Returns:
+            Optional[Dict]: Данные о товаре или None, если обязательных полей нет
+        """
+        rate_limiter.acquire_sync(url)
+        with self.driver_pool.acquire() as driver:
+            driver.get(url)
+            values, missing = extract_page(driver, platform)
+        
+        if not values['product_name'] or not values['price_with_discount']:
+            logger.error(f"Ошибка при извлечении данных товара {url}: не найдены поля {', '.join(missing)}")
             return None
-        finally:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+        
+        current_price = self._clean_price(values['price_with_discount'])
+        if values['price_without_discount']:
+            original_price = self._clean_price(values['price_without_discount'])
+        else:
+            original_price = current_price
+            logger.info("Цена без скидки не найдена, используем текущую цену")
+        
+        data = build_product(values['product_name'], current_price, original_price)
+        if data:
+            data['platform'] = PLATFORM_NAMES[platform]
+            logger.info(f"Название товара: {data['name']}, цена: {data['current_price']}")
+        return data
 
-    async def parse_wildberries(self, url: str) -> Optional[Dict]:
-        """Парсинг товара с Wildberries"""
+    async def _render(self, url: str, platform: str, platform_name: str) -> Optional[Dict]:
+        """Браузерный парсинг в пуле загрузок, чтобы не блокировать цикл событий"""
         try:
-            self._init_driver()
-            self.driver.get(url)
-            await asyncio.sleep(random.uniform(2, 3))
-            
-            data = {
-                'platform': 'Wildberries',
-                'name': '',
-                'current_price': 0,
-                'original_price': 0
-            }
-            
-            try:
-                # Ожидание и извлечение названия товара
-                name_elem = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'product-page__header'))
-                )
-                if name_elem:
-                    data['name'] = name_elem.text.strip()
-                    logger.info(f"Название товара: {data['name']}")
-                
-                # Ожидание и извлечение цены со скидкой
-                price_discount_elem = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'price-block__final-price'))
-                )
-                if price_discount_elem:
-                    price_text = price_discount_elem.text.strip()
-                    data['current_price'] = self._clean_price(price_text)
-                    logger.info(f"Цена со скидкой: {data['current_price']}")
-                
-                # Ожидание и извлечение цены без скидки
-                try:
-                    price_no_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, 'price-block__old-price'))
-                    )
-                    if price_no_discount_elem:
-                        price_text = price_no_discount_elem.text.strip()
-                        data['original_price'] = self._clean_price(price_text)
-                        logger.info(f"Цена без скидки: {data['original_price']}")
-                except TimeoutException:
-                    data['original_price'] = data['current_price']
-                    logger.info("Цена без скидки не найдена, используем текущую цену")
-                
-            except Exception as e:
-                logger.error(f"Ошибка при извлечении данных товара: {str(e)}")
-                return None
-            
-            return data
-            
+            return await self.executor.run(self._render_product, url, platform)
+        except ScrapeRejected:
+            raise
         except Exception as e:
-            logger.error(f"Ошибка при парсинге Wildberries {url}: {str(e)}")
+            logger.error(f"Ошибка при парсинге {platform_name} {url}: {str(e)}")
             return None
-        finally:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
 
-    async def parse_market(self, url: str) -> Optional[Dict]:
-        """Парсинг товара с Яндекс.Маркета"""
+    async def _parse_platform(self, url: str, platform: str) -> Optional[Dict]:
+        """Товар площадки через кэш и многоуровневую загрузку, None при ошибке"""
+        platform_name = PLATFORM_NAMES[platform]
+        if detect_platform(url) != platform:
+            logger.error(f"Ссылка {url} не относится к площадке {platform_name}")
+            return None
         try:
-            self._init_driver()
-            self.driver.get(url)
-            await asyncio.sleep(random.uniform(2, 3))
-            
-            data = {
-                'platform': 'Market',
-                'name': '',
-                'current_price': 0,
-                'original_price': 0
-            }
-            
-            try:
-                # Ожидание и извлечение названия товара
-                name_elem = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'cia-cs'))
-                )
-                if name_elem:
-                    data['name'] = name_elem.text.strip()
-                    logger.info(f"Название товара: {data['name']}")
-                
-                # Ожидание и извлечение цены со скидкой
-                price_discount_elem = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'cia-cs'))
-                )
-                if price_discount_elem:
-                    price_text = price_discount_elem.text.strip()
-                    data['current_price'] = self._clean_price(price_text)
-                    logger.info(f"Цена со скидкой: {data['current_price']}")
-                
-                # Ожидание и извлечение цены без скидки
-                try:
-                    price_no_discount_elem = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, 'cia-cs'))
-                    )
-                    if price_no_discount_elem:
-                        price_text = price_no_discount_elem.text.strip()
-                        data['original_price'] = self._clean_price(price_text)
-                        logger.info(f"Цена без скидки: {data['original_price']}")
-                except TimeoutException:
-                    data['original_price'] = data['current_price']
-                    logger.info("Цена без скидки не найдена, используем текущую цену")
-                
-            except Exception as e:
-                logger.error(f"Ошибка при извлечении данных товара: {str(e)}")
-                return None
-            
-            return data
-            
+            return await self.fetch_product(url)
+        except ScrapeRejected:
+            raise
         except Exception as e:
-            logger.error(f"Ошибка при парсинге Яндекс.Маркет {url}: {str(e)}")
+            logger.error(f"Ошибка при парсинге {platform_name} {url}: {str(e)}")
             return None
-        finally:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None 
\ No newline at end of file
+
+    async def parse_ozon(self, url: str) -> Optional[Dict]:
+        """Парсинг товара с Ozon"""
+        return await self._parse_platform(url, 'ozon')
+
+    async def parse_wildberries(self, url: str) -> Optional[Dict]:
+        """Парсинг товара с Wildberries"""
+        return await self._parse_platform(url, 'wildberries')
+
+    async def parse_market(self, url: str) -> Optional[Dict]:
+        """Парсинг товара с Яндекс.Маркета"""
+        return await self._parse_platform(url, 'market') 
\ No newline at end of file
@@ -1,4 +1,6 @@
+import json
 import logging
+import re
 from abc import ABC, abstractmethod
 from typing import Optional
 import undetected_chromedriver as uc
@@ -6,6 +8,82 @@ from selenium.webdriver.chrome.options import Options
 
 logger = logging.getLogger(__name__)
 
+def clean_price(price_str) -> Optional[float]:
+    """
+    Преобразование строки цены в число
+    
+    Args:
+        price_str: Строка вида '1 234 ₽' или число
+        
+    Returns:
+        Optional[float]: Цена или None, если строку не удалось разобрать
+    """
+    if price_str is None:
+        return None
+    if isinstance(price_str, (int, float)):
+        return float(price_str)
+    # Заменяем неразрывные пробелы и удаляем все символы кроме цифр, точки и запятой
+    price_str = str(price_str).replace('\u2009', ' ').replace('\u00A0', ' ')
+    price_str = re.sub(r'[^\d.,]', '', price_str).replace(',', '.')
+    try:
+        return float(price_str)
+    except ValueError:
+        return None
+
+def build_product(name: Optional[str], current_price: Optional[float],
+                  original_price: Optional[float] = None) -> Optional[dict]:
+    """
+    Сборка и проверка данных о товаре
+    
+    Args:
+        name (Optional[str]): Название товара
+        current_price (Optional[float]): Текущая цена
+        original_price (Optional[float]): Цена без скидки
+        
+    Returns:
+        Optional[dict]: Данные о товаре или None, если данные неполные
+    """
+    if not name or not name.strip() or not current_price or current_price <= 0:
+        return None
+    
+    if not original_price or original_price < current_price:
+        original_price = current_price
+    
+    # Вычисляем скидку
+    discount = round((1 - current_price / original_price) * 100, 2) if original_price > current_price else 0
+    
+    return {
+        'name': name.strip(),
+        'current_price': current_price,
+        'original_price': original_price,
+        'discount': discount
+    }
+
+def find_ld_json_product(soup) -> Optional[dict]:
+    """Поиск описания товара в разметке schema.org (application/ld+json)"""
+    for script in soup.find_all('script', {'type': 'application/ld+json'}):
+        try:
+            payload = json.loads(script.string or '')
+        except (TypeError, ValueError):
+            continue
+        
+        items = payload if isinstance(payload, list) else [payload]
+        for item in items:
+            if isinstance(item, dict) and item.get('@type') == 'Product':
+                return item
+    return None
+
+def ld_json_price(product: Optional[dict]) -> Optional[float]:
+    """Цена из блока offers разметки schema.org"""
+    if not product:
+        return None
+    offers = product.get('offers')
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    if not isinstance(offers, dict):
+        return None
+    return clean_price(offers.get('price') or offers.get('lowPrice'))
+
 class BaseParser(ABC):
     """Базовый класс для парсеров"""
     
@@ -1,12 +1,72 @@
+import json
 import logging
+import random
+import re
+from typing import Optional
 from bs4 import BeautifulSoup
-import aiohttp
+from src.services.driver_pool import USER_AGENTS
+from src.services.http_client import HttpClient, http_client
+from src.services.rate_limiter import rate_limiter
+from src.services.parsers.base import build_product, clean_price, find_ld_json_product, ld_json_price
 
 logger = logging.getLogger(__name__)
 
 class OzonParser:
     """Парсер для Ozon"""
     
+    def __init__(self, http: Optional[HttpClient] = None):
+        """
+        Инициализация парсера
+        
+        Args:
+            http (Optional[HttpClient]): HTTP-клиент, по умолчанию общий для процесса
+        """
+        self.http = http or http_client
+    
+    @staticmethod
+    def extract(html: str) -> Optional[dict]:
+        """
+        Извлечение данных о товаре из серверной разметки страницы
+        
+        Args:
+            html (str): HTML страницы товара
+            
+        Returns:
+            Optional[dict]: Данные о товаре или None, если в разметке их нет
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        ld_product = find_ld_json_product(soup)
+        
+        name = ld_product.get('name') if ld_product else None
+        if not name and soup.find('h1'):
+            name = soup.find('h1').text
+        
+        current_price = None
+        original_price = None
+        
+        # Состояние виджета цены, которое Ozon встраивает в страницу
+        price_state = soup.find('div', id=re.compile(r'^state-webPrice'))
+        if price_state and price_state.get('data-state'):
+            try:
+                state = json.loads(price_state['data-state'])
+                current_price = clean_price(state.get('cardPrice') or state.get('price'))
+                original_price = clean_price(state.get('originalPrice'))
+            except ValueError:
+                logger.debug("Не удалось разобрать состояние виджета цены Ozon")
+        
+        if current_price is None:
+            current_price = ld_json_price(ld_product)
+        
+        # Старая разметка
+        if current_price is None:
+            price_elem = soup.find('span', {'data-widget': 'webPrice'})
+            current_price = clean_price(price_elem.text) if price_elem else None
+        if original_price is None:
+            original_price_elem = soup.find('span', {'data-widget': 'webOldPrice'})
+            original_price = clean_price(original_price_elem.text) if original_price_elem else None
+        
+        return build_product(name, current_price, original_price)
+    
     async def parse_product(self, url: str) -> dict:
         """
         Парсинг данных о товаре с Ozon
@@ -18,33 +78,22 @@ class OzonParser:
             dict: Данные о товаре
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        raise ValueError(f"Ошибка при получении страницы: {response.status}")
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Получаем название товара
-                    name = soup.find('h1').text.strip()
-                    
-                    # Получаем текущую цену
-                    current_price = float(soup.find('span', {'data-widget': 'webPrice'}).text.strip().replace(' ', '').replace('₽', ''))
-                    
-                    # Получаем оригинальную цену
-                    original_price_elem = soup.find('span', {'data-widget': 'webOldPrice'})
-                    original_price = float(original_price_elem.text.strip().replace(' ', '').replace('₽', '')) if original_price_elem else current_price
-                    
-                    # Вычисляем скидку
-                    discount = round((1 - current_price / original_price) * 100, 2) if original_price > current_price else 0
-                    
-                    return {
-                        'name': name,
-                        'current_price': current_price,
-                        'original_price': original_price,
-                        'discount': discount
-                    }
+            headers = {
+                'User-Agent': random.choice(USER_AGENTS),
+                'Accept-Language': 'ru-RU,ru;q=0.9'
+            }
+            await rate_limiter.acquire(url)
+            async with self.http.get(url, headers=headers) as response:
+                rate_limiter.report(url, response.status, response.headers.get('Retry-After'))
+                if response.status != 200:
+                    raise ValueError(f"Ошибка при получении страницы: {response.status}")
+                
+                html = await response.text()
+            
+            data = self.extract(html)
+            if not data:
+                raise ValueError("В разметке страницы нет данных о товаре")
+            return data
         except Exception as e:
             logger.error(f"Ошибка при парсинге товара с Ozon: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
@@ -1,12 +1,74 @@
 import logging
-from bs4 import BeautifulSoup
-import aiohttp
+import random
+import re
+from typing import Optional
+from src.services.driver_pool import USER_AGENTS
+from src.services.http_client import HttpClient, http_client
+from src.services.rate_limiter import rate_limiter
+from src.services.parsers.base import build_product
 
 logger = logging.getLogger(__name__)
 
+# Публичный API карточек товаров, из которого страница Wildberries получает цены
+WB_CARD_API_URL = 'https://card.wb.ru/cards/v2/detail'
+WB_CARD_API_PARAMS = {
+    'appType': '1',
+    'curr': 'rub',
+    'dest': '-1257786',
+    'spp': '30'
+}
+
 class WildberriesParser:
     """Парсер для Wildberries"""
     
+    def __init__(self, http: Optional[HttpClient] = None):
+        """
+        Инициализация парсера
+        
+        Args:
+            http (Optional[HttpClient]): HTTP-клиент, по умолчанию общий для процесса
+        """
+        self.http = http or http_client
+    
+    @staticmethod
+    def get_article(url: str) -> Optional[str]:
+        """Артикул товара (nm) из URL вида /catalog/<nm>/detail.aspx"""
+        match = re.search(r'/catalog/(\d+)', url)
+        return match.group(1) if match else None
+    
+    @staticmethod
+    def extract(payload: dict) -> Optional[dict]:
+        """
+        Извлечение данных о товаре из ответа API карточек
+        
+        Args:
+            payload (dict): JSON-ответ card.wb.ru
+            
+        Returns:
+            Optional[dict]: Данные о товаре или None, если товара нет в ответе
+        """
+        products = (payload.get('data') or {}).get('products') or []
+        if not products:
+            return None
+        product = products[0]
+        
+        # Цены в API указаны в копейках
+        current_price = None
+        original_price = None
+        for size in product.get('sizes') or []:
+            price = size.get('price')
+            if price and price.get('product'):
+                current_price = price['product'] / 100
+                original_price = price.get('basic', 0) / 100
+                break
+        
+        # Формат первой версии API
+        if current_price is None and product.get('salePriceU'):
+            current_price = product['salePriceU'] / 100
+            original_price = product.get('priceU', 0) / 100
+        
+        return build_product(product.get('name'), current_price, original_price)
+    
     async def parse_product(self, url: str) -> dict:
         """
         Парсинг данных о товаре с Wildberries
@@ -18,33 +80,24 @@ class WildberriesParser:
             dict: Данные о товаре
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        raise ValueError(f"Ошибка при получении страницы: {response.status}")
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Получаем название товара
-                    name = soup.find('h1').text.strip()
-                    
-                    # Получаем текущую цену
-                    current_price = float(soup.find('span', {'class': 'price-block__final-price'}).text.strip().replace(' ', '').replace('₽', ''))
-                    
-                    # Получаем оригинальную цену
-                    original_price_elem = soup.find('span', {'class': 'price-block__old-price'})
-                    original_price = float(original_price_elem.text.strip().replace(' ', '').replace('₽', '')) if original_price_elem else current_price
-                    
-                    # Вычисляем скидку
-                    discount = round((1 - current_price / original_price) * 100, 2) if original_price > current_price else 0
-                    
-                    return {
-                        'name': name,
-                        'current_price': current_price,
-                        'original_price': original_price,
-                        'discount': discount
-                    }
+            article = self.get_article(url)
+            if not article:
+                raise ValueError(f"Не удалось определить артикул товара: {url}")
+            
+            headers = {'User-Agent': random.choice(USER_AGENTS)}
+            params = dict(WB_CARD_API_PARAMS, nm=article)
+            await rate_limiter.acquire(WB_CARD_API_URL)
+            async with self.http.get(WB_CARD_API_URL, params=params, headers=headers) as response:
+                rate_limiter.report(WB_CARD_API_URL, response.status, response.headers.get('Retry-After'))
+                if response.status != 200:
+                    raise ValueError(f"Ошибка при получении карточки товара: {response.status}")
+                
+                payload = await response.json(content_type=None)
+            
+            data = self.extract(payload)
+            if not data:
+                raise ValueError(f"Товар {article} не найден в API карточек")
+            return data
         except Exception as e:
             logger.error(f"Ошибка при парсинге товара с Wildberries: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Товаров каталога на одну транзакцию сжатия истории
+COMPACTION_CHUNK_SIZE = 200
+
+
+def plan_history_writes(latest: Dict[int, Tuple[int, float]],
+                        updates: Iterable) -> Tuple[List[dict], List[dict]]:
+    """
+    Запись истории только при изменении цены
+
+    Каждая запись истории - период с одной ценой: timestamp - когда цена
+    появилась, last_confirmed - когда она была подтверждена в последний
+    раз, confirmations - сколько раз она была получена. Та же цена, что
+    в последней записи товара, продлевает эту запись, новая цена начинает
+    новую.
+
+    Args:
+        latest (Dict[int, Tuple[int, float]]): ID товара каталога -> (ID последней записи истории, цена)
+        updates (Iterable): Новые цены (PriceUpdate: catalog_item_id, price, timestamp)
+
+    Returns:
+        Tuple[List[dict], List[dict]]: Продления существующих записей и новые записи истории
+    """
+    confirms: Dict[int, dict] = {}
+    inserts: List[dict] = []
+    # ID товара -> последняя запись: существующая (confirms) или новая (inserts)
+    current: Dict[int, dict] = {}
+
+    for update in sorted(updates, key=lambda update: update.timestamp):
+        record = current.get(update.catalog_item_id)
+        if record is None and update.catalog_item_id in latest:
+            row_id, price = latest[update.catalog_item_id]
+            record = {'row_id': row_id, 'price': price}
+
+        if record is not None and record['price'] == update.price:
+            if 'row_id' in record:
+                confirm = confirms.setdefault(record['row_id'], {'row_id': record['row_id'], 'added': 0})
+                confirm['confirmed'] = update.timestamp
+                confirm['added'] += 1
+            else:
+                record['last_confirmed'] = update.timestamp
+                record['confirmations'] += 1
+            current[update.catalog_item_id] = record
+            continue
+
+        record = {
+            'catalog_item_id': update.catalog_item_id,
+            'price': update.price,
+            'timestamp': update.timestamp,
+            'last_confirmed': update.timestamp,
+            'confirmations': 1
+        }
+        inserts.append(record)
+        current[update.catalog_item_id] = record
+
+    return list(confirms.values()), inserts
+
+
+def merge_runs(rows: Sequence[tuple]) -> Tuple[List[dict], List[int]]:
+    """
+    Схлопывание подряд идущих записей с одинаковой ценой
+
+    Args:
+        rows (Sequence[tuple]): Записи одного товара (id, price, timestamp, last_confirmed, confirmations)
+            в порядке времени
+
+    Returns:
+        Tuple[List[dict], List[int]]: Обновления первых записей периодов и ID удаляемых записей
+    """
+    updates: List[dict] = []
+    delete_ids: List[int] = []
+    run = None
+    for row_id, price, timestamp, last_confirmed, confirmations in rows:
+        if run is not None and run['price'] == price:
+            run['confirmed'] = max(run['confirmed'], last_confirmed or timestamp)
+            run['confirmations'] += confirmations or 1
+            run['merged'] = True
+            delete_ids.append(row_id)
+            continue
+        if run is not None and run['merged']:
+            updates.append(run)
+        run = {
+            'row_id': row_id,
+            'price': price,
+            'confirmed': last_confirmed or timestamp,
+            'confirmations': confirmations or 1,
+            'merged': False
+        }
+    if run is not None and run['merged']:
+        updates.append(run)
+    return [
+        {'row_id': run['row_id'], 'confirmed': run['confirmed'], 'confirmations': run['confirmations']}
+        for run in updates
+    ], delete_ids
+
+
+def compact_price_history(engine: Engine, chunk_size: int = COMPACTION_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Сжатие накопленной истории цен в периоды изменения
+
+    Товары обрабатываются порциями, каждая порция - отдельная короткая
+    транзакция, поэтому сжатие можно выполнять во время работы бота.
+
+    Returns:
+        Dict[str, int]: Количество обработанных товаров и удаленных записей
+    """
+    stats = {'items': 0, 'deleted': 0}
+    with engine.connect() as conn:
+        item_ids = [row[0] for row in conn.execute(text(
+            "SELECT DISTINCT catalog_item_id FROM price_history "
+            "WHERE catalog_item_id IS NOT NULL ORDER BY catalog_item_id"
+        ))]
+
+    update_run = text(
+        "UPDATE price_history SET last_confirmed = :confirmed, confirmations = :confirmations "
+        "WHERE id = :row_id"
+    )
+    delete_rows = text("DELETE FROM price_history WHERE id IN :ids").bindparams(
+        bindparam('ids', expanding=True)
+    )
+
+    for start in range(0, len(item_ids), chunk_size):
+        chunk = item_ids[start:start + chunk_size]
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT catalog_item_id, id, price, timestamp, last_confirmed, confirmations "
+                    "FROM price_history WHERE catalog_item_id IN :ids "
+                    "ORDER BY catalog_item_id, timestamp, id"
+                ).bindparams(bindparam('ids', expanding=True)),
+                {'ids': chunk}
+            ).fetchall()
+
+            updates: List[dict] = []
+            delete_ids: List[int] = []
+            for _, item_rows in groupby(rows, key=lambda row: row[0]):
+                item_updates, item_deletes = merge_runs([tuple(row[1:]) for row in item_rows])
+                updates.extend(item_updates)
+                delete_ids.extend(item_deletes)
+
+            if updates:
+                conn.execute(update_run, updates)
+            for offset in range(0, len(delete_ids), 500):
+                conn.execute(delete_rows, {'ids': delete_ids[offset:offset + 500]})
+
+        stats['items'] += len(chunk)
+        stats['deleted'] += len(delete_ids)
+    return stats
+
+
+async def run_history_compaction(engine: Engine):
+    """Сжатие истории цен вне цикла событий"""
+    try:
+        stats = await asyncio.to_thread(compact_price_history, engine)
+        if stats['deleted']:
+            logger.info(
+                f"История цен сжата: товаров {stats['items']}, "
+                f"удалено повторяющихся записей {stats['deleted']}"
+            )
+    except Exception as e:
+        logger.error(f"Ошибка при сжатии истории цен: {str(e)}")
+
+
+def price_timeline(records: Iterable[dict]) -> List[Tuple[str, float]]:
+    """
+    Полная хронология цен по периодам истории
+
+    Для каждого периода возвращаются точки появления цены и ее последнего
+    подтверждения, поэтому график и отчеты выглядят так же, как при записи
+    каждого обновления.
+
+    Args:
+        records (Iterable[dict]): Записи get_product_price_history
+
+    Returns:
+        List[Tuple[str, float]]: (время, цена) в порядке убывания времени
+    """
+    points = []
+    for record in records:
+        if record['timestamp']:
+            points.append((record['timestamp'], record['price']))
+        if record.get('last_confirmed') and record['last_confirmed'] != record['timestamp']:
+            points.append((record['last_confirmed'], record['price']))
+    return sorted(points, key=lambda point: point[0], reverse=True)
+
+
+def format_timestamp(value: datetime) -> str:
+    """Время записи истории в формате отчетов"""
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
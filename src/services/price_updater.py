@@ -1,11 +1,17 @@
 import asyncio
 import logging
-from datetime import datetime
-from sqlalchemy import text
-from src.config.config import PRICE_UPDATE_INTERVAL
-from src.services.database import DatabaseService, get_db
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional
+from src.config.config import NOTIFICATION_THRESHOLD, REFRESH_WORKERS
+from src.services.async_database import AsyncDatabaseService
 from src.services.parser import ParserService
 from src.services.notification import NotificationService
+from src.services.price_writer import PriceUpdateWriter
+from src.services.refresh_scheduler import RefreshItem, RefreshScheduler, price_stats
+
+# За какой период история цен учитывается при оценке изменчивости
+VOLATILITY_WINDOW = timedelta(days=14)
 
 logger = logging.getLogger(__name__)
 
@@ -13,51 +19,154 @@ class PriceUpdaterService:
     def __init__(self):
         self.parser = ParserService()
         self.notification = NotificationService()
+        self.scheduler = RefreshScheduler(self._load_refresh_items, self._refresh_item)
+        # Цены записываются пакетами, а не транзакцией на каждый товар
+        self.writer = PriceUpdateWriter(AsyncDatabaseService.update_catalog_prices)
+        self._reset_cycle_stats()
         self._task = None
 
+    def _reset_cycle_stats(self):
+        """Счетчики цикла обновления: уникальные загрузки и обслуженные подписки"""
+        self.cycle_stats = {
+            'unique_fetches': 0,
+            'subscriptions_served': 0,
+            'failed_fetches': 0
+        }
+
+    def _log_cycle_stats(self):
+        stats = self.cycle_stats
+        if stats['unique_fetches'] or stats['failed_fetches']:
+            logger.info(
+                f"Цикл обновления цен: загрузок {stats['unique_fetches']}, "
+                f"обновлено подписок {stats['subscriptions_served']}, "
+                f"неудачных загрузок {stats['failed_fetches']}, "
+                f"с запуска записано пакетов цен {self.writer.stats['batches']} "
+                f"за {self.writer.stats['write_time']:.2f} с"
+            )
+
+    async def _load_refresh_items(self) -> List[RefreshItem]:
+        """
+        Товары каталога с активными подписками для расписания обновления
+        
+        Каждый товар каталога загружается один раз, новая цена расходится
+        по всем его подпискам.
+        """
+        # Список перечитывается раз в цикл синхронизации: подводим итоги прошедшего цикла
+        self._log_cycle_stats()
+        self._reset_cycle_stats()
+        
+        # Цены из буфера должны попасть в базу до перечитывания, иначе вернутся старые
+        await self.writer.flush()
+        subscriptions, history = await AsyncDatabaseService.get_refresh_rows(
+            datetime.utcnow() - VOLATILITY_WINDOW
+        )
+        
+        history_by_item = defaultdict(list)
+        for record in history:
+            history_by_item[record.catalog_item_id].append(
+                (record.price, record.timestamp, record.confirmations or 1)
+            )
+        
+        groups = defaultdict(list)
+        for row in subscriptions:
+            groups[row.id].append(row)
+        
+        items = []
+        for item_id, rows in groups.items():
+            item = rows[0]
+            volatility, last_change_at = price_stats(history_by_item[item_id])
+            items.append(RefreshItem(
+                key=item.product_key,
+                url=item.url,
+                last_price=item.current_price,
+                volatility=volatility,
+                last_change_at=last_change_at,
+                subscribers=len(rows),
+                payload={
+                    'catalog_item_id': item_id,
+                    'name': item.name,
+                    'current_price': item.current_price,
+                    'subscriptions': [
+                        {
+                            'id': row.subscription_id,
+                            'telegram_id': row.telegram_id,
+                            'notify_threshold': row.notify_threshold,
+                            'target_price': row.target_price
+                        }
+                        for row in rows
+                    ]
+                }
+            ))
+        return items
+
+    @staticmethod
+    def _should_notify(subscription: dict, old_price: float, new_price: float) -> bool:
+        """Нужно ли уведомлять подписчика: изменение выше порога или достигнута целевая цена"""
+        threshold = subscription['notify_threshold']
+        if threshold is None:
+            threshold = NOTIFICATION_THRESHOLD
+        if old_price and abs(new_price - old_price) / old_price >= threshold:
+            return True
+        target_price = subscription['target_price']
+        return target_price is not None and new_price <= target_price < old_price
+
+    async def _refresh_item(self, item: RefreshItem) -> Optional[float]:
+        """Загрузка цены товара один раз и рассылка всем подписчикам"""
+        new_price = await self.parser.get_price(item.url)
+        if new_price is None or not isinstance(new_price, (int, float)):
+            self.cycle_stats['failed_fetches'] += 1
+            logger.warning(f"Не удалось получить цену для товара {item.key}")
+            return None
+        
+        payload = item.payload
+        subscriptions = payload['subscriptions']
+        self.cycle_stats['unique_fetches'] += 1
+        self.cycle_stats['subscriptions_served'] += len(subscriptions)
+        
+        old_price = payload['current_price']
+        
+        # Цена и история хранятся у товара каталога, одна запись на всех подписчиков
+        await self.writer.add(payload['catalog_item_id'], new_price)
+        payload['current_price'] = new_price
+        
+        for subscription in subscriptions:
+            if old_price and self._should_notify(subscription, old_price, new_price):
+                await self.notification.send_price_change_notification(
+                    subscription['telegram_id'],
+                    payload['name'],
+                    old_price,
+                    new_price
+                )
+        return new_price
+
     async def update_prices(self):
-        """Обновление цен всех товаров"""
+        """Обновление цен всех товаров за один проход, каждый товар загружается один раз"""
         try:
-            with get_db() as db:
-                # Получаем все товары
-                products = db.execute(
-                    text("SELECT * FROM products")
-                ).fetchall()
-                
-                for product in products:
+            items = await self._load_refresh_items()
+            semaphore = asyncio.Semaphore(REFRESH_WORKERS)
+            
+            async def refresh(item: RefreshItem):
+                async with semaphore:
                     try:
-                        # Получаем новую цену
-                        new_price = await self.parser.get_price(product.url)
-                        
-                        if new_price is not None and isinstance(new_price, (int, float)):
-                            # Обновляем цену в базе
-                            DatabaseService.update_product_price(product.id, new_price)
-                            
-                            # Проверяем необходимость уведомления
-                            if abs(new_price - product.current_price) / product.current_price >= 0.1:  # 10% изменение
-                                await self.notification.send_price_change_notification(
-                                    product.user_id,
-                                    product.name,
-                                    product.current_price,
-                                    new_price
-                                )
-                        else:
-                            logger.warning(f"Не удалось получить цену для товара {product.id}")
+                        await self._refresh_item(item)
                     except Exception as e:
-                        logger.error(f"Ошибка при обновлении цены товара {product.id}: {str(e)}")
-                        continue
-                        
+                        logger.error(f"Ошибка при обновлении цены товара {item.key}: {str(e)}")
+            
+            await asyncio.gather(*(refresh(item) for item in items))
+            await self.writer.flush()
+            self._log_cycle_stats()
         except Exception as e:
             logger.error(f"Ошибка при обновлении цен: {str(e)}")
 
     async def start_price_updates(self):
-        """Запуск периодического обновления цен"""
-        while True:
-            try:
-                await self.update_prices()
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении цен: {str(e)}")
-            await asyncio.sleep(PRICE_UPDATE_INTERVAL)
+        """Запуск обновления цен по расписанию"""
+        # Каждый товар обновляется со своим интервалом, а не общим проходом раз в PRICE_UPDATE_INTERVAL
+        writer = asyncio.create_task(self.writer.run())
+        try:
+            await self.scheduler.run()
+        finally:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
 
     async def start(self):
         """Запуск сервиса обновления цен"""
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+from src.config.config import (
+    PRICE_WRITE_BATCH_SIZE,
+    PRICE_WRITE_FLUSH_INTERVAL,
+    PRICE_WRITE_MAX_PENDING,
+    PRICE_WRITE_RETRY_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PriceUpdate(NamedTuple):
+    """Новая цена товара каталога и время ее получения"""
+    catalog_item_id: int
+    price: float
+    timestamp: datetime
+
+
+class PriceUpdateWriter:
+    """
+    Буфер записи цен
+
+    Результаты загрузок копятся в памяти и записываются пакетом: одна
+    транзакция на пакет с массовым обновлением цен товаров и массовой
+    вставкой истории. Пакет записывается, когда набрано batch_size цен
+    или прошло flush_interval секунд с первой цены в буфере. Если запись
+    не удалась, цены возвращаются в буфер и записываются со следующим
+    пакетом. После неудачи автоматическая запись откладывается на паузу,
+    которая удваивается с каждой неудачей до retry_max секунд, а буфер
+    ограничен max_pending ценами: при долгой недоступности базы самые
+    старые цены отбрасываются.
+    """
+
+    def __init__(self, write: Callable[[List[PriceUpdate]], Awaitable[None]],
+                 batch_size: int = PRICE_WRITE_BATCH_SIZE,
+                 flush_interval: float = PRICE_WRITE_FLUSH_INTERVAL,
+                 max_pending: int = PRICE_WRITE_MAX_PENDING,
+                 retry_max: float = PRICE_WRITE_RETRY_MAX):
+        # write записывает пакет одной транзакцией
+        self.write = write
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self.retry_max = retry_max
+        self._buffer: List[PriceUpdate] = []
+        self._first_added_at: Optional[float] = None
+        self._failures = 0
+        self._retry_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.stats = {
+            'batches': 0,
+            'rows': 0,
+            'failed_batches': 0,
+            'dropped': 0,
+            'write_time': 0.0
+        }
+
+    @property
+    def pending(self) -> int:
+        """Цены, ожидающие записи"""
+        return len(self._buffer)
+
+    @property
+    def backing_off(self) -> bool:
+        """Пауза после неудачной записи еще не истекла"""
+        return self._retry_at is not None and time.monotonic() < self._retry_at
+
+    def _trim(self):
+        """Ограничение буфера: самые старые цены отбрасываются"""
+        overflow = len(self._buffer) - self.max_pending
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.stats['dropped'] += overflow
+            logger.warning(
+                f"Буфер цен переполнен ({self.max_pending} шт.), отброшены самые старые: {overflow} шт."
+            )
+
+    async def add(self, catalog_item_id: int, price: float, timestamp: Optional[datetime] = None):
+        """
+        Добавление цены в буфер
+
+        Args:
+            catalog_item_id (int): ID товара каталога
+            price (float): Новая цена
+            timestamp (Optional[datetime]): Время получения цены (UTC), по умолчанию текущее
+        """
+        self._buffer.append(PriceUpdate(catalog_item_id, price, timestamp or datetime.utcnow()))
+        self._trim()
+        if self._first_added_at is None:
+            self._first_added_at = time.monotonic()
+        if len(self._buffer) >= self.batch_size and not self.backing_off:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Запись накопленных цен
+
+        Явный вызов пишет сразу, даже во время паузы после неудачи.
+
+        Returns:
+            int: Количество записанных цен
+        """
+        async with self._lock:
+            if not self._buffer:
+                return 0
+            batch, self._buffer = self._buffer, []
+            self._first_added_at = None
+
+            started = time.perf_counter()
+            try:
+                await self.write(batch)
+            except Exception as e:
+                self.stats['failed_batches'] += 1
+                logger.error(f"Ошибка при записи пакета цен ({len(batch)} шт.): {str(e)}")
+                # Цены не теряются: они будут записаны со следующим пакетом
+                self._buffer[:0] = batch
+                self._trim()
+                self._first_added_at = time.monotonic()
+                self._failures += 1
+                pause = min(self.retry_max, max(self.flush_interval, 1.0) * 2 ** (self._failures - 1))
+                self._retry_at = time.monotonic() + pause
+                logger.warning(f"Следующая попытка записи цен через {pause:.0f} с")
+                return 0
+
+            self._failures = 0
+            self._retry_at = None
+
+            elapsed = time.perf_counter() - started
+            self.stats['batches'] += 1
+            self.stats['rows'] += len(batch)
+            self.stats['write_time'] += elapsed
+            logger.debug(f"Записан пакет цен: {len(batch)} шт. за {elapsed * 1000:.0f} мс")
+            return len(batch)
+
+    async def run(self):
+        """Запись по интервалу до отмены задачи, остаток буфера записывается при остановке"""
+        try:
+            while True:
+                await asyncio.sleep(min(1.0, self.flush_interval))
+                if (self._first_added_at is not None and not self.backing_off
+                        and time.monotonic() - self._first_added_at >= self.flush_interval):
+                    await self.flush()
+        finally:
+            await self.flush()
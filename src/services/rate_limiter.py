@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.config.config import RATE_LIMIT_DEFAULT, RATE_LIMIT_HOSTS
+
+logger = logging.getLogger(__name__)
+
+# Во сколько раз снижается скорость после ответа 429/5xx
+SLOWDOWN_FACTOR = 0.5
+# Доля базовой скорости, восстанавливаемая после каждого успешного ответа
+RECOVERY_STEP = 0.1
+# Минимальная скорость относительно базовой
+MIN_RATE_FACTOR = 0.05
+
+
+class TokenBucket:
+    """
+    Token bucket с запасом на всплеск и адаптивной скоростью
+
+    Токены резервируются заранее: если их не хватает, вызывающий получает
+    время ожидания своей очереди. Поэтому параллельные воркеры делят общий
+    бюджет без опроса и без простоя.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Резервирование одного токена
+
+        Returns:
+            float: Сколько секунд нужно подождать перед запросом
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def slow_down(self, retry_after: Optional[float] = None):
+        """Снижение скорости после ответа 429/5xx"""
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = max(self.base_rate * MIN_RATE_FACTOR, self.rate * SLOWDOWN_FACTOR)
+            # Запас на всплеск сгорает, а Retry-After сдвигает очередь целиком:
+            # следующий запрос будет разрешен не раньше чем через retry_after секунд
+            pause = retry_after or 0
+            self.tokens = min(self.tokens, 0.0) - max(0.0, pause * self.rate - 1)
+
+    def recover(self):
+        """Постепенное восстановление скорости после успешного ответа"""
+        with self._lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+
+
+def _host_key(url_or_host: str) -> str:
+    """Ключ лимита: домен второго уровня (card.wb.ru -> wb.ru)"""
+    host = urlparse(url_or_host).netloc if '://' in url_or_host else url_or_host
+    host = host.split(':')[0].lower()
+    parts = host.split('.')
+    return '.'.join(parts[-2:]) if len(parts) >= 2 else host
+
+
+class RateLimiter:
+    """Общий для процесса ограничитель частоты запросов по хостам"""
+
+    def __init__(self, default: Tuple[float, int] = RATE_LIMIT_DEFAULT,
+                 hosts: Optional[Dict[str, Tuple[float, int]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.default = default
+        self.hosts = RATE_LIMIT_HOSTS if hosts is None else hosts
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url_or_host: str) -> TokenBucket:
+        """Bucket для хоста, создается при первом обращении"""
+        key = _host_key(url_or_host)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, burst = self.hosts.get(key, self.default)
+                bucket = TokenBucket(rate, burst, clock=self.clock)
+                self._buckets[key] = bucket
+            return bucket
+
+    async def acquire(self, url_or_host: str):
+        """Ожидание разрешения на запрос из асинхронного кода"""
+        delay = self.bucket(url_or_host).reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, url_or_host: str):
+        """Ожидание разрешения на запрос из синхронного кода"""
+        delay = self.bucket(url_or_host).reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def report(self, url_or_host: str, status: Optional[int], retry_after: Optional[str] = None):
+        """
+        Учет ответа сервера для адаптации скорости
+
+        Args:
+            url_or_host (str): URL запроса или хост
+            status (Optional[int]): HTTP-статус ответа
+            retry_after (Optional[str]): Значение заголовка Retry-After
+        """
+        bucket = self.bucket(url_or_host)
+        if status == 429 or (status is not None and status >= 500):
+            try:
+                pause = float(retry_after) if retry_after else None
+            except ValueError:
+                pause = None
+            bucket.slow_down(pause)
+            logger.warning(
+                f"Ответ {status} от {_host_key(url_or_host)}, "
+                f"скорость снижена до {bucket.rate:.2f} запросов/с"
+            )
+        elif status is not None and status < 400:
+            bucket.recover()
+
+
+# Общий ограничитель процесса
+rate_limiter = RateLimiter()
@@ -0,0 +1,322 @@
+import asyncio
+import heapq
+import inspect
+import logging
+import math
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from src.config.config import (
+    PRICE_UPDATE_INTERVAL,
+    REFRESH_MIN_INTERVAL,
+    REFRESH_MAX_INTERVAL,
+    REFRESH_BUDGET_PER_HOUR,
+    REFRESH_WORKERS,
+    REFRESH_JITTER,
+    REFRESH_SYNC_INTERVAL,
+)
+from src.services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Вес нового наблюдения при пересчете изменчивости после обновления
+VOLATILITY_DECAY = 0.2
+# Максимальная степень двойки для паузы после неудачных загрузок
+MAX_FAILURE_BACKOFF = 6
+
+
+class RefreshItem:
+    """Товар в расписании обновления цен"""
+
+    def __init__(self, key: str, url: str, last_price: Optional[float] = None,
+                 volatility: float = 0.0, last_change_at: Optional[float] = None,
+                 subscribers: int = 1, payload: Any = None):
+        self.key = key
+        self.url = url
+        self.last_price = last_price
+        # Доля наблюдений, в которых цена менялась (0..1)
+        self.volatility = volatility
+        # Время последнего изменения цены, секунды epoch
+        self.last_change_at = last_change_at
+        self.subscribers = subscribers
+        # Данные, которые нужны функции обновления (например, строки товаров)
+        self.payload = payload
+        self.failures = 0
+        self.interval: Optional[float] = None
+        self.due_at = 0.0
+
+
+def price_stats(history: Sequence[tuple]) -> Tuple[float, Optional[float]]:
+    """
+    Изменчивость цены и время последнего изменения по истории
+
+    Args:
+        history (Sequence[tuple]): (цена, время) или (цена, время появления, число подтверждений)
+            в порядке возрастания времени
+
+    Returns:
+        Tuple[float, Optional[float]]: Доля изменений цены и время последнего изменения (epoch)
+    """
+    changes = 0
+    observations = -1
+    last_change_at = None
+    previous = None
+    for record in history:
+        price, timestamp = record[0], record[1]
+        if previous is not None and price != previous:
+            changes += 1
+            # Время в базе хранится в UTC без часового пояса
+            last_change_at = timestamp.replace(tzinfo=timezone.utc).timestamp()
+        # Запись истории - период с одной ценой, полученной несколько раз
+        observations += record[2] if len(record) > 2 else 1
+        previous = price
+    return (changes / observations if observations > 0 else 0.0), last_change_at
+
+
+def refresh_interval(item: RefreshItem, now: float, base: float = PRICE_UPDATE_INTERVAL,
+                     min_interval: float = REFRESH_MIN_INTERVAL,
+                     max_interval: float = REFRESH_MAX_INTERVAL) -> float:
+    """
+    Интервал до следующего обновления товара
+
+    Изменчивые, недавно менявшиеся и популярные товары обновляются чаще
+    базового интервала, давно стабильные - реже. После неудачных загрузок
+    интервал растет экспоненциально.
+
+    Returns:
+        float: Интервал в секундах
+    """
+    interval = base / (1 + 4 * item.volatility)
+
+    if item.last_change_at is not None:
+        since_change = now - item.last_change_at
+        if since_change < base * 6:
+            interval *= 0.5
+        elif since_change > 30 * 86400:
+            interval *= 4
+        elif since_change > 7 * 86400:
+            interval *= 2
+
+    interval /= 1 + math.log2(max(1, item.subscribers))
+    interval = min(max_interval, max(min_interval, interval))
+
+    if item.failures:
+        interval = min(max_interval, interval * 2 ** min(item.failures, MAX_FAILURE_BACKOFF))
+    return interval
+
+
+class RefreshScheduler:
+    """
+    Планировщик обновления цен
+
+    Для каждого товара хранится время следующего обновления в очереди
+    с приоритетом. Интервал зависит от изменчивости цены, давности
+    последнего изменения, числа подписчиков и неудачных загрузок. Новые
+    товары распределяются по интервалу равномерно, к каждому интервалу
+    добавляется случайный разброс, поэтому загрузки не идут пачкой.
+    Общее число загрузок ограничено бюджетом в час: если товаров больше,
+    чем позволяет бюджет, все интервалы пропорционально растягиваются.
+    """
+
+    def __init__(self, load_items: Callable[[], Union[Iterable[RefreshItem], Awaitable[Iterable[RefreshItem]]]],
+                 refresh: Callable[[RefreshItem], Awaitable[Optional[float]]],
+                 base_interval: float = PRICE_UPDATE_INTERVAL,
+                 min_interval: float = REFRESH_MIN_INTERVAL,
+                 max_interval: float = REFRESH_MAX_INTERVAL,
+                 budget_per_hour: int = REFRESH_BUDGET_PER_HOUR,
+                 workers: int = REFRESH_WORKERS,
+                 jitter: float = REFRESH_JITTER,
+                 sync_interval: float = REFRESH_SYNC_INTERVAL,
+                 clock: Callable[[], float] = time.time):
+        # load_items возвращает актуальный список товаров (может быть корутиной),
+        # refresh загружает цену и возвращает ее или None при неудаче
+        self.load_items = load_items
+        self.refresh = refresh
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_per_hour = max(1, budget_per_hour)
+        self.workers = max(1, workers)
+        self.jitter = jitter
+        self.sync_interval = sync_interval
+        self.clock = clock
+
+        self.items: Dict[str, RefreshItem] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._sequence = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stretch = 1.0
+        self.budget = TokenBucket(self.budget_per_hour / 3600, self.workers)
+        self.stats = {
+            'refreshed': 0,
+            'changed': 0,
+            'failed': 0
+        }
+
+    def _interval(self, item: RefreshItem) -> float:
+        interval = refresh_interval(item, self.clock(), self.base_interval,
+                                    self.min_interval, self.max_interval)
+        item.interval = interval * self.stretch
+        return item.interval
+
+    def _schedule(self, item: RefreshItem, delay: float):
+        item.due_at = self.clock() + delay
+        self._sequence += 1
+        heapq.heappush(self._heap, (item.due_at, self._sequence, item.key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _update_stretch(self):
+        """Растяжение интервалов, если товары не укладываются в бюджет"""
+        now = self.clock()
+        demand = sum(
+            3600 / refresh_interval(item, now, self.base_interval, self.min_interval, self.max_interval)
+            for item in self.items.values()
+        )
+        self.stretch = max(1.0, demand / self.budget_per_hour)
+        if self.stretch > 1:
+            logger.warning(
+                f"Товаров больше, чем позволяет бюджет {self.budget_per_hour} загрузок в час, "
+                f"интервалы увеличены в {self.stretch:.1f} раза"
+            )
+
+    def _rescale(self, factor: float, exclude: Sequence[RefreshItem] = ()):
+        """
+        Перепланирование товаров из расписания после изменения растяжения
+
+        Оставшееся до обновления время каждого товара меняется в factor раз,
+        поэтому товары остаются равномерно распределенными, а после большого
+        импорта уже запланированные загрузки не превышают бюджет до своего
+        первого обновления. Просроченные товары остаются в очереди.
+        """
+        now = self.clock()
+        skipped = {item.key for item in exclude}
+        for item in self.items.values():
+            if item.key in skipped:
+                continue
+            if item.interval is not None:
+                item.interval *= factor
+            if item.due_at > now:
+                self._schedule(item, (item.due_at - now) * factor)
+
+    def sync(self, items: Optional[Iterable[RefreshItem]] = None):
+        """Перечитывание списка товаров: новые добавляются в расписание, удаленные исключаются"""
+        loaded = {item.key: item for item in (self.load_items() if items is None else items)}
+
+        for key in list(self.items):
+            if key not in loaded:
+                del self.items[key]
+
+        new_items = []
+        for key, item in loaded.items():
+            current = self.items.get(key)
+            if current is None:
+                self.items[key] = item
+                new_items.append(item)
+            else:
+                # Время следующего обновления и счетчик неудач сохраняются
+                current.url = item.url
+                current.subscribers = item.subscribers
+                current.payload = item.payload
+
+        previous_stretch = self.stretch
+        self._update_stretch()
+        if self.stretch != previous_stretch:
+            self._rescale(self.stretch / previous_stretch, exclude=new_items)
+        for item in new_items:
+            # Новые товары равномерно распределяются по своему интервалу
+            self._schedule(item, random.uniform(0, self._interval(item)))
+
+        logger.info(f"В расписании обновления цен {len(self.items)} товаров, новых: {len(new_items)}")
+
+    def _record(self, item: RefreshItem, price: Optional[float]):
+        """Учет результата обновления и планирование следующего"""
+        if price is None:
+            item.failures += 1
+            self.stats['failed'] += 1
+        else:
+            item.failures = 0
+            self.stats['refreshed'] += 1
+            changed = item.last_price is not None and price != item.last_price
+            if changed:
+                item.last_change_at = self.clock()
+                self.stats['changed'] += 1
+            item.volatility = (1 - VOLATILITY_DECAY) * item.volatility + VOLATILITY_DECAY * changed
+            item.last_price = price
+
+        # Товар мог быть удален, пока обновлялся
+        if self.items.get(item.key) is item:
+            self._schedule(item, self._jittered(self._interval(item)))
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            try:
+                try:
+                    price = await self.refresh(item)
+                except Exception as e:
+                    logger.error(f"Ошибка при обновлении цены {item.url}: {str(e)}")
+                    price = None
+                self._record(item, price)
+            finally:
+                queue.task_done()
+
+    async def _sleep(self, seconds: float):
+        """Ожидание, прерываемое появлением нового товара в расписании"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, seconds))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch(self, queue: asyncio.Queue):
+        next_sync = 0.0
+        while True:
+            now = self.clock()
+            if now >= next_sync:
+                try:
+                    items = self.load_items()
+                    if inspect.isawaitable(items):
+                        items = await items
+                    self.sync(items)
+                except Exception as e:
+                    logger.error(f"Ошибка при загрузке списка товаров: {str(e)}")
+                next_sync = now + self.sync_interval
+
+            if not self._heap:
+                await self._sleep(next_sync - now)
+                continue
+
+            due_at, _, key = self._heap[0]
+            item = self.items.get(key)
+            if item is None or item.due_at != due_at:
+                # Запись устарела: товар удален или перепланирован
+                heapq.heappop(self._heap)
+                continue
+
+            if due_at > now:
+                await self._sleep(min(due_at, next_sync) - now)
+                continue
+
+            heapq.heappop(self._heap)
+            delay = self.budget.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Очередь ограничена: пока воркеры заняты, новые товары не выбираются
+            await queue.put(item)
+
+    async def run(self):
+        """Работа планировщика до отмены задачи"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers)
+        self._wakeup = asyncio.Event()
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        try:
+            await self._dispatch(queue)
+        finally:
+            for worker in workers:
+                worker.cancel()
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Callable, Dict, Optional
+
+from src.config.config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_MB, REPORT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Файл индекса кэша в папке отчетов
+INDEX_FILE = 'index.json'
+
+
+def report_cache_key(telegram_id: int, days: Optional[int], report_format: str) -> str:
+    """Ключ отчета: пользователь, период и формат"""
+    return f"{telegram_id}:{days or 'all'}:{report_format}"
+
+
+class CachedReport:
+    """Готовый отчет: файл на диске и/или file_id уже отправленного документа"""
+
+    def __init__(self, key: str, version: str, path: Optional[str], created_at: float,
+                 file_id: Optional[str] = None):
+        self.key = key
+        self.version = version
+        self.path = path
+        self.created_at = created_at
+        self.file_id = file_id
+
+    @property
+    def has_file(self) -> bool:
+        return bool(self.path) and os.path.exists(self.path)
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'path': self.path,
+            'created_at': self.created_at,
+            'file_id': self.file_id
+        }
+
+
+class ReportCache:
+    """
+    Кэш готовых отчетов по пользователю и версии данных
+
+    Версия данных (см. AsyncDatabaseService.get_report_version) меняется
+    при любом изменении товаров или цен пользователя; отчет другой версии
+    удаляется при обращении. Отправленный отчет повторно отдается по
+    file_id Telegram без загрузки файла. Отчеты старше max_age удаляются,
+    файлы на диске ограничены max_bytes: сначала удаляются самые старые,
+    при этом отчет с file_id остается доступным. Индекс хранится в папке
+    отчетов и переживает перезапуск; файлы без записи в индексе (остатки
+    прерванных генераций) удаляются после max_age.
+    """
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_MB * 2 ** 20,
+                 max_age: float = REPORT_CACHE_TTL, clock: Callable[[], float] = time.time):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.clock = clock
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries: Dict[str, CachedReport] = self._load()
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _load(self) -> Dict[str, CachedReport]:
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {key: CachedReport(key, **value) for key, value in data.items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Ошибка при чтении индекса кэша отчетов: {str(e)}")
+            return {}
+
+    def _save(self):
+        temp_path = f"{self._index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({key: entry.to_dict() for key, entry in self._entries.items()}, f, ensure_ascii=False)
+        os.replace(temp_path, self._index_path)
+
+    def _remove_file(self, path: Optional[str]):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._remove_file(entry.path)
+            self.stats['evicted'] += 1
+
+    def get(self, key: str, version: str) -> Optional[CachedReport]:
+        """Отчет текущей версии данных или None; устаревший отчет удаляется"""
+        entry = self._entries.get(key)
+        usable = (
+            entry is not None
+            and entry.version == version
+            and self.clock() - entry.created_at <= self.max_age
+            and (entry.file_id or entry.has_file)
+        )
+        if not usable:
+            if entry is not None:
+                self._evict(key)
+                self._save()
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry
+
+    def put(self, key: str, version: str, path: str) -> CachedReport:
+        """Сохранение сгенерированного файла отчета, предыдущий отчет по ключу удаляется"""
+        target = os.path.join(self.directory, os.path.basename(path))
+        if os.path.abspath(path) != target:
+            shutil.move(path, target)
+        previous = self._entries.get(key)
+        if previous is not None and previous.path != target:
+            self._remove_file(previous.path)
+        entry = self._entries[key] = CachedReport(key, version, target, self.clock())
+        self.prune(keep=target)
+        return entry
+
+    def set_file_id(self, key: str, file_id: str):
+        """file_id отправленного документа для повторной отправки без загрузки"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.file_id != file_id:
+            entry.file_id = file_id
+            self._save()
+
+    def prune(self, keep: Optional[str] = None):
+        """
+        Удаление устаревших отчетов и ограничение размера файлов на диске
+
+        Args:
+            keep (Optional[str]): Файл, который нельзя удалять (только что сохраненный отчет)
+        """
+        now = self.clock()
+        for key, entry in list(self._entries.items()):
+            if now - entry.created_at > self.max_age:
+                self._evict(key)
+
+        # Файлы без записи в индексе: остатки прерванных генераций и старые отчеты
+        referenced = {entry.path for entry in self._entries.values()}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(INDEX_FILE) or path in referenced or not os.path.isfile(path):
+                continue
+            if now - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+
+        files = sorted(
+            (entry for entry in self._entries.values() if entry.has_file and entry.path != keep),
+            key=lambda entry: entry.created_at
+        )
+        total = sum(os.path.getsize(entry.path) for entry in files)
+        if keep and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for entry in files:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(entry.path)
+            if entry.file_id:
+                # Отчет по-прежнему можно отправить по file_id
+                self._remove_file(entry.path)
+                entry.path = None
+            else:
+                self._evict(entry.key)
+        self._save()
+
+
+_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Общий для процесса кэш отчетов"""
+    global _cache
+    if _cache is None:
+        _cache = ReportCache()
+    return _cache
@@ -0,0 +1,251 @@
+import logging
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import Boolean, Float, Integer, String, column, func, select, table
+from sqlalchemy.engine import Connection, Engine
+
+from src.config.config import REPORT_QUERY_CHUNK_SIZE
+from src.services.rollups import _history, _rollups, bucket_start, choose_tier
+
+logger = logging.getLogger(__name__)
+
+# Таблицы без импорта моделей: модуль используется и в рабочих процессах отчетов
+_users = table(
+    'users',
+    column('id', Integer),
+    column('telegram_id', Integer),
+)
+_catalog = table(
+    'catalog_items',
+    column('id', Integer),
+    column('name', String),
+    column('platform', String),
+    column('url', String),
+    column('current_price', Float),
+    column('original_price', Float),
+)
+_subscriptions = table(
+    'subscriptions',
+    column('id', Integer),
+    column('user_id', Integer),
+    column('catalog_item_id', Integer),
+    column('url', String),
+    column('notify_threshold', Float),
+    column('target_price', Float),
+    column('is_active', Boolean),
+)
+
+# Колонки истории цен в отчетах
+PRICE_COLUMNS = ['product_id', 'name', 'timestamp', 'open', 'high', 'low', 'close', 'avg', 'count']
+
+
+def _user_items(telegram_id: int):
+    """Подписки пользователя вместе с товарами каталога"""
+    return (
+        _subscriptions
+        .join(_users, _subscriptions.c.user_id == _users.c.id)
+        .join(_catalog, _subscriptions.c.catalog_item_id == _catalog.c.id)
+    ), _users.c.telegram_id == telegram_id
+
+
+def iter_frames(conn: Connection, query, chunk_size: int = REPORT_QUERY_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Потоковое чтение результата запроса фрагментами DataFrame
+
+    Строки читаются порциями (yield_per), каждая порция сразу становится
+    колоночным фрагментом, поэтому в памяти не копятся списки словарей.
+    Значения дат остаются datetime и попадают в колонки datetime64.
+    """
+    result = conn.execution_options(yield_per=chunk_size).execute(query)
+    columns = list(result.keys())
+    for rows in result.partitions():
+        yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def read_frame(conn: Connection, query, chunk_size: int = REPORT_QUERY_CHUNK_SIZE) -> pd.DataFrame:
+    """Результат запроса одним DataFrame, прочитанный порциями"""
+    result = conn.execution_options(yield_per=chunk_size).execute(query)
+    columns = list(result.keys())
+    frames = [pd.DataFrame.from_records(rows, columns=columns) for rows in result.partitions()]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def products_query(telegram_id: int):
+    """Товары пользователя: те же поля, что у DatabaseService.get_user_products"""
+    joined, condition = _user_items(telegram_id)
+    return (
+        select(
+            _subscriptions.c.id,
+            _catalog.c.id.label('catalog_item_id'),
+            _catalog.c.name,
+            _catalog.c.current_price,
+            _catalog.c.original_price,
+            _catalog.c.platform,
+            func.coalesce(_subscriptions.c.url, _catalog.c.url).label('url'),
+            _subscriptions.c.notify_threshold,
+            _subscriptions.c.target_price,
+        )
+        .select_from(joined)
+        .where(condition)
+        .order_by(_subscriptions.c.id)
+    )
+
+
+def iter_products_frames(engine: Engine, telegram_id: int,
+                         chunk_size: int = REPORT_QUERY_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Потоковое чтение товаров пользователя фрагментами DataFrame"""
+    with engine.connect() as conn:
+        yield from iter_frames(conn, products_query(telegram_id), chunk_size)
+
+
+def load_products_frame(engine: Engine, telegram_id: int) -> pd.DataFrame:
+    """Товары пользователя одним запросом"""
+    with engine.connect() as conn:
+        return read_frame(conn, products_query(telegram_id))
+
+
+def _history_start(conn: Connection, telegram_id: int, end: datetime) -> datetime:
+    """Начало истории товаров пользователя: дневные агрегаты покрывают и удаленные сырые записи"""
+    joined, condition = _user_items(telegram_id)
+    start = conn.execute(
+        select(func.min(_rollups.c.bucket_start))
+        .select_from(joined.join(_rollups, _rollups.c.catalog_item_id == _catalog.c.id))
+        .where(condition, _rollups.c.granularity == 'day')
+    ).scalar()
+    if start is None:
+        start = conn.execute(
+            select(func.min(_history.c.timestamp))
+            .select_from(joined.join(_history, _history.c.catalog_item_id == _catalog.c.id))
+            .where(condition)
+        ).scalar()
+    return start or end
+
+
+def _raw_points(runs: pd.DataFrame, start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    Точки цен из периодов истории
+
+    Период дает точку появления цены и, если цена подтверждалась, точку
+    последнего подтверждения с остальными наблюдениями.
+    """
+    confirmations = runs['confirmations'].fillna(1).astype(int)
+    repeated = (
+        runs['last_confirmed'].notna()
+        & (runs['last_confirmed'] != runs['timestamp'])
+        & (confirmations > 1)
+    )
+    first = runs.assign(count=1)
+    last = runs[repeated].assign(timestamp=runs['last_confirmed'][repeated], count=confirmations[repeated] - 1)
+    points = pd.concat([first, last], ignore_index=True)
+    points = points[(points['timestamp'] >= start) & (points['timestamp'] <= end)]
+    return points.assign(open=points['price'], high=points['price'], low=points['price'],
+                         close=points['price'], avg=points['price'])
+
+
+def iter_price_frames(engine: Engine, telegram_id: int, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None,
+                      chunk_size: int = REPORT_QUERY_CHUNK_SIZE) -> Tuple[str, Iterator[pd.DataFrame]]:
+    """
+    Потоковое чтение истории цен всех товаров пользователя одним запросом
+
+    Уровень истории выбирается по длине периода так же, как в
+    DatabaseService.get_price_series: сырые записи, почасовые или дневные
+    агрегаты. Строки приходят из курсора порциями по chunk_size и сразу
+    отдаются фрагментами DataFrame, поэтому память не зависит от объема
+    истории.
+
+    Args:
+        engine (Engine): Движок базы данных
+        telegram_id (int): ID пользователя в Telegram
+        start (Optional[datetime]): Начало периода (UTC), по умолчанию - начало истории
+        end (Optional[datetime]): Конец периода (UTC), по умолчанию - текущее время
+        chunk_size (int): Строк на порцию потокового чтения
+
+    Returns:
+        Tuple[str, Iterator[pd.DataFrame]]: Уровень ('raw', 'hour', 'day') и фрагменты с колонками
+            PRICE_COLUMNS по порядку товаров и времени
+    """
+    end = end or datetime.utcnow()
+    with engine.connect() as conn:
+        if start is None:
+            start = _history_start(conn, telegram_id, end)
+    tier = choose_tier(start, end)
+    return tier, _price_chunks(engine, telegram_id, tier, start, end, chunk_size)
+
+
+def _price_chunks(engine: Engine, telegram_id: int, tier: str, start: datetime, end: datetime,
+                  chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Фрагменты истории цен выбранного уровня"""
+    joined, condition = _user_items(telegram_id)
+    if tier == 'raw':
+        query = (
+            select(
+                _subscriptions.c.id.label('product_id'),
+                _catalog.c.name,
+                _history.c.price,
+                _history.c.timestamp,
+                _history.c.last_confirmed,
+                _history.c.confirmations,
+            )
+            .select_from(joined.join(_history, _history.c.catalog_item_id == _catalog.c.id))
+            .where(condition, _history.c.last_confirmed >= start, _history.c.timestamp <= end)
+            .order_by(_subscriptions.c.id, _history.c.timestamp)
+        )
+    else:
+        query = (
+            select(
+                _subscriptions.c.id.label('product_id'),
+                _catalog.c.name,
+                _rollups.c.bucket_start.label('timestamp'),
+                _rollups.c.open,
+                _rollups.c.high,
+                _rollups.c.low,
+                _rollups.c.close,
+                _rollups.c.count,
+                _rollups.c.total,
+            )
+            .select_from(joined.join(_rollups, _rollups.c.catalog_item_id == _catalog.c.id))
+            .where(
+                condition,
+                _rollups.c.granularity == tier,
+                _rollups.c.bucket_start >= bucket_start(start, tier),
+                _rollups.c.bucket_start <= end
+            )
+            .order_by(_subscriptions.c.id, _rollups.c.bucket_start)
+        )
+
+    with engine.connect() as conn:
+        for frame in iter_frames(conn, query, chunk_size):
+            if tier == 'raw':
+                # Периоды не пересекаются, поэтому порядок точек сохраняется и между фрагментами
+                frame = _raw_points(frame, start, end)
+            else:
+                frame = frame.assign(avg=frame['total'] / frame['count'])
+            frame = frame.reindex(columns=PRICE_COLUMNS)
+            frame['timestamp'] = frame['timestamp'].astype('datetime64[ns]')
+            yield frame.sort_values(['product_id', 'timestamp'], kind='stable', ignore_index=True)
+
+
+def load_price_frame(engine: Engine, telegram_id: int, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None,
+                     chunk_size: int = REPORT_QUERY_CHUNK_SIZE) -> Tuple[str, pd.DataFrame]:
+    """
+    История цен всех товаров пользователя одним DataFrame
+
+    Returns:
+        Tuple[str, pd.DataFrame]: Уровень ('raw', 'hour', 'day') и точки с колонками PRICE_COLUMNS,
+            отсортированные по товару и времени
+    """
+    tier, chunks = iter_price_frames(engine, telegram_id, start, end, chunk_size)
+    frames = list(chunks)
+    if not frames:
+        frame = pd.DataFrame(columns=PRICE_COLUMNS)
+        frame['timestamp'] = frame['timestamp'].astype('datetime64[ns]')
+        return tier, frame
+    frame = pd.concat(frames, ignore_index=True)
+    logger.debug(f"История цен пользователя {telegram_id}: уровень {tier}, точек {len(frame)}")
+    return tier, frame
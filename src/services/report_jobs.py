@@ -0,0 +1,280 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, Dict, Optional
+
+from src.config.config import REPORT_WORKERS, REPORT_QUEUE_SIZE, REPORT_PROGRESS_INTERVAL, REPORT_FORMAT
+
+logger = logging.getLogger(__name__)
+
+
+class ReportRejected(Exception):
+    """Отчет не поставлен в очередь"""
+
+
+class ReportJob:
+    """Задача генерации отчета и ее текущее состояние"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, job_id: int, telegram_id: int, days: Optional[int], report_format: str):
+        self.id = job_id
+        self.telegram_id = telegram_id
+        self.days = days
+        self.format = report_format
+        self.status = self.QUEUED
+        self.sheet: Optional[str] = None
+        self.rows = 0
+        self.path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (self.QUEUED, self.RUNNING)
+
+
+# Очередь прогресса в рабочем процессе, задается инициализатором пула
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def report_progress(job_id: int) -> Callable[[str, int], None]:
+    """Функция прогресса для задачи в рабочем процессе: (лист, строк записано)"""
+    def progress(sheet: str, rows: int):
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, sheet, rows))
+    return progress
+
+
+def generate_report(job_id: int, telegram_id: int, days: Optional[int], report_format: str) -> str:
+    """Генерация отчета в рабочем процессе"""
+    # Импорт в процессе: модуль базы данных создает собственный движок
+    from src.services.analysis import AnalysisService
+
+    progress = report_progress(job_id)
+    progress(None, 0)
+    return AnalysisService.generate_analysis(telegram_id, days, report_format, progress=progress)
+
+
+# Уведомление о смене состояния задачи
+Notify = Callable[[ReportJob], Awaitable[None]]
+
+
+class ReportJobService:
+    """
+    Фоновая генерация отчетов в пуле процессов
+
+    Обработчик ставит отчет в очередь и сразу получает задачу, генерация
+    идет в отдельных процессах, поэтому pandas и openpyxl не занимают GIL
+    и цикл событий бота. Одновременно выполняется не больше workers отчетов,
+    еще queue_size ждут; сверх этого и при уже готовящемся отчете
+    пользователя задача отклоняется с ReportRejected. О каждом изменении
+    состояния - постановке в очередь, прогрессе (не чаще progress_interval),
+    готовности или ошибке - сообщает переданная функция notify.
+    """
+
+    def __init__(self, workers: int = REPORT_WORKERS, queue_size: int = REPORT_QUEUE_SIZE,
+                 progress_interval: float = REPORT_PROGRESS_INTERVAL,
+                 task: Callable[..., str] = generate_report, start_method: str = 'spawn'):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.progress_interval = progress_interval
+        self.task = task
+        self._context = multiprocessing.get_context(start_method)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress = None
+        self._listener: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, ReportJob] = {}
+        self._notify: Dict[int, Notify] = {}
+        self._notified_at: Dict[int, float] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._tasks = set()
+        self._closed = False
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+
+    @property
+    def capacity(self) -> int:
+        """Максимум отчетов, одновременно находящихся в пуле"""
+        return self.workers + self.queue_size
+
+    @property
+    def active(self) -> int:
+        """Отчеты в очереди и в работе"""
+        return sum(1 for job in self._jobs.values() if job.active)
+
+    def _start(self):
+        """Запуск пула и чтения прогресса при первой задаче"""
+        if self._pool is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._progress = self._context.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._progress,)
+        )
+        self._listener = threading.Thread(target=self._listen, name='report-progress', daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        """Передача прогресса из рабочих процессов в цикл событий"""
+        while True:
+            message = self._progress.get()
+            if message is None:
+                return
+            try:
+                self._loop.call_soon_threadsafe(self._on_progress, *message)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                return
+
+    def _on_progress(self, job_id: int, sheet: Optional[str], rows: int):
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return
+        started = job.status == ReportJob.QUEUED
+        job.status = ReportJob.RUNNING
+        job.sheet = sheet or job.sheet
+        job.rows = rows
+        now = time.monotonic()
+        if started or now - self._notified_at.get(job_id, 0) >= self.progress_interval:
+            self._notified_at[job_id] = now
+            self._spawn(self._send(job, ReportJob.RUNNING))
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, job: ReportJob, status: str):
+        """
+        Уведомление обработчика о состоянии status
+
+        Уведомления одной задачи отправляются по очереди, устаревшие (задача
+        уже перешла в другое состояние) пропускаются. Ошибки отправки не
+        прерывают генерацию.
+        """
+        lock = self._locks.get(job.id)
+        if lock is None:
+            return
+        async with lock:
+            notify = self._notify.get(job.id)
+            if notify is None or job.status != status:
+                return
+            try:
+                await notify(job)
+            except Exception as e:
+                logger.error(f"Ошибка при уведомлении об отчете {job.id}: {str(e)}")
+
+    async def submit(self, telegram_id: int, notify: Notify, days: Optional[int] = None,
+                     report_format: str = REPORT_FORMAT) -> ReportJob:
+        """
+        Постановка отчета в очередь
+
+        Args:
+            telegram_id (int): ID пользователя в Telegram
+            notify (Notify): Асинхронная функция, получающая задачу при каждом изменении состояния
+            days (Optional[int]): Период истории цен в днях
+            report_format (str): Формат отчета
+
+        Returns:
+            ReportJob: Поставленная задача
+
+        Raises:
+            ReportRejected: Очередь заполнена, сервис остановлен или отчет пользователя уже готовится
+        """
+        if self._closed:
+            self.stats['rejected'] += 1
+            raise ReportRejected("Генерация отчетов остановлена")
+        if any(job.active and job.telegram_id == telegram_id for job in self._jobs.values()):
+            self.stats['rejected'] += 1
+            raise ReportRejected("Ваш отчет уже готовится")
+        if self.active >= self.capacity:
+            self.stats['rejected'] += 1
+            raise ReportRejected("Слишком много отчетов в очереди, попробуйте позже")
+
+        self._start()
+        job = ReportJob(next(self._ids), telegram_id, days, report_format)
+        self._jobs[job.id] = job
+        self._notify[job.id] = notify
+        self._locks[job.id] = asyncio.Lock()
+        self.stats['submitted'] += 1
+        pool = self._pool
+        future = self._loop.run_in_executor(pool, self.task, job.id, telegram_id, days, report_format)
+        self._spawn(self._finish(job, future, pool))
+        await self._send(job, ReportJob.QUEUED)
+        return job
+
+    async def _finish(self, job: ReportJob, future: asyncio.Future, pool: ProcessPoolExecutor):
+        try:
+            job.path = await future
+            job.status = ReportJob.DONE
+            self.stats['completed'] += 1
+            logger.info(f"Отчет {job.id} пользователя {job.telegram_id} готов: {job.path}")
+        except Exception as e:
+            job.status = ReportJob.FAILED
+            job.error = str(e)
+            self.stats['failed'] += 1
+            logger.error(f"Ошибка при генерации отчета {job.id}: {str(e)}")
+            if isinstance(e, BrokenProcessPool):
+                self._reset(pool)
+        job.finished_at = time.monotonic()
+        try:
+            await self._send(job, job.status)
+        finally:
+            # Завершенные задачи не хранятся
+            self._jobs.pop(job.id, None)
+            self._notify.pop(job.id, None)
+            self._notified_at.pop(job.id, None)
+            self._locks.pop(job.id, None)
+
+    def _reset(self, pool: ProcessPoolExecutor):
+        """
+        Рабочий процесс аварийно завершился: следующая задача запустит новый пул
+
+        Останавливается только пул, в котором выполнялась задача: ошибка
+        из уже замененного пула не должна останавливать новый вместе с его
+        очередью.
+        """
+        if pool is None or pool is not self._pool:
+            return
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._progress.put(None)
+        self._pool = None
+
+    def shutdown(self, wait: bool = False):
+        """Остановка пула, отчеты из очереди отменяются"""
+        self._closed = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._progress.put(None)
+            self._pool = None
+        logger.info(f"Пул отчетов остановлен, статистика: {self.stats}")
+
+
+_service: Optional[ReportJobService] = None
+
+
+def get_report_jobs() -> ReportJobService:
+    """Общий для процесса сервис фоновых отчетов"""
+    global _service
+    if _service is None or _service._closed:
+        _service = ReportJobService()
+    return _service
@@ -0,0 +1,198 @@
+import csv
+import io
+import logging
+import math
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+
+import pandas as pd
+from openpyxl import Workbook
+
+from src.config.config import REPORT_FORMAT, REPORT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+# Строк на листе Excel, включая заголовок; продолжение пишется на следующий лист
+XLSX_MAX_ROWS = 1048576
+
+
+def _cell(value):
+    """Значение ячейки без типов pandas и numpy"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class ReportWriter:
+    """
+    Потоковая запись отчета
+
+    Листы пишутся по фрагментам строк по мере чтения из базы, поэтому
+    память не зависит от объема отчета:
+
+    - xlsx: книга openpyxl в режиме write_only, строки сразу уходят во
+      временный файл листа;
+    - csv: архив с CSV-файлом на каждый лист, строки пишутся прямо в архив;
+    - parquet: архив с Parquet-файлом на каждый лист, фрагмент - группа строк
+      (нужен pyarrow).
+
+    Использование:
+        with ReportWriter(path_base, 'xlsx') as writer:
+            writer.write_sheet('Товары', columns, chunks)
+        path = writer.path
+    """
+
+    def __init__(self, path_base: str, report_format: str = REPORT_FORMAT,
+                 max_rows: int = XLSX_MAX_ROWS,
+                 progress: Optional[Callable[[str, int], None]] = None):
+        """
+        Args:
+            path_base (str): Путь к файлу отчета без расширения
+            report_format (str): Формат отчета: xlsx, csv или parquet
+            max_rows (int): Строк на листе Excel, включая заголовок
+            progress (Optional[Callable[[str, int], None]]): Вызывается после каждого фрагмента
+                с названием листа и числом строк, записанных в отчет
+        """
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат отчета: {report_format}")
+        self.format = report_format
+        self.max_rows = max_rows
+        self.progress = progress
+        self.rows = 0
+        if report_format == 'xlsx':
+            self.path = f"{path_base}.xlsx"
+            self._workbook = Workbook(write_only=True)
+        else:
+            self.path = f"{path_base}_{report_format}.zip"
+            self._archive = zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close(discard=exc_type is not None)
+
+    def write_sheet(self, name: str, columns: List[str], chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Запись листа по фрагментам
+
+        Args:
+            name (str): Название листа
+            columns (List[str]): Колонки листа в нужном порядке
+            chunks (Iterable[pd.DataFrame]): Фрагменты строк
+
+        Returns:
+            int: Количество записанных строк
+        """
+        chunks = self._track(name, chunks)
+        if self.format == 'xlsx':
+            rows = self._write_xlsx(name, columns, chunks)
+        elif self.format == 'csv':
+            rows = self._write_csv(name, columns, chunks)
+        else:
+            rows = self._write_parquet(name, columns, chunks)
+        self.rows += rows
+        return rows
+
+    def _track(self, name: str, chunks: Iterable[pd.DataFrame]) -> Iterable[pd.DataFrame]:
+        """Фрагменты листа с вызовом progress после записи каждого из них"""
+        rows = self.rows
+        for chunk in chunks:
+            yield chunk
+            rows += len(chunk)
+            if self.progress:
+                self.progress(name, rows)
+
+    def _write_xlsx(self, name: str, columns: List[str], chunks: Iterable[pd.DataFrame]) -> int:
+        sheet, part, sheet_rows, rows = None, 0, 0, 0
+        for chunk in chunks:
+            for row in chunk[columns].itertuples(index=False, name=None):
+                if sheet is None or sheet_rows >= self.max_rows:
+                    part += 1
+                    sheet = self._workbook.create_sheet(name if part == 1 else f"{name} ({part})")
+                    sheet.append(columns)
+                    sheet_rows = 1
+                sheet.append([_cell(value) for value in row])
+                sheet_rows += 1
+                rows += 1
+        if sheet is None:
+            self._workbook.create_sheet(name).append(columns)
+        return rows
+
+    def _write_csv(self, name: str, columns: List[str], chunks: Iterable[pd.DataFrame]) -> int:
+        rows = 0
+        with self._archive.open(f"{name}.csv", 'w') as raw:
+            # utf-8-sig: Excel открывает файл с кириллицей без выбора кодировки
+            stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            csv.writer(stream).writerow(columns)
+            for chunk in chunks:
+                chunk[columns].to_csv(stream, header=False, index=False)
+                rows += len(chunk)
+            stream.flush()
+            stream.detach()
+        return rows
+
+    def _write_parquet(self, name: str, columns: List[str], chunks: Iterable[pd.DataFrame]) -> int:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Для отчетов в формате parquet нужен пакет pyarrow")
+
+        rows = 0
+        writer, schema = None, None
+        # Parquet пишется с конца файла, поэтому лист собирается во временном файле
+        fd, temp_path = tempfile.mkstemp(suffix='.parquet')
+        os.close(fd)
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk[columns], preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(temp_path, schema)
+                writer.write_table(table.cast(schema))
+                rows += len(chunk)
+            if writer is None:
+                pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=columns), preserve_index=False), temp_path)
+            else:
+                writer.close()
+            self._archive.write(temp_path, f"{name}.parquet")
+        finally:
+            os.remove(temp_path)
+        return rows
+
+    def close(self, discard: bool = False):
+        """Завершение записи; при discard файл отчета удаляется"""
+        if self.format == 'xlsx':
+            if not discard:
+                self._workbook.save(self.path)
+            self._workbook.close()
+        else:
+            self._archive.close()
+        if discard and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def frame_chunks(frame: pd.DataFrame, chunk_size: int) -> Iterable[pd.DataFrame]:
+    """Фрагменты уже загруженного DataFrame для ReportWriter"""
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+
+def report_path(prefix: str, created_at: Optional[datetime] = None) -> str:
+    """Путь к файлу отчета без расширения в папке отчетов"""
+    reports_dir = os.path.abspath(REPORT_CACHE_DIR)
+    os.makedirs(reports_dir, exist_ok=True)
+    created_at = created_at or datetime.now()
+    return os.path.join(reports_dir, f"{prefix}_{created_at.strftime('%Y%m%d_%H%M%S')}")
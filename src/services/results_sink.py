@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from src.config.config import RESULTS_JSONL_PATH, RESULTS_FSYNC_EVERY
+from src.utils.urls import PLATFORM_NAMES
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+
+
+def format_price(price: float) -> str:
+    """Форматирование цены в виде '1 234 ₽'"""
+    if not price:
+        return ''
+    return f"{price:,.0f} ₽".replace(',', ' ')
+
+
+def to_parsed_record(url: str, data: Dict) -> Dict[str, str]:
+    """Преобразование данных о товаре в формат parsed_data.json"""
+    return {
+        'url': url,
+        'platform': PLATFORM_NAMES.get(data['platform'], data['platform']),
+        'product_name': data['name'],
+        'price_with_discount': format_price(data['current_price']),
+        'price_without_discount': format_price(data['original_price'])
+    }
+
+
+class JsonlResultsSink:
+    """
+    Журнал результатов парсинга в формате JSONL
+
+    Каждая обработанная ссылка дописывается отдельной строкой, сброс на диск
+    выполняется пачками по fsync_every записей. По журналу можно продолжить
+    прерванный запуск и собрать актуальный parsed_data.json.
+    """
+
+    def __init__(self, path: str = RESULTS_JSONL_PATH, fsync_every: int = RESULTS_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self._file = None
+        self._unsynced = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _drop_partial_line(self):
+        """
+        Отрезание оборванной последней строки журнала
+
+        После аварийного завершения файл может заканчиваться недописанной
+        записью. Без этого первая запись продолженного запуска склеилась бы
+        с ней в одну поврежденную строку и потерялась бы при чтении.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b'\n':
+                return
+            # Поиск последнего перевода строки с конца файла блоками
+            position = end
+            keep = 0
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                block = f.read(position - start)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    keep = start + newline + 1
+                    break
+                position = start
+            f.truncate(keep)
+        logger.warning(f"Отрезана оборванная запись в конце {self.path}: {end - keep} байт")
+
+    def open(self):
+        """Открытие журнала на дозапись"""
+        if self._file is None:
+            self._drop_partial_line()
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def sync(self):
+        """Принудительный сброс накопленных записей на диск"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """Сброс данных и закрытие журнала"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def write(self, url: str, data: Optional[Dict] = None, error: Optional[str] = None):
+        """
+        Запись результата обработки ссылки
+
+        Args:
+            url (str): Исходная ссылка
+            data (Optional[Dict]): Данные о товаре при успехе
+            error (Optional[str]): Текст ошибки при неудаче
+        """
+        self.open()
+        record = {
+            'url': url,
+            'status': STATUS_OK if data else STATUS_ERROR,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'data': data,
+            'error': error
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def load_latest(self) -> Dict[str, Dict]:
+        """
+        Последняя запись журнала для каждой ссылки
+
+        Returns:
+            Dict[str, Dict]: {url: запись}
+        """
+        latest: Dict[str, Dict] = {}
+        if not os.path.exists(self.path):
+            return latest
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Строка могла оборваться при аварийном завершении
+                    logger.warning(f"Пропущена поврежденная строка {line_number} в {self.path}")
+                    continue
+                latest[record['url']] = record
+        return latest
+
+    def pending(self, urls: Iterable[str], max_age: timedelta) -> List[str]:
+        """
+        Ссылки, которые нужно обработать заново
+
+        Args:
+            urls (Iterable[str]): Все ссылки запуска
+            max_age (timedelta): Срок, в течение которого успешный результат считается свежим
+
+        Returns:
+            List[str]: Ссылки без результата, с ошибкой или с устаревшим результатом
+        """
+        latest = self.load_latest()
+        threshold = datetime.now() - max_age
+        result = []
+        for url in urls:
+            record = latest.get(url)
+            if (record and record['status'] == STATUS_OK
+                    and datetime.fromisoformat(record['finished_at']) >= threshold):
+                continue
+            result.append(url)
+        return result
+
+    def compact(self, output_path: str) -> int:
+        """
+        Сборка актуального представления parsed_data.json
+
+        Существующие записи в output_path сохраняются, успешные результаты
+        из журнала их обновляют.
+
+        Args:
+            output_path (str): Путь к parsed_data.json
+
+        Returns:
+            int: Количество товаров в итоговом файле
+        """
+        view: Dict[str, Dict] = {}
+        if os.path.exists(output_path):
+            try:
+                with open(output_path, 'r', encoding='utf-8') as f:
+                    view = json.load(f)
+            except ValueError as e:
+                logger.error(f"Ошибка при чтении {output_path}: {str(e)}")
+
+        for url, record in self.load_latest().items():
+            if record['status'] == STATUS_OK:
+                view[url] = record['data']
+
+        # Запись через временный файл, чтобы читатели не увидели файл наполовину
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(view, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+        return len(view)
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Float, Integer, String, bindparam, column, insert, select, table, text
+from sqlalchemy.engine import Engine
+
+from src.config.config import (
+    PRICE_HISTORY_RETENTION_DAYS,
+    PRICE_HISTORY_ARCHIVE,
+    ROLLUP_HOURLY_RETENTION_DAYS,
+    RETENTION_INTERVAL,
+    HISTORY_RAW_RANGE_DAYS,
+    HISTORY_HOURLY_RANGE_DAYS,
+)
+from src.services.price_history import run_history_compaction
+
+logger = logging.getLogger(__name__)
+
+# Уровни агрегатов и длина их интервала
+GRANULARITIES = ('hour', 'day')
+
+# Товаров каталога на одну транзакцию заполнения агрегатов
+BACKFILL_CHUNK_SIZE = 200
+
+# Таблицы без импорта моделей: модуль используется при инициализации базы
+_history = table(
+    'price_history',
+    column('id', Integer),
+    column('catalog_item_id', Integer),
+    column('price', Float),
+    column('timestamp', DateTime),
+    column('last_confirmed', DateTime),
+    column('confirmations', Integer),
+)
+_rollups = table(
+    'price_rollups',
+    column('id', Integer),
+    column('catalog_item_id', Integer),
+    column('granularity', String),
+    column('bucket_start', DateTime),
+    column('open', Float),
+    column('high', Float),
+    column('low', Float),
+    column('close', Float),
+    column('count', Integer),
+    column('total', Float),
+    column('closed_at', DateTime),
+)
+
+# Наблюдение цены: (ID товара каталога, цена, время, число наблюдений)
+Observation = Tuple[int, float, datetime, int]
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Начало часа или дня, в который попадает время"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def choose_tier(start: datetime, end: datetime) -> str:
+    """
+    Уровень истории для периода
+
+    Короткие периоды читаются из сырых записей, средние - из почасовых
+    агрегатов, длинные - из дневных, поэтому число читаемых строк не
+    растет с накоплением истории.
+
+    Returns:
+        str: 'raw', 'hour' или 'day'
+    """
+    span = end - start
+    if span <= timedelta(days=HISTORY_RAW_RANGE_DAYS):
+        return 'raw'
+    if span <= timedelta(days=HISTORY_HOURLY_RANGE_DAYS):
+        return 'hour'
+    return 'day'
+
+
+def merge_rollups(existing: Iterable, observations: Iterable[Observation]) -> Tuple[List[dict], List[dict]]:
+    """
+    Добавление наблюдений в почасовые и дневные агрегаты
+
+    Args:
+        existing (Iterable): Уже сохраненные агрегаты затронутых интервалов
+        observations (Iterable[Observation]): Новые наблюдения цен
+
+    Returns:
+        Tuple[List[dict], List[dict]]: Измененные существующие агрегаты (с id) и новые агрегаты
+    """
+    buckets: Dict[tuple, dict] = {}
+    for row in existing:
+        row = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
+        row['changed'] = False
+        buckets[(row['catalog_item_id'], row['granularity'], row['bucket_start'])] = row
+
+    for item_id, price, timestamp, weight in sorted(observations, key=lambda observation: observation[2]):
+        for granularity in GRANULARITIES:
+            key = (item_id, granularity, bucket_start(timestamp, granularity))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    'id': None,
+                    'catalog_item_id': item_id,
+                    'granularity': granularity,
+                    'bucket_start': key[2],
+                    'open': price,
+                    'high': price,
+                    'low': price,
+                    'close': price,
+                    'count': 0,
+                    'total': 0.0,
+                    'closed_at': None
+                }
+            bucket['high'] = max(bucket['high'], price)
+            bucket['low'] = min(bucket['low'], price)
+            bucket['count'] += weight
+            bucket['total'] += price * weight
+            if bucket['closed_at'] is None or timestamp >= bucket['closed_at']:
+                bucket['close'] = price
+                bucket['closed_at'] = timestamp
+            bucket['changed'] = True
+
+    updates, inserts = [], []
+    for bucket in buckets.values():
+        if not bucket.pop('changed'):
+            continue
+        if bucket['id'] is None:
+            del bucket['id']
+            inserts.append(bucket)
+        else:
+            updates.append(bucket)
+    return updates, inserts
+
+
+def observations_from_updates(updates: Iterable) -> List[Observation]:
+    """Наблюдения из новых цен (PriceUpdate)"""
+    return [(update.catalog_item_id, update.price, update.timestamp, 1) for update in updates]
+
+
+def existing_rollups_query(observations: List[Observation]):
+    """Сохраненные агрегаты интервалов, в которые попадают наблюдения"""
+    item_ids = sorted({observation[0] for observation in observations})
+    since = bucket_start(min(observation[2] for observation in observations), 'day')
+    return select(_rollups).where(
+        _rollups.c.catalog_item_id.in_(item_ids),
+        _rollups.c.bucket_start >= since
+    )
+
+
+def rollup_statements(existing_rows, observations: List[Observation]) -> list:
+    """
+    Запросы обновления агрегатов
+
+    Returns:
+        list: Пары (запрос, параметры executemany), пустые пропускаются
+    """
+    updates, inserts = merge_rollups(existing_rows, observations)
+    statements = []
+    if updates:
+        statements.append((
+            _rollups.update()
+            .where(_rollups.c.id == bindparam('row_id'))
+            .values(high=bindparam('high'), low=bindparam('low'), close=bindparam('close'),
+                    count=bindparam('count'), total=bindparam('total'), closed_at=bindparam('closed_at')),
+            [
+                {
+                    'row_id': row['id'], 'high': row['high'], 'low': row['low'], 'close': row['close'],
+                    'count': row['count'], 'total': row['total'], 'closed_at': row['closed_at']
+                }
+                for row in updates
+            ]
+        ))
+    if inserts:
+        statements.append((insert(_rollups), inserts))
+    return statements
+
+
+def backfill_rollups(engine: Engine, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Заполнение агрегатов по уже накопленной истории
+
+    Период истории дает наблюдение в момент появления цены и, если цена
+    подтверждалась, оставшиеся наблюдения в момент последнего подтверждения.
+
+    Returns:
+        int: Количество созданных агрегатов
+    """
+    created = 0
+    with engine.connect() as conn:
+        item_ids = [row[0] for row in conn.execute(
+            select(_history.c.catalog_item_id).distinct()
+            .where(_history.c.catalog_item_id.isnot(None))
+            .order_by(_history.c.catalog_item_id)
+        )]
+
+    for start in range(0, len(item_ids), chunk_size):
+        chunk = item_ids[start:start + chunk_size]
+        with engine.begin() as conn:
+            runs = conn.execute(
+                select(_history.c.catalog_item_id, _history.c.price, _history.c.timestamp,
+                       _history.c.last_confirmed, _history.c.confirmations)
+                .where(_history.c.catalog_item_id.in_(chunk))
+            ).fetchall()
+
+            observations: List[Observation] = []
+            for item_id, price, first_seen, last_confirmed, confirmations in runs:
+                if first_seen is None:
+                    continue
+                observations.append((item_id, price, first_seen, 1))
+                if (confirmations or 1) > 1:
+                    observations.append((item_id, price, last_confirmed or first_seen, confirmations - 1))
+
+            _, inserts = merge_rollups([], observations)
+            if inserts:
+                conn.execute(insert(_rollups), inserts)
+            created += len(inserts)
+    return created
+
+
+# Записи истории, кроме последней записи каждого товара: она нужна для записи только изменений
+_PRUNABLE = (
+    "last_confirmed < :cutoff AND id NOT IN ("
+    "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+    "PARTITION BY catalog_item_id ORDER BY timestamp DESC, id DESC) AS position "
+    "FROM price_history) AS ranked WHERE position = 1)"
+)
+
+
+def prune_history(engine: Engine, retention_days: int = PRICE_HISTORY_RETENTION_DAYS,
+                  archive: bool = PRICE_HISTORY_ARCHIVE,
+                  hourly_retention_days: int = ROLLUP_HOURLY_RETENTION_DAYS,
+                  now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Удаление или перенос в архив сырых записей и почасовых агрегатов старше срока хранения
+
+    Returns:
+        Dict[str, int]: Количество удаленных записей истории и почасовых агрегатов
+    """
+    now = now or datetime.utcnow()
+    cutoff = bindparam('cutoff', type_=DateTime)
+    with engine.begin() as conn:
+        if archive:
+            conn.execute(
+                text(
+                    "INSERT INTO price_history_archive "
+                    "(id, catalog_item_id, price, timestamp, last_confirmed, confirmations) "
+                    "SELECT id, catalog_item_id, price, timestamp, last_confirmed, confirmations "
+                    f"FROM price_history WHERE {_PRUNABLE}"
+                ).bindparams(cutoff),
+                {'cutoff': now - timedelta(days=retention_days)}
+            )
+        history = conn.execute(
+            text(f"DELETE FROM price_history WHERE {_PRUNABLE}").bindparams(cutoff),
+            {'cutoff': now - timedelta(days=retention_days)}
+        ).rowcount
+        hourly = conn.execute(
+            text("DELETE FROM price_rollups WHERE granularity = 'hour' AND bucket_start < :cutoff")
+            .bindparams(cutoff),
+            {'cutoff': now - timedelta(days=hourly_retention_days)}
+        ).rowcount
+    return {'history': history, 'hourly': hourly}
+
+
+async def run_history_maintenance(engine: Engine, interval: float = RETENTION_INTERVAL):
+    """
+    Обслуживание истории цен до отмены задачи
+
+    Сначала накопленная история сжимается в периоды, затем по интервалу
+    старые сырые записи и почасовые агрегаты удаляются или переносятся
+    в архив. Все операции выполняются вне цикла событий.
+    """
+    await run_history_compaction(engine)
+    while True:
+        try:
+            stats = await asyncio.to_thread(prune_history, engine)
+            if stats['history'] or stats['hourly']:
+                logger.info(
+                    f"Очистка истории цен: записей {stats['history']}, "
+                    f"почасовых агрегатов {stats['hourly']}"
+                )
+        except Exception as e:
+            logger.error(f"Ошибка при очистке истории цен: {str(e)}")
+        await asyncio.sleep(interval)
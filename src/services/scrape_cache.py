@@ -0,0 +1,210 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from src.config.config import (
+    SCRAPE_CACHE_PATH,
+    SCRAPE_CACHE_MEMORY_SIZE,
+    SCRAPE_CACHE_TTL,
+    SCRAPE_CACHE_STALE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# TTL для площадок, которых нет в настройках
+DEFAULT_TTL = 1800
+
+
+class CacheEntry:
+    """Результат парсинга с временем получения"""
+
+    def __init__(self, key: str, platform: str, data: dict, fetched_at: float,
+                 ttl: float, stale_ttl: float, clock: Callable[[], float] = time.time):
+        self.key = key
+        self.platform = platform
+        self.data = data
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+
+    @property
+    def age(self) -> float:
+        """Возраст результата в секундах"""
+        return max(0.0, self._clock() - self.fetched_at)
+
+    @property
+    def is_fresh(self) -> bool:
+        """Результат можно отдавать без обновления"""
+        return self.age <= self.ttl
+
+    @property
+    def is_usable(self) -> bool:
+        """Результат можно отдать, обновив его в фоне"""
+        return self.age <= self.ttl + self.stale_ttl
+
+
+class ScrapeCache:
+    """
+    Кэш результатов парсинга по каноническому ключу товара
+
+    Последние записи хранятся в памяти (LRU), все записи - в SQLite,
+    поэтому кэш общий для бота, импорта и обновления цен и переживает
+    перезапуск. Для каждой площадки свой TTL, после него запись еще
+    stale_ttl секунд может отдаваться с фоновым обновлением.
+    """
+
+    def __init__(self, path: Optional[str] = SCRAPE_CACHE_PATH,
+                 memory_size: int = SCRAPE_CACHE_MEMORY_SIZE,
+                 ttl: Optional[Dict[str, float]] = None,
+                 stale_ttl: float = SCRAPE_CACHE_STALE_TTL,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.memory_size = max(1, memory_size)
+        self.ttl = SCRAPE_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0}
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scrape_cache ("
+                "key TEXT PRIMARY KEY, platform TEXT NOT NULL, "
+                "data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _entry(self, key: str, platform: str, data: dict, fetched_at: float) -> CacheEntry:
+        return CacheEntry(
+            key, platform, data, fetched_at,
+            ttl=self.ttl.get(platform, DEFAULT_TTL),
+            stale_ttl=self.stale_ttl,
+            clock=self.clock
+        )
+
+    def _remember(self, entry: CacheEntry):
+        self._memory[entry.key] = entry
+        self._memory.move_to_end(entry.key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Получение записи кэша
+
+        Args:
+            key (str): Канонический ключ товара
+
+        Returns:
+            Optional[CacheEntry]: Запись, пока ее еще можно отдавать, иначе None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                try:
+                    db = self._db()
+                    row = db.execute(
+                        "SELECT platform, data, fetched_at FROM scrape_cache WHERE key = ?",
+                        (key,)
+                    ).fetchone() if db else None
+                except sqlite3.Error as e:
+                    logger.error(f"Ошибка при чтении кэша парсинга: {str(e)}")
+                    row = None
+                if row is not None:
+                    entry = self._entry(key, row[0], json.loads(row[1]), row[2])
+                    self._remember(entry)
+
+            if entry is None or not entry.is_usable:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits' if entry.is_fresh else 'stale_hits'] += 1
+            return entry
+
+    def set(self, key: str, platform: str, data: dict) -> CacheEntry:
+        """
+        Сохранение результата парсинга
+
+        Args:
+            key (str): Канонический ключ товара
+            platform (str): Ключ площадки, определяет TTL
+            data (dict): Данные о товаре
+
+        Returns:
+            CacheEntry: Сохраненная запись
+        """
+        entry = self._entry(key, platform, data, self.clock())
+        with self._lock:
+            self._remember(entry)
+            try:
+                db = self._db()
+                if db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO scrape_cache (key, platform, data, fetched_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, platform, json.dumps(data, ensure_ascii=False), entry.fetched_at)
+                    )
+                    db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка при записи в кэш парсинга: {str(e)}")
+        return entry
+
+    def invalidate(self, key: str):
+        """Удаление записи из кэша"""
+        with self._lock:
+            self._memory.pop(key, None)
+            db = self._db()
+            if db:
+                db.execute("DELETE FROM scrape_cache WHERE key = ?", (key,))
+                db.commit()
+
+    def purge(self) -> int:
+        """
+        Удаление записей, которые уже нельзя отдавать
+
+        Returns:
+            int: Количество удаленных записей на диске
+        """
+        threshold = self.clock() - max(self.ttl.values(), default=DEFAULT_TTL) - self.stale_ttl
+        with self._lock:
+            for key in [key for key, entry in self._memory.items() if not entry.is_usable]:
+                del self._memory[key]
+            db = self._db()
+            if not db:
+                return 0
+            cursor = db.execute("DELETE FROM scrape_cache WHERE fetched_at < ?", (threshold,))
+            db.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """Закрытие соединения с SQLite"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[ScrapeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_scrape_cache() -> ScrapeCache:
+    """Общий для процесса кэш результатов парсинга"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScrapeCache()
+        return _cache
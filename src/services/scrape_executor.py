@@ -0,0 +1,174 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.config.config import SCRAPE_WORKERS, SCRAPE_QUEUE_SIZE, SCRAPE_DEADLINE
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeRejected(Exception):
+    """Очередь загрузок заполнена, задача не принята"""
+
+
+class ScrapeDeadlineExceeded(TimeoutError):
+    """Задача не выполнена за отведенное время"""
+
+
+class _Job:
+    """Задача в очереди пула"""
+
+    def __init__(self, deadline_at: float):
+        self.deadline_at = deadline_at
+        self.cancelled = threading.Event()
+
+
+class ScrapeExecutor:
+    """
+    Пул для блокирующих загрузок, которые нельзя выполнять в цикле событий
+
+    Загрузки выполняются в workers потоках, еще queue_size задач могут ждать
+    в очереди. Если очередь заполнена, новая задача сразу отклоняется
+    с ScrapeRejected, а не копится без ограничений. У каждой задачи есть
+    срок выполнения с момента постановки в очередь: по его истечении или при
+    отмене ожидающего обработчика задача, которая еще не начала работу, не
+    выполняется, а результат уже запущенной отбрасывается.
+    """
+
+    def __init__(self, workers: int = SCRAPE_WORKERS, queue_size: int = SCRAPE_QUEUE_SIZE,
+                 deadline: float = SCRAPE_DEADLINE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.deadline = deadline
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scrape')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._closed = False
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'expired': 0,
+            'cancelled': 0
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Максимум задач, одновременно находящихся в пуле"""
+        return self.workers + self.queue_size
+
+    @property
+    def queued(self) -> int:
+        """Задачи, ожидающие свободного воркера"""
+        with self._lock:
+            return self._pending - self._running
+
+    @property
+    def saturated(self) -> bool:
+        """Новая задача будет отклонена"""
+        with self._lock:
+            return self._pending >= self.capacity
+
+    def _inc(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _execute(self, job: _Job, fn: Callable[..., Any], args: tuple) -> Any:
+        if job.cancelled.is_set():
+            raise asyncio.CancelledError()
+        if time.monotonic() >= job.deadline_at:
+            raise ScrapeDeadlineExceeded("Задача ждала в очереди дольше срока выполнения")
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None) -> Any:
+        """
+        Выполнение блокирующей функции в пуле
+
+        Args:
+            fn (Callable[..., Any]): Блокирующая функция
+            *args: Аргументы функции
+            deadline (Optional[float]): Срок выполнения в секундах, по умолчанию SCRAPE_DEADLINE
+
+        Returns:
+            Any: Результат функции
+
+        Raises:
+            ScrapeRejected: Очередь заполнена или пул остановлен
+            ScrapeDeadlineExceeded: Задача не выполнена за отведенное время
+        """
+        timeout = self.deadline if deadline is None else deadline
+        with self._lock:
+            if self._closed or self._pending >= self.capacity:
+                self.stats['rejected'] += 1
+                raise ScrapeRejected("Слишком много загрузок в очереди, попробуйте позже")
+            self._pending += 1
+            self.stats['submitted'] += 1
+
+        job = _Job(time.monotonic() + timeout)
+        try:
+            future = self._pool.submit(self._execute, job, fn, args)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise ScrapeRejected("Пул загрузок остановлен")
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except ScrapeDeadlineExceeded:
+            self._inc('expired')
+            raise
+        except asyncio.TimeoutError:
+            job.cancelled.set()
+            future.cancel()
+            self._inc('expired')
+            raise ScrapeDeadlineExceeded(f"Загрузка не завершилась за {timeout:.0f} с")
+        except asyncio.CancelledError:
+            # Обработчик больше не ждет результат: задача из очереди не запустится
+            job.cancelled.set()
+            future.cancel()
+            self._inc('cancelled')
+            raise
+        except Exception:
+            self._inc('failed')
+            raise
+
+        self._inc('completed')
+        return result
+
+    def shutdown(self, wait: bool = False):
+        """Остановка пула, задачи из очереди отменяются"""
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info(f"Пул загрузок остановлен, статистика: {self.stats}")
+
+
+_executor: Optional[ScrapeExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_scrape_executor() -> ScrapeExecutor:
+    """Общий для процесса пул браузерных загрузок"""
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor._closed:
+            _executor = ScrapeExecutor()
+            atexit.register(_executor.shutdown)
+        return _executor
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Объединение одновременных запросов с одинаковым ключом
+
+    Первый вызов для ключа запускает загрузку, остальные вызовы до ее
+    завершения ждут тот же результат или ту же ошибку. Загрузка выполняется
+    отдельной задачей, поэтому отмена одного из ожидающих не прерывает ее
+    для остальных.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            'calls': 0,
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    @property
+    def saved(self) -> int:
+        """Количество загрузок, которые не понадобилось выполнять"""
+        return self.stats['coalesced']
+
+    def in_flight(self, key: str) -> bool:
+        """Выполняется ли сейчас загрузка для ключа"""
+        return key in self._inflight
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Ошибка уже передана ожидающим, если все они отменены - не считаем ее потерянной
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполнение загрузки или присоединение к уже начатой
+
+        Args:
+            key (str): Ключ загрузки
+            fn (Callable[[], Awaitable[T]]): Функция загрузки, вызывается только первым запросом
+
+        Returns:
+            T: Результат загрузки
+        """
+        self.stats['calls'] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            logger.debug(f"Запрос {key} присоединен к уже выполняющейся загрузке")
+        else:
+            self.stats['executions'] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+
+# Общий для процесса: все экземпляры ParserService делят загрузки
+single_flight = SingleFlight()
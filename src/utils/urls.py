@@ -0,0 +1,124 @@
+import re
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Домены поддерживаемых площадок и их ключи
+PLATFORM_DOMAINS = {
+    'wildberries.ru': 'wildberries',
+    'ozon.ru': 'ozon',
+    'market.yandex.ru': 'market'
+}
+
+# Названия площадок для отображения пользователю
+PLATFORM_NAMES = {
+    'wildberries': 'Wildberries',
+    'ozon': 'Ozon',
+    'market': 'Market'
+}
+
+def detect_platform(url: str) -> Optional[str]:
+    """
+    Определение площадки по URL
+    
+    Args:
+        url (str): URL товара
+        
+    Returns:
+        Optional[str]: Ключ площадки (wildberries, ozon, market) или None
+    """
+    try:
+        domain = urlparse(url.strip()).netloc.lower()
+    except (AttributeError, ValueError):
+        return None
+    
+    for platform_domain, platform in PLATFORM_DOMAINS.items():
+        if domain == platform_domain or domain.endswith('.' + platform_domain):
+            return platform
+    return None
+
+def canonical_url(url: str) -> str:
+    """
+    Канонический вид ссылки на товар: без параметров, якоря и www
+    
+    Args:
+        url (str): URL товара
+        
+    Returns:
+        str: Ссылка, по которой разные варианты одного товара совпадают
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parsed.path.rstrip('/') or '/'
+    return f"https://{host}{path}"
+
+# Идентификатор товара в пути ссылки
+_OZON_SKU = re.compile(r'/(?:product/(?:[^/]*-)?|context/detail/id/)(\d+)(?:/|$)')
+_WB_SKU = re.compile(r'/catalog/(\d+)(?:/|$)')
+_MARKET_SKU = re.compile(r'/(?:product|card)(?:--[^/]*)?/(?:[^/]+/)?(\d+)(?:/|$)')
+
+def canonicalize(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Стабильный ключ товара (площадка, артикул)
+    
+    Ozon - числовой суффикс слага (/product/<slug>-<sku>/, /product/<sku>/)
+    или идентификатор старых ссылок (/context/detail/id/<sku>/), Wildberries -
+    артикул из /catalog/<nm>/, Яндекс.Маркет - offerid из параметров, если
+    он есть, иначе идентификатор товара из пути. Параметры отслеживания
+    (_bctx, at, hs и т.п.) на ключ не влияют.
+    
+    Args:
+        url (str): URL товара
+        
+    Returns:
+        Optional[Tuple[str, str]]: (площадка, артикул) или None, если артикул не найден
+    """
+    platform = detect_platform(url)
+    if not platform:
+        return None
+    
+    parsed = urlparse(url.strip())
+    if platform == 'ozon':
+        match = _OZON_SKU.search(parsed.path)
+    elif platform == 'wildberries':
+        match = _WB_SKU.search(parsed.path)
+    else:
+        offer_id = parse_qs(parsed.query).get('offerid')
+        if offer_id and offer_id[0]:
+            return platform, offer_id[0]
+        match = _MARKET_SKU.search(parsed.path)
+    
+    return (platform, match.group(1)) if match else None
+
+def product_key(url: str) -> str:
+    """
+    Строковый ключ товара для кэшей, дедупликации и индекса в базе
+    
+    Args:
+        url (str): URL товара
+        
+    Returns:
+        str: 'площадка:артикул' или канонический URL, если артикул не найден
+    """
+    key = canonicalize(url)
+    return f"{key[0]}:{key[1]}" if key else canonical_url(url)
+
+def unique_links(links: Iterable[str]) -> List[str]:
+    """
+    Ссылки без повторов одного и того же товара, порядок сохраняется
+    
+    Args:
+        links (Iterable[str]): Ссылки на товары
+        
+    Returns:
+        List[str]: Первая ссылка для каждого ключа товара
+    """
+    seen = set()
+    result = []
+    for link in links:
+        key = product_key(link)
+        if key not in seen:
+            seen.add(key)
+            result.append(link)
+    return result
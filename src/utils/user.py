@@ -1,5 +1,5 @@
 import logging
-from src.services.database import DatabaseService
+from src.services.async_database import AsyncDatabaseService
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +16,12 @@ async def ensure_user_exists(user_id: int, username: str = None) -> bool:
     """
     try:
         # Проверяем существование пользователя
-        user = DatabaseService.get_user(user_id)
+        user = await AsyncDatabaseService.get_user(user_id)
         if user:
             return True
             
         # Создаем нового пользователя
-        DatabaseService.add_user(user_id, username)
+        await AsyncDatabaseService.create_user(user_id, username)
         return True
         
     except Exception as e:
@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.services.analytics import (
+    format_metrics_message,
+    load_product_metrics,
+    price_metrics,
+    product_metrics,
+    whole_products,
+)
+
+NOW = datetime(2024, 3, 31)
+WINDOWS = (7, 30)
+
+
+def history(points):
+    frame = pd.DataFrame(points, columns=['product_id', 'name', 'timestamp', 'close'])
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+    frame['low'] = frame['high'] = frame['close']
+    return frame
+
+
+def test_price_metrics():
+    metrics = price_metrics(history([
+        (1, 'Молоко', '2024-02-20', 100.0),
+        (1, 'Молоко', '2024-03-20', 90.0),
+        (1, 'Молоко', '2024-03-25', 90.0),
+        (1, 'Молоко', '2024-03-30', 80.0),
+        (2, 'Хлеб', '2024-03-28', 50.0),
+    ]), NOW, WINDOWS)
+
+    milk = metrics.loc[1]
+    assert milk['change_7d_pct'] == pytest.approx((80 / 90 - 1) * 100)
+    assert milk['change_30d_pct'] == pytest.approx(-20)
+    assert (milk['min_30d'], milk['max_30d']) == (80, 90)
+    assert milk['lowest_7d'] and milk['lowest_30d']
+    assert milk['last_change'] == pd.Timestamp('2024-03-30')
+    assert milk['days_since_change'] == pytest.approx(1)
+    # Изменения внутри 30 дней: 0% и -11.1%
+    assert milk['volatility_30d_pct'] == pytest.approx(pd.Series([0, -100 / 9]).std())
+
+    # Одна точка: изменения нет, цена держится с первой записи
+    bread = metrics.loc[2]
+    assert bread['change_7d_pct'] == 0
+    assert pd.isna(bread['last_change'])
+    assert bread['days_since_change'] == pytest.approx(3)
+
+
+def test_product_metrics_keep_products_without_history():
+    products = pd.DataFrame({
+        'id': [1, 3], 'name': ['Молоко', 'Сыр'],
+        'current_price': [80.0, 300.0], 'original_price': [100.0, 250.0]
+    })
+    metrics = price_metrics(history([(1, 'Молоко', '2024-03-30', 80.0)]), NOW, WINDOWS)
+
+    frame = product_metrics(products, metrics, WINDOWS)
+    assert list(frame['product_id']) == [1, 3]
+    assert list(frame['discount_pct']) == [20, 0]
+    assert list(frame['lowest_30d']) == [True, False]
+    assert pd.isna(frame.loc[1, 'min_30d'])
+
+
+def test_whole_products_across_chunks():
+    frame = history([(product, 'Товар', f'2024-03-{day:02d}', 10.0)
+                     for product in (1, 2, 3) for day in range(1, 6)])
+    chunks = [frame.iloc[start:start + 4] for start in range(0, len(frame), 4)]
+
+    batches = list(whole_products(chunks))
+    assert sum(len(batch) for batch in batches) == len(frame)
+    owners = [set(batch['product_id']) for batch in batches]
+    for first, second in zip(owners, owners[1:]):
+        assert not first & second
+
+
+def test_format_metrics_message():
+    products = pd.DataFrame({
+        'id': [1, 2, 3], 'name': ['Молоко', 'Хлеб', 'Сыр'],
+        'current_price': [80.0, 50.0, 300.0], 'original_price': [100.0, 50.0, 300.0]
+    })
+    metrics = price_metrics(history([
+        (1, 'Молоко', '2024-03-20', 90.0),
+        (1, 'Молоко', '2024-03-30', 80.0),
+        (2, 'Хлеб', '2024-03-20', 40.0),
+        (2, 'Хлеб', '2024-03-30', 50.0),
+    ]), NOW, WINDOWS)
+
+    text = format_metrics_message(product_metrics(products, metrics, WINDOWS), limit=2, windows=WINDOWS)
+    assert 'На минимуме за 30 дн.: 1' in text
+    assert text.index('Молоко') < text.index('Хлеб')
+    assert 'скидка 20%' in text
+    assert 'Сыр' not in text and 'еще 1' in text
+
+
+def test_days_since_change_uses_full_history(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    statements = [
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, telegram_id INTEGER)",
+        "CREATE TABLE catalog_items (id INTEGER PRIMARY KEY, name VARCHAR, platform VARCHAR, url VARCHAR, "
+        "current_price FLOAT, original_price FLOAT)",
+        "CREATE TABLE subscriptions (id INTEGER PRIMARY KEY, user_id INTEGER, catalog_item_id INTEGER, "
+        "url VARCHAR, notify_threshold FLOAT, target_price FLOAT, is_active BOOLEAN)",
+        "CREATE TABLE price_history (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, price FLOAT, "
+        "timestamp DATETIME, last_confirmed DATETIME, confirmations INTEGER)",
+        "CREATE TABLE price_rollups (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, granularity VARCHAR, "
+        "bucket_start DATETIME, open FLOAT, high FLOAT, low FLOAT, close FLOAT, count INTEGER, "
+        "total FLOAT, closed_at DATETIME)",
+        "INSERT INTO users VALUES (1, 100)",
+        "INSERT INTO catalog_items VALUES (1, 'Молоко', 'ozon', 'https://ozon.ru/1', 80, 80), "
+        "(2, 'Хлеб', 'ozon', 'https://ozon.ru/2', 50, 50)",
+        "INSERT INTO subscriptions VALUES (10, 1, 1, NULL, 0.1, NULL, 1), (11, 1, 2, NULL, 0.1, NULL, 1)",
+        # Цена молока не менялась 90 дней, хлеб подешевел 40 дней назад
+        "INSERT INTO price_history (catalog_item_id, price, timestamp, last_confirmed, confirmations) VALUES "
+        "(1, 80, '2024-01-01 00:00:00.000000', '2024-03-30 00:00:00.000000', 90), "
+        "(2, 60, '2023-12-01 00:00:00.000000', '2024-02-19 00:00:00.000000', 80), "
+        "(2, 50, '2024-02-20 00:00:00.000000', '2024-03-30 00:00:00.000000', 40)",
+    ]
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+    metrics = load_product_metrics(engine, 100, NOW, WINDOWS).set_index('product_id')
+    assert metrics.loc[10, 'days_since_change'] == pytest.approx(90)
+    assert pd.isna(metrics.loc[10, 'last_change'])
+    assert metrics.loc[11, 'days_since_change'] == pytest.approx(40)
+    assert metrics.loc[11, 'last_change'] == pd.Timestamp('2024-02-20')
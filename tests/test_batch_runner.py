@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import Counter
+
+from src.config.config import BATCH_PLATFORM_CONCURRENCY
+from src.services.batch_runner import BatchProgress, BatchRunner
+from src.utils.urls import detect_platform
+
+OZON_URLS = [f'https://www.ozon.ru/product/tovar-{i}/' for i in range(8)]
+WB_URLS = [f'https://www.wildberries.ru/catalog/{i}/detail.aspx' for i in range(12)]
+MARKET_URLS = [f'https://market.yandex.ru/product--tovar/{i}' for i in range(6)]
+
+
+class FakeFetch:
+    """Загрузка, которая запоминает пиковое число одновременных вызовов всего и по площадкам"""
+
+    def __init__(self, delay: float = 0.01, failing=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.active = Counter()
+        self.peak = Counter()
+
+    async def __call__(self, url):
+        platform = detect_platform(url)
+        self.active[platform] += 1
+        self.active['total'] += 1
+        self.peak[platform] = max(self.peak[platform], self.active[platform])
+        self.peak['total'] = max(self.peak['total'], self.active['total'])
+        try:
+            await asyncio.sleep(self.delay)
+            if url in self.failing:
+                raise ValueError('Ошибка при получении страницы: 403')
+            return {'name': url, 'current_price': 100.0}
+        finally:
+            self.active[platform] -= 1
+            self.active['total'] -= 1
+
+
+def interleave(*groups):
+    urls = []
+    for index in range(max(len(group) for group in groups)):
+        urls.extend(group[index] for group in groups if index < len(group))
+    return urls
+
+
+def test_global_and_platform_limits_cap_concurrency():
+    # Подготовка
+    fetch = FakeFetch()
+    runner = BatchRunner(fetch, concurrency=5, platform_limits={'ozon': 2, 'wildberries': 3},
+                         progress_interval=60)
+    urls = interleave(OZON_URLS, WB_URLS, MARKET_URLS)
+
+    # Действие
+    results = asyncio.run(runner.run(urls))
+
+    # Проверка
+    assert len(results) == len(urls)
+    assert fetch.peak['ozon'] == 2
+    assert fetch.peak['wildberries'] == 3
+    assert fetch.peak['total'] == 5
+
+
+def test_platform_limits_default_to_config():
+    # Подготовка
+    fetch = FakeFetch()
+    runner = BatchRunner(fetch, concurrency=20, progress_interval=60)
+
+    # Действие
+    asyncio.run(runner.run(interleave(OZON_URLS, WB_URLS)))
+
+    # Проверка
+    assert runner.platform_limits == {platform: max(1, limit)
+                                      for platform, limit in BATCH_PLATFORM_CONCURRENCY.items()}
+    assert fetch.peak['ozon'] <= runner.platform_limits['ozon']
+    assert fetch.peak['wildberries'] <= runner.platform_limits['wildberries']
+
+
+def test_result_callback_and_progress_counts():
+    # Подготовка
+    failing = {OZON_URLS[0], WB_URLS[1]}
+    fetch = FakeFetch(failing=failing)
+    reported = []
+    runner = BatchRunner(fetch, concurrency=4, platform_limits={}, progress_interval=60,
+                         on_result=lambda url, data, error: reported.append((url, data is not None, error)))
+    urls = OZON_URLS[:3] + WB_URLS[:3]
+
+    # Действие
+    results = asyncio.run(runner.run(urls))
+
+    # Проверка
+    assert sorted(url for url, _, _ in reported) == sorted(urls)
+    assert {url for url, ok, _ in reported if not ok} == failing
+    assert all(error and '403' in error for url, ok, error in reported if not ok)
+    assert set(results) == set(urls) - failing
+    assert (runner.progress.succeeded, runner.progress.failed, runner.progress.done) == (4, 2, 6)
+    assert runner.progress.eta_seconds() == 0
+
+
+def test_progress_rate_and_eta():
+    # Подготовка
+    progress = BatchProgress(total=10)
+    progress.succeeded = 3
+    progress.failed = 1
+    progress.started_at = time.monotonic() - 120
+
+    # Действие
+    rate = progress.rate_per_minute()
+    eta = progress.eta_seconds()
+    line = progress.line()
+
+    # Проверка
+    assert abs(rate - 2.0) < 0.01
+    assert abs(eta - 180) < 1
+    assert line.startswith('Обработано 4 из 10 (успешно 3, ошибок 1)')
+    assert BatchProgress(total=5).eta_seconds() is None
@@ -0,0 +1,42 @@
+from sqlalchemy import text
+
+from src.services.db_engine import (
+    AUTO_VACUUM_INCREMENTAL,
+    create_database_engine,
+    enable_incremental_vacuum,
+    get_engine,
+    maintain_sqlite,
+)
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        # 1 - NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+        assert conn.execute(text("PRAGMA cache_size")).scalar() < 0
+    engine.dispose()
+
+
+def test_incremental_vacuum_and_maintenance(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, data TEXT)"))
+        conn.execute(text("INSERT INTO items (data) VALUES (:data)"), [{'data': 'x' * 1000}] * 200)
+        conn.execute(text("DELETE FROM items"))
+
+    enable_incremental_vacuum(engine)
+    maintain_sqlite(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA auto_vacuum")).scalar() == AUTO_VACUUM_INCREMENTAL
+        assert conn.execute(text("PRAGMA freelist_count")).scalar() == 0
+    engine.dispose()
+
+
+def test_engine_is_shared_per_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'products.db'}"
+    assert get_engine(url) is get_engine(url)
+    get_engine(url).dispose()
@@ -0,0 +1,72 @@
+import time
+
+from src.services.dom_extract import PAGE_FIELDS, extract_page
+
+
+class FakeDriver:
+    """Страница, на которой поля появляются по очереди: каждый опрос возвращает следующий снимок"""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def execute_script(self, script, fields):
+        self.calls += 1
+        index = min(self.calls, len(self.snapshots)) - 1
+        return dict(self.snapshots[index])
+
+
+def test_all_fields_present_returns_after_one_call():
+    # Подготовка
+    driver = FakeDriver({
+        'product_name': 'Чайник',
+        'price_with_discount': '1 990 ₽',
+        'price_without_discount': '2 490 ₽'
+    })
+
+    # Действие
+    values, missing = extract_page(driver, 'ozon', timeout=5, poll_frequency=0.05)
+
+    # Проверка
+    assert driver.calls == 1
+    assert values == {
+        'product_name': 'Чайник',
+        'price_with_discount': '1 990 ₽',
+        'price_without_discount': '2 490 ₽'
+    }
+    assert missing == []
+
+
+def test_missing_optional_field_does_not_wait_for_timeout():
+    # Подготовка
+    driver = FakeDriver(
+        {'product_name': 'Чайник', 'price_with_discount': None, 'price_without_discount': None},
+        {'product_name': 'Чайник', 'price_with_discount': '1 990 ₽', 'price_without_discount': None},
+    )
+    started = time.monotonic()
+
+    # Действие
+    values, missing = extract_page(driver, 'wildberries', timeout=5, poll_frequency=0.05)
+
+    # Проверка
+    assert time.monotonic() - started < 1
+    assert driver.calls == 2
+    assert values['price_with_discount'] == '1 990 ₽'
+    assert values['price_without_discount'] == ''
+    assert missing == ['price_without_discount']
+
+
+def test_missing_required_field_is_reported_after_timeout():
+    # Подготовка
+    driver = FakeDriver({'product_name': 'Чайник', 'price_with_discount': '', 'price_without_discount': None})
+    started = time.monotonic()
+
+    # Действие
+    values, missing = extract_page(driver, 'market', timeout=0.3, poll_frequency=0.05)
+
+    # Проверка
+    assert time.monotonic() - started >= 0.3
+    assert driver.calls > 1
+    assert values == {'product_name': 'Чайник', 'price_with_discount': '', 'price_without_discount': ''}
+    assert missing == ['price_with_discount', 'price_without_discount']
+    assert set(values) == set(PAGE_FIELDS['market'])
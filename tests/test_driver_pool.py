@@ -0,0 +1,198 @@
+import json
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from src.services import driver_pool
+from src.services.driver_pool import (
+    AVERAGE_RESOURCE_BYTES,
+    FULL_WINDOW_SIZE,
+    LIGHTWEIGHT_WINDOW_SIZE,
+    DriverPool,
+    ResourceStats,
+    create_chrome_driver,
+)
+
+
+def _event(method, params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+class FakeDriver:
+    def __init__(self, slot):
+        self.slot = slot
+        self.alive = True
+        self.quit_calls = 0
+        self.window_handles = ['main']
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException('браузер не отвечает')
+        return 1
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self, slot):
+        driver = FakeDriver(slot)
+        self.drivers.append(driver)
+        return driver
+
+
+def make_pool(size=2, max_pages=0):
+    factory = FakeFactory()
+    pool = DriverPool(size=size, max_pages=max_pages, max_rss_mb=0, driver_factory=factory,
+                      resource_stats=ResourceStats())
+    return pool, factory
+
+
+def test_checked_in_driver_is_reused():
+    # Подготовка
+    pool, factory = make_pool()
+
+    # Действие
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+
+    # Проверка
+    assert second is first
+    assert len(factory.drivers) == 1
+    assert pool.stats['created'] == 1
+    assert pool.stats['checkouts'] == 2
+
+
+def test_driver_is_recycled_after_max_pages():
+    # Подготовка
+    pool, factory = make_pool(max_pages=2)
+
+    # Действие
+    for _ in range(3):
+        with pool.acquire():
+            pass
+
+    # Проверка
+    assert len(factory.drivers) == 2
+    assert factory.drivers[0].quit_calls == 1
+    assert pool.stats['recycled'] == 1
+
+
+def test_unhealthy_idle_driver_is_replaced():
+    # Подготовка
+    pool, factory = make_pool()
+    with pool.acquire() as driver:
+        pass
+    driver.alive = False
+
+    # Действие
+    with pool.acquire() as replacement:
+        pass
+
+    # Проверка
+    assert replacement is not driver
+    assert driver.quit_calls == 1
+    assert pool.stats['health_failures'] == 1
+
+
+def test_driver_failing_inside_acquire_is_destroyed():
+    # Подготовка
+    pool, factory = make_pool(size=1)
+
+    # Действие
+    with pytest.raises(WebDriverException):
+        with pool.acquire() as driver:
+            driver.alive = False
+            raise WebDriverException('вкладка упала')
+    with pool.acquire() as replacement:
+        pass
+
+    # Проверка
+    assert driver.quit_calls == 1
+    assert replacement is not driver
+    assert len(factory.drivers) == 2
+
+
+def test_close_quits_idle_drivers_and_rejects_checkout():
+    # Подготовка
+    pool, factory = make_pool()
+    pool.warm()
+
+    # Действие
+    pool.close()
+
+    # Проверка
+    assert [driver.quit_calls for driver in factory.drivers] == [1, 1]
+    with pytest.raises(RuntimeError):
+        with pool.acquire():
+            pass
+
+
+class FakeChrome:
+    def __init__(self, options, **kwargs):
+        self.arguments = list(options.arguments)
+        self.window_sizes = []
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def set_window_size(self, width, height):
+        self.window_sizes.append((width, height))
+
+    def execute_cdp_cmd(self, command, params):
+        pass
+
+    def quit(self):
+        pass
+
+
+@pytest.mark.parametrize('lightweight, size', [
+    (True, LIGHTWEIGHT_WINDOW_SIZE),
+    (False, FULL_WINDOW_SIZE),
+])
+def test_window_size_depends_on_profile(monkeypatch, tmp_path, lightweight, size):
+    # Подготовка
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(driver_pool.uc, 'Chrome', FakeChrome)
+
+    # Действие
+    driver = create_chrome_driver(slot=0, lightweight=lightweight)
+    driver_pool._quit_driver(driver)
+
+    # Проверка
+    assert f'--window-size={size[0]},{size[1]}' in driver.arguments
+    assert ('--start-maximized' in driver.arguments) is not lightweight
+    assert driver.window_sizes == [size]
+
+
+def test_resource_stats_counts_loaded_and_blocked():
+    # Подготовка
+    stats = ResourceStats()
+    events = [
+        _event('Network.requestWillBeSent', {'requestId': '1', 'type': 'Document'}),
+        _event('Network.loadingFinished', {'requestId': '1', 'encodedDataLength': 2048}),
+        _event('Network.requestWillBeSent', {'requestId': '2', 'type': 'Image'}),
+        _event('Network.loadingFailed', {'requestId': '2', 'blockedReason': 'inspector'}),
+        _event('Network.requestWillBeSent', {'requestId': '3', 'type': 'XHR'}),
+        _event('Network.loadingFailed', {'requestId': '3', 'errorText': 'net::ERR_FAILED'}),
+        {'message': 'не json'}
+    ]
+
+    # Действие
+    stats.record_page(events)
+    snapshot = stats.snapshot()
+
+    # Проверка
+    assert snapshot['pages'] == 1
+    assert snapshot['requests'] == 3
+    assert snapshot['bytes_loaded'] == 2048
+    assert snapshot['blocked'] == {'Image': 1}
+    assert snapshot['bytes_saved'] == AVERAGE_RESOURCE_BYTES['Image']
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+
+from src.services.fetch_engine import TIER_BROWSER, TIER_HTTP, FetchStats, TieredFetcher
+from src.services.parser import ParserService
+from src.services.parsers.ozon import OzonParser
+from src.services.parsers.wildberries import WildberriesParser
+from src.services.scrape_cache import ScrapeCache
+from src.services.single_flight import SingleFlight
+
+PRODUCT = {'name': 'Чайник', 'current_price': 1990.0, 'original_price': 2490.0, 'discount': 20.08}
+
+
+class FakeHttpParser:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    async def parse_product(self, url):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class FakeBrowser:
+    def __init__(self, result=PRODUCT):
+        self.result = result
+        self.calls = []
+
+    async def __call__(self, url, platform):
+        self.calls.append((url, platform))
+        return self.result
+
+
+def test_http_tier_parses_wb_card_and_ozon_pages():
+    # Подготовка
+    wb_payload = {'data': {'products': [{
+        'name': 'Кружка', 'sizes': [{'price': {'basic': 50000, 'product': 39900}}]
+    }]}}
+    web_price = json.dumps({'price': '1 990 ₽', 'originalPrice': '2 490 ₽'})
+    ozon_state = (
+        f"<h1>Чайник</h1><div id=\"state-webPrice-123\" data-state='{web_price}'></div>"
+    )
+    ozon_ld_json = (
+        '<script type="application/ld+json">'
+        '{"@type": "Product", "name": "Лампа", "offers": {"@type": "Offer", "price": "750"}}'
+        '</script>'
+    )
+
+    # Действие
+    wb = WildberriesParser.extract(wb_payload)
+    ozon = OzonParser.extract(ozon_state)
+    ozon_ld = OzonParser.extract(ozon_ld_json)
+
+    # Проверка
+    assert (wb['name'], wb['current_price'], wb['original_price']) == ('Кружка', 399.0, 500.0)
+    assert (ozon['name'], ozon['current_price'], ozon['original_price']) == ('Чайник', 1990.0, 2490.0)
+    assert (ozon_ld['name'], ozon_ld['current_price']) == ('Лампа', 750.0)
+    assert WildberriesParser.extract({'data': {'products': []}}) is None
+
+
+@pytest.mark.parametrize('http_parser', [
+    FakeHttpParser(result=None),
+    FakeHttpParser(result={'name': 'Чайник', 'current_price': 0}),
+    FakeHttpParser(error=ValueError('Ошибка при получении страницы: 403')),
+])
+def test_invalid_http_result_falls_back_to_browser(http_parser):
+    # Подготовка
+    browser = FakeBrowser()
+    fetcher = TieredFetcher({'ozon': http_parser}, browser, stats=FetchStats())
+    url = 'https://www.ozon.ru/product/chaynik-123/'
+
+    # Действие
+    data = asyncio.run(fetcher.fetch(url))
+
+    # Проверка
+    assert http_parser.calls == 1
+    assert browser.calls == [(url, 'ozon')]
+    assert data['tier'] == TIER_BROWSER
+    assert data['platform'] == 'ozon'
+
+
+def test_fetch_stats_count_each_tier():
+    # Подготовка
+    stats = FetchStats()
+    fast = TieredFetcher({'wildberries': FakeHttpParser(result=PRODUCT)}, FakeBrowser(), stats=stats)
+    slow = TieredFetcher({'ozon': FakeHttpParser(result=None)}, FakeBrowser(), stats=stats)
+    broken = TieredFetcher({'ozon': FakeHttpParser(result=None)}, FakeBrowser(result=None), stats=stats)
+
+    async def scenario():
+        await fast.fetch('https://www.wildberries.ru/catalog/1/detail.aspx')
+        await fast.fetch('https://www.wildberries.ru/catalog/2/detail.aspx')
+        await slow.fetch('https://www.ozon.ru/product/1/')
+        with pytest.raises(ValueError):
+            await broken.fetch('https://www.ozon.ru/product/2/')
+
+    # Действие
+    asyncio.run(scenario())
+
+    # Проверка
+    assert stats.snapshot() == {
+        'wildberries': {TIER_HTTP: {'ok': 2, 'failed': 0}, TIER_BROWSER: {'ok': 0, 'failed': 0}},
+        'ozon': {TIER_HTTP: {'ok': 0, 'failed': 2}, TIER_BROWSER: {'ok': 1, 'failed': 1}},
+    }
+    assert stats.hit_rates()['wildberries'][TIER_HTTP] == 1.0
+
+
+def test_platform_methods_use_http_tier_and_cache():
+    # Подготовка
+    service = ParserService(cache=ScrapeCache(path=None), flight=SingleFlight())
+    http_parser = FakeHttpParser(result=PRODUCT)
+    service.parsers['ozon'] = http_parser
+    renders = []
+
+    async def render(url, platform, platform_name):
+        renders.append(url)
+        return PRODUCT
+
+    service._render = render
+    url = 'https://www.ozon.ru/product/chaynik-123/'
+
+    async def scenario():
+        first = await service.parse_ozon(url)
+        second = await service.parse_ozon(url + '?at=1')
+        wrong = await service.parse_wildberries(url)
+        return first, second, wrong
+
+    # Действие
+    first, second, wrong = asyncio.run(scenario())
+
+    # Проверка
+    assert first['tier'] == TIER_HTTP and first['name'] == 'Чайник'
+    assert second['cache_age'] >= 0
+    assert http_parser.calls == 1
+    assert renders == []
+    assert wrong is None
@@ -0,0 +1,33 @@
+import asyncio
+
+from src.services.http_client import HttpClient
+
+
+def test_session_is_shared_and_closed():
+    # Подготовка
+    client = HttpClient(limit=5, limit_per_host=2)
+
+    async def scenario():
+        first = await client.start()
+        shared = client.session
+        # После закрытия сессия отсоединяет пул соединений, лимиты читаются до close()
+        limits = (first.connector.limit, first.connector.limit_per_host)
+        await client.close()
+        return first, shared, limits
+
+    async def next_loop():
+        # В новом цикле событий создается новая сессия
+        session = client.session
+        await client.close()
+        return session
+
+    # Действие
+    first, shared, limits = asyncio.run(scenario())
+    second = asyncio.run(next_loop())
+
+    # Проверка
+    assert shared is first
+    assert limits[0] == 5
+    assert limits[1] == 2
+    assert first.closed
+    assert second is not first
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from src.services.price_history import compact_price_history, plan_history_writes, price_timeline
+from src.services.price_writer import PriceUpdate
+
+
+def test_unchanged_prices_extend_the_last_run():
+    latest = {1: (10, 100.0)}
+    updates = [
+        PriceUpdate(1, 100.0, datetime(2024, 1, 2)),
+        PriceUpdate(1, 100.0, datetime(2024, 1, 3)),
+        PriceUpdate(2, 50.0, datetime(2024, 1, 2)),
+        PriceUpdate(2, 50.0, datetime(2024, 1, 4)),
+        PriceUpdate(1, 90.0, datetime(2024, 1, 5)),
+    ]
+    confirms, inserts = plan_history_writes(latest, updates)
+
+    assert confirms == [{'row_id': 10, 'added': 2, 'confirmed': datetime(2024, 1, 3)}]
+    assert [(row['catalog_item_id'], row['price'], row['confirmations']) for row in inserts] == [
+        (2, 50.0, 2), (1, 90.0, 1)
+    ]
+    assert inserts[0]['last_confirmed'] == datetime(2024, 1, 4)
+
+
+def test_compaction_collapses_runs(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE price_history (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, price FLOAT, "
+            "timestamp TIMESTAMP, last_confirmed TIMESTAMP, confirmations INTEGER)"
+        ))
+        prices = [100, 100, 100, 90, 90, 100]
+        conn.execute(
+            text("INSERT INTO price_history (catalog_item_id, price, timestamp, last_confirmed, confirmations) "
+                 "VALUES (1, :price, :timestamp, :timestamp, 1)"),
+            [{'price': price, 'timestamp': f"2024-01-0{day + 1} 00:00:00"} for day, price in enumerate(prices)]
+        )
+
+    assert compact_price_history(engine) == {'items': 1, 'deleted': 3}
+    assert compact_price_history(engine)['deleted'] == 0
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT price, timestamp, last_confirmed, confirmations FROM price_history ORDER BY timestamp"
+        )).fetchall()
+    assert [tuple(row) for row in rows] == [
+        (100.0, '2024-01-01 00:00:00', '2024-01-03 00:00:00', 3),
+        (90.0, '2024-01-04 00:00:00', '2024-01-05 00:00:00', 2),
+        (100.0, '2024-01-06 00:00:00', '2024-01-06 00:00:00', 1),
+    ]
+
+
+def test_timeline_restores_both_ends_of_each_run():
+    records = [
+        {'price': 90.0, 'timestamp': '2024-01-04 00:00:00', 'last_confirmed': '2024-01-04 00:00:00'},
+        {'price': 100.0, 'timestamp': '2024-01-01 00:00:00', 'last_confirmed': '2024-01-03 00:00:00'},
+    ]
+    assert price_timeline(records) == [
+        ('2024-01-04 00:00:00', 90.0),
+        ('2024-01-03 00:00:00', 100.0),
+        ('2024-01-01 00:00:00', 100.0),
+    ]
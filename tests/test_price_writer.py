@@ -0,0 +1,83 @@
+import asyncio
+
+from src.services.price_writer import PriceUpdateWriter
+
+
+def test_flushes_full_batches_and_remainder():
+    batches = []
+
+    async def write(batch):
+        batches.append([(update.catalog_item_id, update.price) for update in batch])
+
+    async def scenario():
+        writer = PriceUpdateWriter(write, batch_size=3, flush_interval=60)
+        for item_id in range(1, 6):
+            await writer.add(item_id, 100.0 + item_id)
+        assert writer.pending == 2
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert batches == [[(1, 101.0), (2, 102.0), (3, 103.0)], [(4, 104.0), (5, 105.0)]]
+    assert writer.stats['batches'] == 2 and writer.stats['rows'] == 5
+
+
+def test_failed_batch_is_kept_for_next_flush():
+    calls = []
+
+    async def write(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+
+    async def scenario():
+        writer = PriceUpdateWriter(write, batch_size=10, flush_interval=60)
+        await writer.add(1, 100.0)
+        assert await writer.flush() == 0
+        await writer.add(2, 200.0)
+        assert await writer.flush() == 2
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert calls == [1, 2]
+    assert writer.stats['failed_batches'] == 1 and writer.pending == 0
+
+
+def test_outage_backs_off_and_caps_buffer():
+    calls = []
+
+    async def write(batch):
+        calls.append(len(batch))
+        raise RuntimeError("database is unavailable")
+
+    async def scenario():
+        writer = PriceUpdateWriter(write, batch_size=2, flush_interval=60, max_pending=5, retry_max=60)
+        for item_id in range(1, 11):
+            await writer.add(item_id, 100.0 + item_id)
+        return writer
+
+    writer = asyncio.run(scenario())
+    # После первой неудачи пакет не повторяется на каждом add(), буфер ограничен
+    assert calls == [2]
+    assert writer.backing_off
+    assert writer.pending == 5
+    assert writer.stats['dropped'] == 5
+    assert [update.catalog_item_id for update in writer._buffer] == [6, 7, 8, 9, 10]
+
+def test_run_flushes_by_interval_and_on_stop():
+    batches = []
+
+    async def write(batch):
+        batches.append(len(batch))
+
+    async def scenario():
+        writer = PriceUpdateWriter(write, batch_size=100, flush_interval=0.05)
+        task = asyncio.create_task(writer.run())
+        await writer.add(1, 100.0)
+        await asyncio.sleep(0.2)
+        await writer.add(2, 200.0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert batches == [1, 1]
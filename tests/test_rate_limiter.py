@@ -0,0 +1,57 @@
+from src.services.rate_limiter import RateLimiter, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_burst_then_queue():
+    # Подготовка
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    
+    # Действие
+    delays = [bucket.reserve() for _ in range(4)]
+    
+    # Проверка: два запроса сразу, дальше очередь с шагом 1/rate
+    assert delays == [0.0, 0.0, 0.5, 1.0]
+
+def test_refill_after_idle():
+    # Подготовка
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=3, clock=clock)
+    for _ in range(3):
+        bucket.reserve()
+    
+    # Действие
+    clock.now = 10
+    
+    # Проверка: запас восстанавливается только до размера всплеска
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 1.0]
+
+def test_slow_down_and_recover():
+    # Подготовка
+    clock = FakeClock()
+    limiter = RateLimiter(default=(1, 5), hosts={}, clock=clock)
+    url = 'https://www.ozon.ru/product/test'
+    
+    # Действие
+    limiter.report(url, 429, '4')
+    bucket = limiter.bucket(url)
+    
+    # Проверка
+    assert bucket.rate == 0.5
+    assert bucket.reserve() == 4.0
+    for _ in range(10):
+        limiter.report(url, 200)
+    assert bucket.rate == 1
+
+def test_hosts_share_bucket_by_domain():
+    # Подготовка
+    limiter = RateLimiter(default=(1, 1), hosts={'wb.ru': (5, 10)})
+    
+    # Проверка
+    assert limiter.bucket('https://card.wb.ru/cards') is limiter.bucket('https://wb.ru/x')
+    assert limiter.bucket('https://card.wb.ru/cards').base_rate == 5 
\ No newline at end of file
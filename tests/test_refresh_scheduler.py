@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timezone
+
+from src.services.refresh_scheduler import RefreshItem, RefreshScheduler, price_stats, refresh_interval
+
+NOW = 1_700_000_000.0
+
+
+def interval(item):
+    return refresh_interval(item, NOW, base=3600, min_interval=60, max_interval=86400)
+
+
+def test_volatile_and_popular_products_refresh_more_often():
+    stable = RefreshItem('1', 'u1', volatility=0.0, last_change_at=NOW - 40 * 86400)
+    volatile = RefreshItem('2', 'u2', volatility=0.8, last_change_at=NOW - 600)
+    popular = RefreshItem('3', 'u3', subscribers=8)
+    plain = RefreshItem('4', 'u4')
+
+    assert interval(volatile) < interval(plain) < interval(stable)
+    assert interval(popular) < interval(plain)
+
+    failing = RefreshItem('5', 'u5')
+    failing.failures = 3
+    assert interval(failing) == interval(plain) * 8
+
+
+def test_price_stats():
+    history = [
+        (100.0, datetime(2024, 1, 1)),
+        (100.0, datetime(2024, 1, 2)),
+        (90.0, datetime(2024, 1, 3)),
+        (90.0, datetime(2024, 1, 4)),
+    ]
+    volatility, last_change_at = price_stats(history)
+    assert volatility == 1 / 3
+    assert last_change_at == datetime(2024, 1, 3, tzinfo=timezone.utc).timestamp()
+    assert price_stats([]) == (0.0, None)
+    # Та же история в виде периодов с числом подтверждений
+    runs = [(100.0, datetime(2024, 1, 1), 2), (90.0, datetime(2024, 1, 3), 2)]
+    assert price_stats(runs) == (volatility, last_change_at)
+
+
+def test_new_items_are_spread_and_stretched_to_budget():
+    items = [RefreshItem(str(i), f'u{i}') for i in range(200)]
+
+    async def refresh(item):
+        return 1.0
+
+    scheduler = RefreshScheduler(lambda: items, refresh, base_interval=3600,
+                                 min_interval=60, max_interval=86400,
+                                 budget_per_hour=100, clock=lambda: NOW)
+    scheduler.sync()
+
+    # 200 товаров раз в час не укладываются в 100 загрузок в час
+    assert scheduler.stretch == 2.0
+    due = sorted(item.due_at - NOW for item in scheduler.items.values())
+    assert 0 <= due[0] and due[-1] <= 7200
+    # Загрузки распределены по интервалу, а не собраны в начале
+    assert due[len(due) // 2] > 1800
+
+
+def test_existing_items_are_rescheduled_when_stretch_changes():
+    items = [RefreshItem(str(i), f'u{i}') for i in range(50)]
+
+    async def refresh(item):
+        return 1.0
+
+    scheduler = RefreshScheduler(lambda: items, refresh, base_interval=3600,
+                                 min_interval=60, max_interval=86400,
+                                 budget_per_hour=100, clock=lambda: NOW)
+    scheduler.sync()
+    assert scheduler.stretch == 1.0
+    before = {item.key: item.due_at - NOW for item in scheduler.items.values()}
+
+    # Импорт: 400 товаров при бюджете 100 загрузок в час
+    scheduler.sync(items + [RefreshItem(str(i), f'u{i}') for i in range(50, 400)])
+
+    assert scheduler.stretch == 4.0
+    for key, delay in before.items():
+        item = scheduler.items[key]
+        assert abs((item.due_at - NOW) - delay * 4) < 1e-6
+        assert item.interval == 3600 * 4
+
+def test_run_refreshes_and_reschedules():
+    calls = []
+
+    async def refresh(item):
+        calls.append(item.key)
+        return None if item.key == 'broken' else 10.0
+
+    items = [RefreshItem('ok', 'u1', last_price=9.0), RefreshItem('broken', 'u2')]
+    scheduler = RefreshScheduler(lambda: items, refresh, base_interval=0.05,
+                                 min_interval=0.01, max_interval=1,
+                                 budget_per_hour=360000, workers=2, jitter=0, sync_interval=10)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.5)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert calls.count('ok') > calls.count('broken') >= 1
+    assert scheduler.items['broken'].failures >= 1
+    assert scheduler.items['ok'].last_price == 10.0
+    assert scheduler.stats['changed'] == 1
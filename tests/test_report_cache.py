@@ -0,0 +1,79 @@
+import os
+import time
+
+from src.services.report_cache import ReportCache, report_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def make_report(directory, name, size=100):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_report_is_reused_until_data_changes(tmp_path):
+    clock = Clock()
+    cache = ReportCache(str(tmp_path / 'reports'), max_bytes=10 ** 6, max_age=3600, clock=clock)
+    key = report_cache_key(1, None, 'xlsx')
+
+    entry = cache.put(key, 'v1', make_report(tmp_path, 'analysis_1.xlsx'))
+    assert entry.path == str(tmp_path / 'reports' / 'analysis_1.xlsx')
+    cache.set_file_id(key, 'file-1')
+
+    # Индекс переживает перезапуск
+    restored = ReportCache(str(tmp_path / 'reports'), max_bytes=10 ** 6, max_age=3600, clock=clock)
+    assert restored.get(key, 'v1').file_id == 'file-1'
+
+    # Другая версия данных: отчет удаляется вместе с файлом
+    assert restored.get(key, 'v2') is None
+    assert not os.path.exists(entry.path)
+    assert restored.get(key, 'v1') is None
+
+
+def test_old_reports_expire(tmp_path):
+    clock = Clock()
+    cache = ReportCache(str(tmp_path), max_bytes=10 ** 6, max_age=3600, clock=clock)
+    key = report_cache_key(1, 7, 'csv')
+    cache.put(key, 'v1', make_report(tmp_path, 'analysis_1.zip'))
+
+    clock.now += 3601
+    assert cache.get(key, 'v1') is None
+
+
+def test_disk_cap_keeps_reports_with_file_id(tmp_path):
+    clock = Clock()
+    cache = ReportCache(str(tmp_path), max_bytes=150, max_age=3600, clock=clock)
+    first = make_report(tmp_path, 'a.xlsx')
+    cache.put('1:all:xlsx', 'v1', first)
+    cache.set_file_id('1:all:xlsx', 'file-1')
+    clock.now += 1
+    second = make_report(tmp_path, 'b.xlsx')
+    cache.put('2:all:xlsx', 'v1', second)
+    clock.now += 1
+    cache.put('3:all:xlsx', 'v1', make_report(tmp_path, 'c.xlsx'))
+
+    # Самый старый файл удален, но отчет доступен по file_id; следующий без file_id удален целиком
+    assert not os.path.exists(first)
+    assert cache.get('1:all:xlsx', 'v1').file_id == 'file-1'
+    assert not os.path.exists(second)
+    assert cache.get('2:all:xlsx', 'v1') is None
+    assert cache.get('3:all:xlsx', 'v1').has_file
+
+
+def test_stale_leftovers_are_removed(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=10 ** 6, max_age=3600)
+    old = make_report(tmp_path, 'analysis_old.xlsx')
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    fresh = make_report(tmp_path, 'analysis_in_progress.xlsx')
+
+    cache.prune()
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from src.services.report_data import PRICE_COLUMNS, load_price_frame, load_products_frame, read_frame
+
+
+def make_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    statements = [
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, telegram_id INTEGER)",
+        "CREATE TABLE catalog_items (id INTEGER PRIMARY KEY, name VARCHAR, platform VARCHAR, url VARCHAR, "
+        "current_price FLOAT, original_price FLOAT)",
+        "CREATE TABLE subscriptions (id INTEGER PRIMARY KEY, user_id INTEGER, catalog_item_id INTEGER, "
+        "url VARCHAR, notify_threshold FLOAT, target_price FLOAT, is_active BOOLEAN)",
+        "CREATE TABLE price_history (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, price FLOAT, "
+        "timestamp DATETIME, last_confirmed DATETIME, confirmations INTEGER)",
+        "CREATE TABLE price_rollups (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, granularity VARCHAR, "
+        "bucket_start DATETIME, open FLOAT, high FLOAT, low FLOAT, close FLOAT, count INTEGER, "
+        "total FLOAT, closed_at DATETIME)",
+        "INSERT INTO users VALUES (1, 100), (2, 200)",
+        "INSERT INTO catalog_items VALUES (1, 'Чайник', 'ozon', 'https://ozon.ru/1', 90, 120), "
+        "(2, 'Лампа', 'ozon', 'https://ozon.ru/2', 50, 50)",
+        "INSERT INTO subscriptions VALUES (10, 1, 1, NULL, 0.1, NULL, 1), (11, 1, 2, 'https://ozon.ru/2?a=1', 0.1, 40, 1), "
+        "(12, 2, 1, NULL, 0.1, NULL, 1)",
+        "INSERT INTO price_history (catalog_item_id, price, timestamp, last_confirmed, confirmations) VALUES "
+        "(1, 100, '2024-01-01 10:00:00', '2024-01-02 10:00:00', 3), "
+        "(1, 90, '2024-01-03 10:00:00', '2024-01-03 10:00:00', 1), "
+        "(2, 50, '2024-01-02 12:00:00', '2024-01-02 12:00:00', 1)",
+        "INSERT INTO price_rollups (catalog_item_id, granularity, bucket_start, open, high, low, close, count, total) "
+        "VALUES (1, 'day', '2023-06-01 00:00:00.000000', 110, 120, 100, 100, 4, 440), "
+        "(2, 'day', '2023-06-02 00:00:00.000000', 50, 50, 50, 50, 1, 50), "
+        "(1, 'hour', '2023-06-01 10:00:00', 110, 120, 100, 100, 4, 440)",
+    ]
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+    return engine
+
+
+def test_products_frame_matches_user_products(tmp_path):
+    engine = make_database(tmp_path)
+    products = load_products_frame(engine, 100)
+    assert products['id'].tolist() == [10, 11]
+    assert products['url'].tolist() == ['https://ozon.ru/1', 'https://ozon.ru/2?a=1']
+    assert load_products_frame(engine, 300).empty
+
+
+def test_short_range_expands_runs_into_points(tmp_path):
+    engine = make_database(tmp_path)
+    tier, frame = load_price_frame(engine, 100, datetime(2024, 1, 1), datetime(2024, 1, 4))
+
+    assert tier == 'raw'
+    assert list(frame.columns) == PRICE_COLUMNS
+    assert str(frame['timestamp'].dtype) == 'datetime64[ns]'
+    assert [(row.product_id, row.close, row.count) for row in frame.itertuples()] == [
+        (10, 100.0, 1), (10, 100.0, 2), (10, 90.0, 1), (11, 50.0, 1)
+    ]
+
+
+def test_long_range_reads_daily_rollups(tmp_path):
+    engine = make_database(tmp_path)
+    # Без начала периода история начинается с первого дневного агрегата
+    tier, frame = load_price_frame(engine, 100, end=datetime(2024, 1, 4))
+
+    assert tier == 'day'
+    assert frame['product_id'].tolist() == [10, 11]
+    assert frame['avg'].tolist() == [110.0, 50.0]
+    assert frame['timestamp'].tolist() == [datetime(2023, 6, 1), datetime(2023, 6, 2)]
+
+
+def test_frame_is_read_in_chunks(tmp_path):
+    engine = make_database(tmp_path)
+    with engine.connect() as conn:
+        frame = read_frame(conn, text("SELECT id, price FROM price_history ORDER BY id"), chunk_size=1)
+    assert frame['price'].tolist() == [100.0, 90.0, 50.0]
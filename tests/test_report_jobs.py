@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.services.report_jobs import ReportJob, ReportJobService, ReportRejected, report_progress
+
+
+def slow_report(job_id, telegram_id, days, report_format):
+    progress = report_progress(job_id)
+    for rows in (100, 200):
+        progress('История цен', rows)
+        # Прогресс успевает дойти до цикла событий раньше результата
+        time.sleep(0.2)
+    return f"/tmp/report_{telegram_id}.{report_format}"
+
+
+def broken_report(job_id, telegram_id, days, report_format):
+    raise ValueError('нет данных')
+
+
+def crashed_report(job_id, telegram_id, days, report_format):
+    os._exit(1)
+
+
+def test_report_runs_in_process_without_blocking_loop():
+    service = ReportJobService(workers=1, queue_size=0, progress_interval=0, task=slow_report,
+                               start_method='fork')
+    updates = []
+
+    async def scenario():
+        finished = asyncio.Event()
+
+        async def notify(job):
+            updates.append((job.status, job.rows))
+            if not job.active:
+                finished.set()
+
+        ticks = 0
+        job = await service.submit(1, notify)
+        # Отчет пользователя уже готовится, остальные не помещаются в пул
+        with pytest.raises(ReportRejected):
+            await service.submit(1, notify)
+        with pytest.raises(ReportRejected):
+            await service.submit(2, notify)
+
+        while not finished.is_set():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return job, ticks
+
+    try:
+        job, ticks = asyncio.run(scenario())
+    finally:
+        service.shutdown(wait=True)
+
+    assert job.status == ReportJob.DONE
+    assert job.path == '/tmp/report_1.xlsx'
+    assert ticks >= 20
+    assert updates[0] == (ReportJob.QUEUED, 0)
+    assert (ReportJob.RUNNING, 200) in updates
+    assert updates[-1] == (ReportJob.DONE, 200)
+    assert service.stats == {'submitted': 1, 'completed': 1, 'failed': 0, 'rejected': 2}
+
+
+def test_failed_report_is_reported():
+    service = ReportJobService(workers=1, queue_size=0, task=broken_report, start_method='fork')
+
+    async def scenario():
+        finished = asyncio.Event()
+        result = []
+
+        async def notify(job):
+            if not job.active:
+                result.append(job.error)
+                finished.set()
+
+        await service.submit(1, notify)
+        await asyncio.wait_for(finished.wait(), timeout=10)
+        # После завершения пользователь может запросить отчет снова
+        assert service.active == 0
+        return result
+
+    try:
+        assert asyncio.run(scenario()) == ['нет данных']
+    finally:
+        service.shutdown(wait=True)
+
+
+def test_stale_broken_pool_does_not_stop_new_pool():
+    service = ReportJobService(workers=1, queue_size=0, progress_interval=0, task=crashed_report,
+                               start_method='fork')
+
+    async def scenario():
+        results = {}
+        done = {1: asyncio.Event(), 2: asyncio.Event()}
+
+        async def notify(job):
+            if not job.active:
+                results[job.telegram_id] = job.status
+                done[job.telegram_id].set()
+
+        await service.submit(1, notify)
+        broken_pool = service._pool
+        await asyncio.wait_for(done[1].wait(), timeout=10)
+
+        service.task = slow_report
+        await service.submit(2, notify)
+        # Запоздавшая ошибка старого пула не трогает новый
+        service._reset(broken_pool)
+        assert service._pool is not None and service._pool is not broken_pool
+        await asyncio.wait_for(done[2].wait(), timeout=10)
+        return results
+
+    try:
+        assert asyncio.run(scenario()) == {1: ReportJob.FAILED, 2: ReportJob.DONE}
+    finally:
+        service.shutdown(wait=True)
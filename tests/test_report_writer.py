@@ -0,0 +1,54 @@
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.services.report_writer import ReportWriter, frame_chunks
+
+FRAME = pd.DataFrame({
+    'Товар': ['Чайник', 'Лампа', 'Чайник'],
+    'Цена': [100.0, float('nan'), 90.0],
+    'Дата': pd.to_datetime(['2024-01-01 10:00', '2024-01-02 12:00', '2024-01-03 10:00']),
+})
+
+
+def test_xlsx_continues_on_next_sheet(tmp_path):
+    with ReportWriter(str(tmp_path / 'report'), 'xlsx', max_rows=3) as writer:
+        rows = writer.write_sheet('История', list(FRAME.columns), frame_chunks(FRAME, 2))
+        writer.write_sheet('Пусто', ['Товар'], [])
+
+    assert rows == 3
+    workbook = load_workbook(writer.path, read_only=True)
+    assert workbook.sheetnames == ['История', 'История (2)', 'Пусто']
+    first = list(workbook['История'].values)
+    assert first[1] == ('Чайник', 100, datetime(2024, 1, 1, 10))
+    assert first[2][1] is None
+    assert list(workbook['История (2)'].values) == [
+        ('Товар', 'Цена', 'Дата'), ('Чайник', 90, datetime(2024, 1, 3, 10))
+    ]
+    assert list(workbook['Пусто'].values) == [('Товар',)]
+
+
+def test_csv_archive_has_file_per_sheet(tmp_path):
+    with ReportWriter(str(tmp_path / 'report'), 'csv') as writer:
+        writer.write_sheet('История', list(FRAME.columns), frame_chunks(FRAME, 2))
+
+    assert writer.path.endswith('_csv.zip')
+    with zipfile.ZipFile(writer.path) as archive:
+        content = archive.read('История.csv').decode('utf-8-sig')
+    assert pd.read_csv(io.StringIO(content))['Товар'].tolist() == ['Чайник', 'Лампа', 'Чайник']
+
+
+def test_failed_report_is_removed(tmp_path):
+    def chunks():
+        yield FRAME
+        raise RuntimeError('обрыв соединения')
+
+    with pytest.raises(RuntimeError):
+        with ReportWriter(str(tmp_path / 'report'), 'csv') as writer:
+            writer.write_sheet('История', list(FRAME.columns), chunks())
+    assert not os.path.exists(writer.path)
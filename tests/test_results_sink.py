@@ -0,0 +1,70 @@
+import json
+from datetime import timedelta
+from src.services.results_sink import JsonlResultsSink
+
+def test_pending_skips_fresh_results(tmp_path):
+    # Подготовка
+    sink = JsonlResultsSink(str(tmp_path / 'results.jsonl'), fsync_every=2)
+    with sink:
+        sink.write('https://a', {'product_name': 'A'})
+        sink.write('https://b', None, 'timeout')
+    
+    # Действие
+    pending = sink.pending(['https://a', 'https://b', 'https://c'], timedelta(hours=1))
+    
+    # Проверка
+    assert pending == ['https://b', 'https://c']
+
+def test_load_latest_ignores_truncated_line(tmp_path):
+    # Подготовка
+    path = tmp_path / 'results.jsonl'
+    sink = JsonlResultsSink(str(path))
+    with sink:
+        sink.write('https://a', {'product_name': 'A'})
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"url": "https://b", "sta')
+    
+    # Действие
+    latest = sink.load_latest()
+    
+    # Проверка
+    assert list(latest) == ['https://a']
+
+def test_resume_after_truncated_record_keeps_new_record(tmp_path):
+    # Подготовка
+    path = tmp_path / 'results.jsonl'
+    with JsonlResultsSink(str(path)) as sink:
+        sink.write('https://a', {'product_name': 'A'})
+        sink.write('https://b', {'product_name': 'B'})
+    content = path.read_bytes()
+    path.write_bytes(content[:len(content) - 10])
+    
+    # Действие
+    with JsonlResultsSink(str(path)) as sink:
+        sink.write('https://c', {'product_name': 'C'})
+    latest = sink.load_latest()
+    
+    # Проверка
+    assert list(latest) == ['https://a', 'https://c']
+    assert latest['https://c']['data'] == {'product_name': 'C'}
+
+def test_compact_merges_with_existing_view(tmp_path):
+    # Подготовка
+    output = tmp_path / 'parsed_data.json'
+    output.write_text(json.dumps({'https://old': {'product_name': 'Old'}}), encoding='utf-8')
+    sink = JsonlResultsSink(str(tmp_path / 'results.jsonl'))
+    with sink:
+        sink.write('https://a', {'product_name': 'A1'})
+        sink.write('https://a', {'product_name': 'A2'})
+        sink.write('https://b', None, 'error')
+    
+    # Действие
+    count = sink.compact(str(output))
+    
+    # Проверка
+    view = json.loads(output.read_text(encoding='utf-8'))
+    assert count == 2
+    assert view == {
+        'https://old': {'product_name': 'Old'},
+        'https://a': {'product_name': 'A2'}
+    } 
\ No newline at end of file
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from src.services.rollups import backfill_rollups, choose_tier, merge_rollups, prune_history
+
+
+def test_observations_update_hourly_and_daily_ohlc():
+    observations = [
+        (1, 100.0, datetime(2024, 1, 1, 10, 5), 1),
+        (1, 120.0, datetime(2024, 1, 1, 10, 40), 1),
+        (1, 90.0, datetime(2024, 1, 1, 11, 15), 2),
+    ]
+    updates, inserts = merge_rollups([], observations)
+    assert updates == []
+
+    buckets = {(row['granularity'], row['bucket_start']): row for row in inserts}
+    hour = buckets[('hour', datetime(2024, 1, 1, 10))]
+    assert (hour['open'], hour['high'], hour['low'], hour['close'], hour['count']) == (100.0, 120.0, 100.0, 120.0, 2)
+    day = buckets[('day', datetime(2024, 1, 1))]
+    assert (day['open'], day['high'], day['low'], day['close'], day['count']) == (100.0, 120.0, 90.0, 90.0, 4)
+    assert day['total'] / day['count'] == 100.0
+
+    # Новое наблюдение обновляет сохраненный агрегат
+    day['id'] = 7
+    updates, inserts = merge_rollups([day], [(1, 80.0, datetime(2024, 1, 1, 23), 1)])
+    assert [(row['id'], row['low'], row['close'], row['count']) for row in updates] == [(7, 80.0, 80.0, 5)]
+    assert [row['granularity'] for row in inserts] == ['hour']
+
+
+def test_tier_depends_on_range_length():
+    end = datetime(2024, 6, 1)
+    assert choose_tier(end - timedelta(days=2), end) == 'raw'
+    assert choose_tier(end - timedelta(days=30), end) == 'hour'
+    assert choose_tier(end - timedelta(days=400), end) == 'day'
+
+
+def make_history(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'products.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE price_history (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, price FLOAT, "
+            "timestamp DATETIME, last_confirmed DATETIME, confirmations INTEGER)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE price_history_archive (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, price FLOAT, "
+            "timestamp DATETIME, last_confirmed DATETIME, confirmations INTEGER)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE price_rollups (id INTEGER PRIMARY KEY, catalog_item_id INTEGER, granularity VARCHAR, "
+            "bucket_start DATETIME, open FLOAT, high FLOAT, low FLOAT, close FLOAT, count INTEGER, "
+            "total FLOAT, closed_at DATETIME)"
+        ))
+        conn.execute(
+            text("INSERT INTO price_history (catalog_item_id, price, timestamp, last_confirmed, confirmations) "
+                 "VALUES (:item, :price, :first, :last, :count)"),
+            [
+                {'item': 1, 'price': 100.0, 'first': '2024-01-01 10:00:00', 'last': '2024-01-03 10:00:00', 'count': 3},
+                {'item': 1, 'price': 90.0, 'first': '2024-03-01 10:00:00', 'last': '2024-03-01 10:00:00', 'count': 1},
+                {'item': 2, 'price': 50.0, 'first': '2024-01-01 10:00:00', 'last': '2024-01-01 10:00:00', 'count': 1},
+            ]
+        )
+    return engine
+
+
+def test_backfill_and_retention(tmp_path):
+    engine = make_history(tmp_path)
+    # Дневные и почасовые агрегаты: 3 точки товара 1 и 1 точка товара 2
+    assert backfill_rollups(engine) == 8
+
+    stats = prune_history(engine, retention_days=30, archive=True, hourly_retention_days=30,
+                          now=datetime(2024, 3, 10))
+    assert stats == {'history': 1, 'hourly': 3}
+
+    with engine.connect() as conn:
+        # Последние записи товаров остаются, старая запись перенесена в архив
+        assert conn.execute(text("SELECT price FROM price_history ORDER BY id")).scalars().all() == [90.0, 50.0]
+        assert conn.execute(text("SELECT price FROM price_history_archive")).scalars().all() == [100.0]
+        assert conn.execute(text(
+            "SELECT COUNT(*) FROM price_rollups WHERE granularity = 'day'"
+        )).scalar() == 4
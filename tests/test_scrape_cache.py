@@ -0,0 +1,65 @@
+from src.services.scrape_cache import ScrapeCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, clock, memory_size=10):
+    return ScrapeCache(
+        path=str(tmp_path / 'cache.db'),
+        memory_size=memory_size,
+        ttl={'ozon': 60},
+        stale_ttl=120,
+        clock=clock
+    )
+
+
+def test_entry_freshness_and_expiry(tmp_path):
+    # Подготовка
+    clock = FakeClock()
+    cache = make_cache(tmp_path, clock)
+    cache.set('https://ozon.ru/product/1', 'ozon', {'name': 'Товар', 'current_price': 100})
+
+    def check():
+        # Свежесть записи считается по часам, поэтому снимается в момент чтения
+        entry = cache.get('https://ozon.ru/product/1')
+        return entry and (entry.is_fresh, entry.is_usable, entry.age)
+
+    # Действие
+    fresh = check()
+    clock.now += 90
+    stale = check()
+    clock.now += 120
+    expired = check()
+
+    # Проверка
+    assert fresh[0] and fresh[2] == 0
+    assert not stale[0] and stale[1]
+    assert stale[2] == 90
+    assert expired is None
+    assert cache.stats == {'hits': 1, 'stale_hits': 1, 'misses': 1}
+
+
+def test_evicted_entries_are_read_from_disk(tmp_path):
+    # Подготовка
+    clock = FakeClock()
+    cache = make_cache(tmp_path, clock, memory_size=1)
+    cache.set('a', 'ozon', {'name': 'A'})
+    cache.set('b', 'ozon', {'name': 'B'})
+    evicted = 'a' not in cache._memory
+
+    # Действие
+    from_disk = cache.get('a')
+    cache.close()
+    # Новый экземпляр видит записи предыдущего
+    reopened = make_cache(tmp_path, clock).get('b')
+
+    # Проверка
+    assert evicted
+    assert from_disk.data == {'name': 'A'}
+    assert reopened.data == {'name': 'B'}
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.scrape_executor import ScrapeDeadlineExceeded, ScrapeExecutor, ScrapeRejected
+
+
+def test_blocking_jobs_do_not_block_event_loop():
+    executor = ScrapeExecutor(workers=2, queue_size=0, deadline=5)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(executor.run(time.sleep, 0.2) for _ in range(2)))
+        ticker_task.cancel()
+        return results, ticks
+
+    try:
+        results, ticks = asyncio.run(scenario())
+    finally:
+        executor.shutdown(wait=True)
+    assert results == [None, None]
+    assert ticks >= 5
+    assert executor.stats['completed'] == 2
+
+
+def test_full_queue_rejects_new_jobs():
+    executor = ScrapeExecutor(workers=1, queue_size=1, deadline=5)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.saturated
+        with pytest.raises(ScrapeRejected):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown(wait=True)
+    assert executor.stats['rejected'] == 1
+    assert executor.stats['completed'] == 2
+
+
+def test_queued_job_is_skipped_after_deadline():
+    executor = ScrapeExecutor(workers=1, queue_size=1, deadline=5)
+    calls = []
+
+    async def scenario():
+        blocker = asyncio.create_task(executor.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ScrapeDeadlineExceeded):
+            await executor.run(calls.append, 'late', deadline=0.05)
+        await blocker
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown(wait=True)
+    assert calls == []
+    assert executor.stats['expired'] == 1
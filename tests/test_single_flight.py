@@ -0,0 +1,59 @@
+import asyncio
+
+from src.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    # Подготовка
+    flight = SingleFlight()
+    executions = []
+
+    async def load():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return {'current_price': 100}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run('ozon:1', load) for _ in range(5)))
+
+    # Действие
+    results = asyncio.run(scenario())
+
+    # Проверка
+    assert len(executions) == 1
+    assert all(result == {'current_price': 100} for result in results)
+    assert flight.stats == {'calls': 5, 'executions': 1, 'coalesced': 4}
+    assert flight.saved == 4
+    assert not flight.in_flight('ozon:1')
+
+
+def test_error_is_delivered_to_every_caller():
+    # Подготовка
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("нет данных")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flight.run('wb:1', load) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    async def retry():
+        async def ok():
+            return 1
+        return await flight.run('wb:1', ok)
+
+    # Действие
+    results = asyncio.run(scenario())
+    executions_after_error = flight.stats['executions']
+    # После ошибки следующий запрос выполняет загрузку заново
+    retried = asyncio.run(retry())
+
+    # Проверка
+    assert all(isinstance(result, ValueError) for result in results)
+    assert executions_after_error == 1
+    assert retried == 1
+    assert flight.stats['executions'] == 2
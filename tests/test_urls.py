@@ -0,0 +1,77 @@
+from src.utils.urls import canonical_url, canonicalize, detect_platform, product_key
+
+
+def test_ozon_tracking_parameters_do_not_change_key():
+    # Подготовка
+    url = ('https://www.ozon.ru/product/podkova-distantsionnaya-plastik-rusi-1-5mm-oranzhevaya-50sht-1966183364/'
+           '?_bctx=CAQQvnM&at=nRtrZLzynU4OyB4oF41OY38UDoW1GJiY8mk6zCmLnOJn&hs=1')
+
+    # Действие
+    canonical = canonicalize(url)
+    key = product_key(url)
+
+    # Проверка
+    assert canonical == ('ozon', '1966183364')
+    assert key == product_key('https://ozon.ru/product/1966183364')
+
+
+def test_ozon_legacy_and_slugless_links():
+    # Подготовка
+    legacy = 'https://www.ozon.ru/context/detail/id/161340207/'
+    slugless = 'https://www.ozon.ru/product/161340207/'
+    with_slug = 'https://www.ozon.ru/product/kofe-v-zernah-161340207/?at=1'
+
+    # Действие
+    legacy_canonical = canonicalize(legacy)
+    slugless_canonical = canonicalize(slugless)
+    legacy_key = product_key(legacy)
+    slug_key = product_key(with_slug)
+
+    # Проверка
+    assert legacy_canonical == ('ozon', '161340207')
+    assert slugless_canonical == ('ozon', '161340207')
+    assert legacy_key == slug_key == 'ozon:161340207'
+
+
+def test_wildberries_article():
+    # Подготовка
+    url = 'https://www.wildberries.ru/catalog/103815285/detail.aspx?targetUrl=GP'
+
+    # Действие
+    canonical = canonicalize(url)
+
+    # Проверка
+    assert canonical == ('wildberries', '103815285')
+
+
+def test_market_offer_and_product_id():
+    # Подготовка
+    offer_url = 'https://market.yandex.ru/product--smartfon/1779231637?sku=1&offerid=AbC12'
+    product_url = 'https://market.yandex.ru/product--smartfon/1779231637?sku=1'
+    card_url = 'https://market.yandex.ru/card/smartfon/1779231637'
+
+    # Действие
+    offer = canonicalize(offer_url)
+    product = canonicalize(product_url)
+    card = canonicalize(card_url)
+
+    # Проверка
+    assert offer == ('market', 'AbC12')
+    assert product == ('market', '1779231637')
+    assert card == ('market', '1779231637')
+
+
+def test_unknown_urls_fall_back_to_canonical_url():
+    # Подготовка
+    unknown = 'https://example.com/product/1'
+    ozon_page = 'https://www.ozon.ru/t/abc/?at=1'
+
+    # Действие
+    canonical = canonicalize(unknown)
+    platform = detect_platform(unknown)
+    key = product_key(ozon_page)
+
+    # Проверка
+    assert canonical is None
+    assert platform is None
+    assert key == canonical_url('https://ozon.ru/t/abc') == 'https://ozon.ru/t/abc'